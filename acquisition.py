@@ -0,0 +1,170 @@
+# Background acquisition for the scope GUIs
+# the worker owns the SiglentSDS1202XE and runs on its own QThread, so the
+# multi-megabyte waveform transfers never block the GUI event loop.
+#
+# usage:
+#   worker=AcquisitionWorker(scope,channels=[1])
+#   worker.frameReady.connect(on_frame) # on_frame(channel)
+#   worker.start()
+#   ...
+#   frame=worker.takeFrame(channel) # latest frame, older ones are dropped
+#   worker.call(scope.set_vdiv,1,'1 V') # run on the acquisition thread
+#   ...
+#   worker.stop()
+
+from PyQt5.QtCore import (QCoreApplication, QObject, Qt, QThread, QTimer,
+    pyqtSignal, pyqtSlot)
+
+from dcps.SiglentSDS1202XE import timeAxis
+
+from threading import Lock
+from time import monotonic
+
+class Frame(object):
+    # one decoded capture and the settings it was taken with
+    def __init__(self,channel,times,volts,vdiv,ofst,tdiv,sara,raw=None):
+        self.channel=channel
+        self.times=times
+        self.volts=volts
+        self.raw=raw # int8 codes, kept for saving at full resolution
+        self.vdiv=vdiv
+        self.ofst=ofst
+        self.tdiv=tdiv
+        self.sara=sara
+        self.time=monotonic()
+
+class AcquisitionWorker(QObject):
+    # emitted when a channel gets a new frame and the previous one was taken
+    frameReady=pyqtSignal(int)
+    # emitted every status_interval with {'acq':bool,'trdl':float}
+    statusReady=pyqtSignal(object)
+    # emitted with a message when a capture or call fails
+    error=pyqtSignal(str)
+
+    _call=pyqtSignal(object) # internal, delivers call() to the thread
+    _stop=pyqtSignal()
+
+    def __init__(self,scope,channels=(1,),interval=0,status_interval=1.0):
+        # scope: SiglentSDS1202XE, only touched from the worker thread
+        # channels: channels to capture
+        # interval: minimum ms between capture cycles, 0 to go as fast as
+        #   the scope allows
+        # status_interval: seconds between acquisition state/trdl queries
+        super(AcquisitionWorker,self).__init__()
+        self.scope=scope
+        self.channels=list(channels)
+        self.interval=interval
+        self.status_interval=status_interval
+
+        self._lock=Lock()
+        self._latest={} # newest frame for each channel
+        self._pending=set() # channels with a frame not taken yet
+        self._last_status=None
+        self._times_key=None
+        self._times=None
+        self.thread=None
+
+        # these are queued onto the worker thread once it is moved there
+        self._call.connect(self._run_call)
+        self._stop.connect(self._halt,Qt.BlockingQueuedConnection)
+
+    def start(self):
+        self.thread=QThread()
+        self.moveToThread(self.thread)
+        self.thread.started.connect(self._begin)
+        self.thread.start()
+
+    def stop(self):
+        # stop capturing and wait for the current capture to finish
+        if self.thread is None:
+            return
+        self._stop.emit()
+        self.thread.quit()
+        self.thread.wait()
+        self.thread=None
+
+    def setChannels(self,channels):
+        with self._lock:
+            self.channels=list(channels)
+
+    def call(self,func,*args,**kwargs):
+        # run func(*args,**kwargs) on the worker thread between captures
+        # the result is discarded, errors are sent through error
+        self._call.emit((func,args,kwargs))
+
+    def takeFrame(self,channel):
+        # return the newest frame for channel (or None) and allow the next
+        # frameReady for it
+        with self._lock:
+            self._pending.discard(channel)
+            return self._latest.get(channel)
+
+    def latestFrame(self,channel):
+        # return the newest frame for channel without taking it
+        with self._lock:
+            return self._latest.get(channel)
+
+    @pyqtSlot()
+    def _begin(self):
+        self.timer=QTimer(self)
+        self.timer.setInterval(self.interval)
+        self.timer.timeout.connect(self._acquire)
+        self.timer.start()
+
+    @pyqtSlot()
+    def _halt(self):
+        # hand the worker (and its timer) back to the GUI thread, so the
+        # thread can end cleanly and start() can be called again
+        self.timer.stop()
+        self.moveToThread(QCoreApplication.instance().thread())
+
+    @pyqtSlot(object)
+    def _run_call(self,job):
+        func,args,kwargs=job
+        try:
+            func(*args,**kwargs)
+        except Exception as err:
+            self.error.emit(str(err))
+
+    @pyqtSlot()
+    def _acquire(self):
+        with self._lock:
+            channels=list(self.channels)
+
+        for channel in channels:
+            try:
+                raw=self.scope.getWaveformRaw(channel)
+                vdiv,ofst,tdiv,sara=self.scope.scale(channel)
+            except Exception as err:
+                self.error.emit(str(err))
+                continue
+            volts=raw*(vdiv/25)-ofst
+            times=self._time_axis(len(raw),tdiv,sara)
+            frame=Frame(channel,times,volts,vdiv,ofst,tdiv,sara,raw=raw)
+
+            with self._lock:
+                self._latest[channel]=frame
+                notify=channel not in self._pending
+                self._pending.add(channel)
+            if notify:
+                # only signal when the GUI has caught up, so frames never
+                # queue up behind a slow redraw
+                self.frameReady.emit(channel)
+
+        now=monotonic()
+        if (self._last_status is None or
+                now-self._last_status>=self.status_interval):
+            self._last_status=now
+            try:
+                self.statusReady.emit({'acq':self.scope.isAcq(),
+                    'trdl':self.scope.query_trdl()})
+            except Exception as err:
+                self.error.emit(str(err))
+
+    def _time_axis(self,npts,tdiv,sara):
+        # time axis, reused while the settings stay the same
+        key=(npts,tdiv,sara)
+        if self._times_key!=key:
+            self._times_key=key
+            self._times=timeAxis(npts,tdiv,sara)
+        return self._times
@@ -0,0 +1,341 @@
+# benchmark of the GUIs and drivers, run against the simulated instruments
+# in dcps.sim so no lab bench is needed. times:
+#   startup: master_gui's window until every panel has connected
+#   poll:    one poll cycle of each master_gui panel, i.e. every readout read
+#            once and its check functions run, and each readout on its own
+#   scope:   SiglentSDS1202XE waveforms per second and MB/s at three capture
+#            depths, raw int8 and decoded
+#   redraw:  scope chart redraw (check_waveform and a repaint) per capture
+#            depth and decimation method
+#   supplies: the readback of every output, and a ramp of them all, on a
+#            standard SCPI supply (SCPI, RigolDP800) and on the Aim TTi PL-P
+# results are written to a JSON file. --baseline compares them with an earlier
+# run and exits with 1 if any median time got slower, or any rate lower, by
+# more than --tolerance
+#   python bench.py -o bench.json
+#   python bench.py -o new.json --baseline bench.json
+# --no-link leaves out the simulated bus delays, so only our own overhead is
+# timed
+
+import os
+os.environ.setdefault('QT_QPA_PLATFORM','offscreen') # no window needed
+
+from PyQt5.QtWidgets import QApplication, QMessageBox
+
+from time import perf_counter, sleep, strftime
+import argparse
+import json
+import platform
+import subprocess
+import sys
+
+import numpy as np
+
+from dcps import sim, SiglentSDS1202XE, RigolDP800, AimTTiPLP
+from dcps.SCPI import SCPI
+from acquisition import Frame
+import master_gui
+import scope
+
+# scope timebases giving captures of 14K, 140K and 1.4M points at 1 GSa/s
+DEPTHS=[('14K','1','μs'),('140K','10','μs'),('1.4M','100','μs')]
+
+# supplies the GUIs do not use: name, driver, resource, channels
+SUPPLIES=[('SCPI',lambda r: SCPI(r,max_chan=3),'SIM::SCPIPSU::INSTR',[1,2,3]),
+    ('DP800',RigolDP800,'SIM::DP800::INSTR',[1,2,3]),
+    ('PLP',AimTTiPLP,'SIM::PLP::INSTR',[1,2,3])]
+
+def stats(times):
+    # summary of a list of durations in seconds
+    t=np.asarray(times)
+    return {'n':len(t),'mean':float(t.mean()),'min':float(t.min()),
+        'p50':float(np.percentile(t,50)),'p90':float(np.percentile(t,90)),
+        'p99':float(np.percentile(t,99)),'max':float(t.max())}
+
+def spin(app,seconds):
+    # run the event loop for a while
+    end=perf_counter()+seconds
+    while perf_counter()<end:
+        app.processEvents()
+        sleep(0.005)
+
+def setup_sim(no_link):
+    # every lab instrument is a simulator, with repeatable jitter
+    sim.reset()
+    sim.redirectAll(master_gui.SIMULATED)
+    for resource in (list(master_gui.SIMULATED.values())+
+            [resource for name,driver,resource,channels in SUPPLIES]):
+        if no_link:
+            sim.configure(resource,latency=0,jitter=0,bandwidth=None)
+        else:
+            sim.configure(resource,seed=0)
+    # supplies delivering into their loads, with a little noise so the
+    # measurements change like real ones
+    for resource,channels in [('SIM::EL302P::INSTR',[1]),
+            ('SIM::CPX400DP::INSTR',[1,2])]:
+        psu=sim.device(resource)
+        psu.noise=0.001
+        for ch in channels:
+            psu.vset[ch]=5.0
+            psu.iset[ch]=1.0
+            psu.on[ch]=True
+
+def bench_startup(app,timeout):
+    # window shown until the connector has heard from every panel
+    done=[]
+    start=perf_counter()
+    wg=master_gui.WidgetGallery()
+    wg.connector.finished.connect(lambda: done.append(perf_counter()))
+    wg.show()
+    window=perf_counter()-start
+    while not done and perf_counter()-start<timeout:
+        app.processEvents()
+        sleep(0.001)
+    connected=(done[0]-start) if done else None
+    return wg,{'window':window,'connected':connected}
+
+def bench_poll(app,wg,cycles):
+    # one cycle reads every readout once, as the worker would, and runs
+    # whatever the results trigger on the GUI thread
+    results={}
+    for name in ['PSU1','PSU2','Pulse','Motion']:
+        panel=getattr(wg,name)
+        if not panel.isConnected:
+            results[name]=None
+            continue
+        # the panel's own polling would compete with the timed reads
+        panel.poller.stop()
+        panel.worker.stop(timeout=5)
+
+        readouts=panel.poller.readouts
+        each={r:[] for r in readouts}
+        cycle=[]
+        for i in range(cycles):
+            start=perf_counter()
+            for r in readouts.values():
+                t=perf_counter()
+                value=r.read()
+                if r.show is not None:
+                    r.show(value)
+                app.processEvents() # the mirror's check functions
+                each[r.name].append(perf_counter()-t)
+            cycle.append(perf_counter()-start)
+        results[name]={'cycle':stats(cycle),
+            'readouts':{r:stats(t) for r,t in each.items()}}
+    return results
+
+def bench_scope(captures):
+    # waveforms per second and MB/s at each capture depth
+    siglent=SiglentSDS1202XE('USB0::62701::60986::SDS1ECDD2R8216::0::INSTR')
+    results={}
+    frames={}
+    for depth,tdiv,unit in DEPTHS:
+        siglent.set_tdiv(tdiv,unit)
+        npts=len(siglent.getWaveformRaw(1))
+        # fewer captures of the deep ones, they take long enough to time
+        n=max(3,min(captures,int(captures*14000/npts)))
+        result={'points':npts}
+        for kind,func in [('raw',siglent.getWaveformRaw),
+                ('decoded',siglent.getWaveformArray)]:
+            times=[]
+            for i in range(n):
+                start=perf_counter()
+                func(1)
+                times.append(perf_counter()-start)
+            total=sum(times)
+            result[kind]={'capture':stats(times),'waveforms_per_s':n/total,
+                'MB_per_s':n*npts/total/1e6}
+        results[depth]=result
+        t,v=siglent.getWaveformArray(1)
+        vdiv,ofst,tdiv_,sara=siglent.scale(1)
+        frames[depth]=Frame(1,t,v,vdiv,ofst,tdiv_,sara)
+    siglent.set_tdiv('1','μs')
+    return results,frames
+
+def bench_supplies(reps):
+    # readbacks of every output (batched where the driver batches them)
+    # and a ramp of all of them, 0 to 5 V in 0.5 V steps as fast as the
+    # supply completes them
+    results={}
+    for name,driver,resource,channels in SUPPLIES:
+        psu=driver(resource)
+        psu.open()
+        for ch in channels:
+            psu.setVoltage(0.0,ch)
+            psu.setCurrent(1.0,ch)
+            psu.outputOn(ch)
+        readback=[]
+        for i in range(reps):
+            start=perf_counter()
+            psu._readback(channels)
+            readback.append(perf_counter()-start)
+        ramp=[]
+        for i in range(max(3,reps//10)):
+            start=perf_counter()
+            psu.ramp('V',5.0,1e6,0.5,channels=channels)
+            ramp.append(perf_counter()-start)
+            for ch in channels: # back down for the next one
+                psu.setVoltage(0.0,ch)
+        for ch in channels:
+            psu.outputOff(ch)
+        psu.close()
+        results[name]={'readback':stats(readback),'ramp':stats(ramp)}
+    return results
+
+def bench_redraw(app,frames,reps):
+    # check_waveform then a repaint of the chart, per decimation method
+    panel=scope.Scope()
+    if not panel.isConnected:
+        return None
+    panel.worker.stop() # draw only what is handed over here
+    panel.show()
+    app.processEvents()
+    results={}
+    for depth,frame in frames.items():
+        results[depth]={}
+        for method in ['minmax','lttb',None]:
+            if method is None and len(frame.volts)>200000:
+                continue # every point of a deep capture takes seconds
+            panel.decimation=method
+            times=[]
+            for i in range(reps):
+                start=perf_counter()
+                panel.check_waveform(frame)
+                panel.chart1view.repaint()
+                times.append(perf_counter()-start)
+            results[depth][method or 'none']=stats(times)
+    panel.close_scope()
+    panel.hide()
+    return results
+
+def flatten(tree,prefix=''):
+    # {'a':{'b':1}} -> {'a.b':1}
+    out={}
+    for key,value in tree.items():
+        if isinstance(value,dict):
+            out.update(flatten(value,prefix+key+'.'))
+        elif isinstance(value,(int,float)):
+            out[prefix+key]=value
+    return out
+
+def compare(results,baseline,tolerance):
+    # regressions of the medians, startup and rates, as printable lines
+    new=flatten(results)
+    old=flatten(baseline)
+    worse=[]
+    for key,value in sorted(new.items()):
+        if key.startswith('meta.') or key not in old or not old[key]:
+            continue
+        if key.endswith('.p50') or key=='startup.connected':
+            change=value/old[key]-1 # slower is worse
+        elif key.endswith('_per_s'):
+            change=old[key]/value-1 if value else float('inf') # less is worse
+        else:
+            continue
+        if change>tolerance:
+            worse.append(("{:<50} {:>12.4g} {:>12.4g} {:>+8.0%}").format(key,
+                old[key],value,change))
+    return worse
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git','rev-parse','--short','HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError,subprocess.CalledProcessError):
+        return None
+
+def report(results):
+    print(("startup: window {:.3f} s, connected {}").format(
+        results['startup']['window'],
+        ("{:.3f} s").format(results['startup']['connected'])
+        if results['startup']['connected'] is not None else 'timed out'))
+    print()
+    print(("{:<8} {:<12} {:>10} {:>10} {:>10}").format('panel','readout',
+        'p50 [ms]','p90 [ms]','max [ms]'))
+    for panel,res in results['poll'].items():
+        if res is None:
+            print(("{:<8} not connected").format(panel))
+            continue
+        rows=[('cycle',res['cycle'])]+list(res['readouts'].items())
+        for name,s in rows:
+            print(("{:<8} {:<12} {:>10.2f} {:>10.2f} {:>10.2f}").format(panel,
+                name,s['p50']*1e3,s['p90']*1e3,s['max']*1e3))
+    print()
+    print(("{:<6} {:>9} {:<8} {:>12} {:>10}").format('depth','points','kind',
+        'waveforms/s','MB/s'))
+    for depth,res in results['scope'].items():
+        for kind in ['raw','decoded']:
+            print(("{:<6} {:>9} {:<8} {:>12.1f} {:>10.2f}").format(depth,
+                res['points'],kind,res[kind]['waveforms_per_s'],
+                res[kind]['MB_per_s']))
+    print()
+    print(("{:<8} {:<10} {:>10} {:>10}").format('supply','op','p50 [ms]',
+        'max [ms]'))
+    for supply,res in results['supplies'].items():
+        for op,s in res.items():
+            print(("{:<8} {:<10} {:>10.2f} {:>10.2f}").format(supply,op,
+                s['p50']*1e3,s['max']*1e3))
+    if results['redraw'] is not None:
+        print()
+        print(("{:<6} {:<8} {:>10} {:>10}").format('depth','method','p50 [ms]',
+            'max [ms]'))
+        for depth,res in results['redraw'].items():
+            for method,s in res.items():
+                print(("{:<6} {:<8} {:>10.2f} {:>10.2f}").format(depth,method,
+                    s['p50']*1e3,s['max']*1e3))
+
+if __name__=="__main__":
+    parser=argparse.ArgumentParser(description=("Benchmark the GUIs and "
+        "drivers against simulated instruments"))
+    parser.add_argument('-o','--output',default='bench.json',
+        help="JSON file for the results (default: bench.json)")
+    parser.add_argument('--baseline',help="JSON file of an earlier run to "
+        "compare with")
+    parser.add_argument('--tolerance',type=float,default=0.2,
+        help="fraction a result may get worse by (default: 0.2)")
+    parser.add_argument('--cycles',type=int,default=50,
+        help="poll cycles per panel (default: 50)")
+    parser.add_argument('--captures',type=int,default=50,
+        help="scope captures at the smallest depth (default: 50)")
+    parser.add_argument('--no-link',action='store_true',
+        help="leave out the simulated bus latency and bandwidth")
+    args=parser.parse_args()
+
+    app=QApplication(sys.argv[:1])
+    QMessageBox.exec_=lambda self: 0 # alerts would wait for a click
+
+    setup_sim(args.no_link)
+    results={'meta':{'date':strftime('%Y-%m-%d %H:%M:%S'),'commit':git_commit(),
+        'python':platform.python_version(),'platform':platform.platform(),
+        'link':not args.no_link,'cycles':args.cycles,
+        'captures':args.captures}}
+
+    wg,results['startup']=bench_startup(app,timeout=15)
+    spin(app,0.5) # let the first polls settle
+    results['poll']=bench_poll(app,wg,args.cycles)
+    results['scope'],frames=bench_scope(args.captures)
+    results['redraw']=bench_redraw(app,frames,reps=20)
+    results['supplies']=bench_supplies(args.cycles)
+    wg.close()
+
+    report(results)
+    with open(args.output,'w') as f:
+        json.dump(results,f,indent=1)
+    print()
+    print(("results written to {}").format(args.output))
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline=json.load(f)
+        worse=compare(results,baseline,args.tolerance)
+        print()
+        if worse:
+            print(("{} results worse than {} by more than {:.0%}:").format(
+                len(worse),args.baseline,args.tolerance))
+            print(("{:<50} {:>12} {:>12} {:>8}").format('result','baseline',
+                'now','change'))
+            for line in worse:
+                print(line)
+            sys.exit(1)
+        print(("no regressions against {}").format(args.baseline))
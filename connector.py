@@ -0,0 +1,74 @@
+# Opens the instruments of several panels at the same time
+# each panel starts out showing a "connecting" placeholder. the connector
+# runs every panel's open_instrument() on its own thread and, as each one
+# finishes, hands the result to show_instrument() on the GUI thread, which
+# builds that panel's widgets (or a "not connected" label). the window shows
+# straight away and startup takes as long as the slowest instrument, not the
+# sum of all of them.
+#
+# a panel still connecting after timeout seconds is given up on, so a
+# missing device can never hold the window up.
+#
+# usage:
+#   psu=PSU1(connect=False)
+#   connector=Connector([psu,pulse],timeout=10)
+#   connector.finished.connect(on_all_done)
+#   connector.start()
+
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal, pyqtSlot
+
+from threading import Thread
+
+class Connector(QObject):
+    # (panel,error) from a connecting thread, error is None on success
+    _opened=pyqtSignal(object,object)
+    # emitted once every panel has connected, failed or timed out
+    finished=pyqtSignal()
+
+    def __init__(self,panels,timeout=10):
+        # panels: objects with open_instrument() and show_instrument(err)
+        # timeout: seconds before a panel still connecting is given up on
+        super(Connector,self).__init__()
+        self.panels=list(panels)
+        self.timeout=timeout
+        self._waiting=set()
+        # the connector lives on the GUI thread, so emitting from the
+        # connecting threads queues show_instrument onto the GUI thread
+        self._opened.connect(self._show)
+
+    def start(self):
+        self._waiting=set(self.panels)
+        for panel in self.panels:
+            # daemon, so an open that never returns cannot block exit
+            Thread(target=self._open,args=(panel,),daemon=True,
+                name=("connect {}").format(type(panel).__name__)).start()
+        self.timer=QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self._give_up)
+        self.timer.start(int(self.timeout*1000))
+
+    def _open(self,panel):
+        # runs on a connecting thread
+        try:
+            panel.open_instrument()
+            err=None
+        except Exception as e:
+            err=e
+        self._opened.emit(panel,err)
+
+    @pyqtSlot(object,object)
+    def _show(self,panel,err):
+        if panel not in self._waiting:
+            return # gave up on it already
+        self._waiting.discard(panel)
+        panel.show_instrument(err)
+        if not self._waiting:
+            self.timer.stop()
+            self.finished.emit()
+
+    def _give_up(self):
+        for panel in list(self._waiting):
+            self._waiting.discard(panel)
+            panel.show_instrument(TimeoutError(
+                ("no answer within {} s").format(self.timeout)))
+        self.finished.emit()
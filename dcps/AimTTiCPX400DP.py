@@ -36,9 +36,12 @@ try:
 except ValueError:
     from SCPI import SCPI
 
-from time import sleep
+try:
+    from . import parse
+except ImportError:
+    import parse
+
 import pyvisa as visa
-import re
 
 class AimTTiCPX400DP(SCPI):
     """Basic class for controlling and accessing an Aim TTi PL-P Series
@@ -51,13 +54,18 @@ class AimTTiCPX400DP(SCPI):
     only minimally adhere to the command standards.
     """
 
-    def __init__(self, resource, wait=1.0):
+    # commands are flat, there is no header path to return to the root of
+    _batch_root = ''
+
+    def __init__(self, resource, wait=1.0, completion='opc'):
         """Init the class with the instruments resource string
 
         resource - resource string or VISA descriptor,
                     like TCPIP0::192.168.1.100::9221::SOCKET
-        wait     - float that gives the default number of seconds to wait
-                    after sending each command
+        wait     - float that gives the number of seconds to wait after
+                    sending each command when completion is 'delay'
+        completion - how setters wait for a command to take effect,
+                    see SCPI
 
         NOTE: According to the documentation for this power supply, the
         resource string when using the Ethernet access method must look
@@ -66,10 +74,11 @@ class AimTTiCPX400DP(SCPI):
         inclusion of the 9221 port number and SOCKET keyword are
         apparently mandatory for these power supplies.
         """
-        super(AimTTiCPX400DP, self).__init__(resource, max_chan=3, wait=wait,
+        super(AimTTiCPX400DP, self).__init__(resource, max_chan=2, wait=wait,
                                         cmd_prefix='',
                                         read_termination='\n',
-                                        write_termination='\r\n')
+                                        write_termination='\r\n',
+                                        completion=completion)
 
     def setLocal(self):
         """Set the power supply to LOCAL mode where front panel keys work again
@@ -98,10 +107,7 @@ class AimTTiCPX400DP(SCPI):
         """return True if Voltage Tracking is on, False if outputs operate
         independently"""
         ret = self._instQuery('CONFIG?')
-        if (ret[0]=='0'):
-            return True
-        else:
-            return False
+        return parse.integer(ret) == 0
 
     def isOutputOn(self, channel=None):
         """Return true if the output of channel is ON, else false
@@ -116,73 +122,55 @@ class AimTTiCPX400DP(SCPI):
         _str = 'OP{}?'.format(self.channel)
         ret = self._instQuery(_str)
 
-        # Only check first character so that training whitespace gets ignored
-        if (ret[0] == '1'):
-            return True
-        else:
-            return False
+        return parse.boolean(ret)
 
     def outputOn(self, channel=None, wait=None):
 
         if channel is not None:
             self.channel = channel
-        if wait is None:
-            wait = self._wait
 
         _str = 'OP{} 1'.format(self.channel)
         self._instWrite(_str)
-        sleep(wait)             # give some time for PS to respond
+        self._complete(wait)    # wait for the command to take effect
 
     def outputOff(self, channel=None, wait=None):
 
         if channel is not None:
             self.channel = channel
-        if wait is None:
-            wait = self._wait
 
         _str = 'OP{} 0'.format(self.channel)
         self._instWrite(_str)
-        sleep(wait)             # give some time for PS to respond
+        self._complete(wait)    # wait for the command to take effect
 
     def outputOnAll(self, wait=None):
 
-        if wait is None:
-            wait = self._wait
-
         _str = 'OPALL 1'.format(self.channel)
         self._instWrite(_str)
-        sleep(wait)             # give some time for PS to respond
+        self._complete(wait)    # wait for the command to take effect
 
     def outputOffAll(self, wait=None):
 
-        if wait is None:
-            wait = self._wait
-
         _str = 'OPALL 0'.format(self.channel)
         self._instWrite(_str)
-        sleep(wait)             # give some time for PS to respond
+        self._complete(wait)    # wait for the command to take effect
 
     def setVoltage(self, voltage, channel=None, wait=None):
 
         if channel is not None:
             self.channel = channel
-        if wait is None:
-            wait = self._wait
 
         _str = 'V{} {}'.format(self.channel, voltage)
         self._instWrite(_str)
-        sleep(wait)             # give some time for PS to respond
+        self._complete(wait)    # wait for the command to take effect
 
     def setCurrent(self, current, channel=None, wait=None):
 
         if channel is not None:
             self.channel = channel
-        if wait is None:
-            wait = self._wait
 
         _str = 'I{} {}'.format(self.channel, current)
         self._instWrite(_str)
-        sleep(wait)             # give some time for PS to respond
+        self._complete(wait)    # wait for the command to take effect
 
 
     def queryVoltage(self, channel=None):
@@ -191,23 +179,7 @@ class AimTTiCPX400DP(SCPI):
             self.channel = channel
 
         _str = 'V{}?'.format(self.channel)
-        ret = self._instQuery(_str)
-
-        # Pull out words from response
-        match = re.match('^([^\s0-9]+)([0-9]+)\s+([0-9.+-]+)',ret)
-        if (match == None):
-            raise RuntimeError('Unexpected response: "{}"'.format(ret))
-        else:
-            # break out the words from the response
-            words = match.groups()
-            if (len(words) != 3):
-                raise RuntimeError('Unexpected number of words in response:',
-                ' "{}"'.format(ret))
-            elif(words[0] != 'V' or int(words[1]) != self.channel):
-                raise ValueError('Unexpected response format: "{}"'.format(ret))
-            else:
-                # response checks out so return fixed point response as float
-                return float(words[2])
+        return parse.tagged(self._instQuery(_str), 'V', self.channel)
 
     def queryCurrent(self, channel=None):
 
@@ -215,23 +187,7 @@ class AimTTiCPX400DP(SCPI):
             self.channel = channel
 
         _str = 'I{}?'.format(self.channel)
-        ret = self._instQuery(_str)
-
-        # Pull out words from response
-        match = re.match('^([^\s0-9]+)([0-9]+)\s+([0-9.+-]+)',ret)
-        if (match == None):
-            raise RuntimeError('Unexpected response: "{}"'.format(ret))
-        else:
-            # break out the words from the response
-            words = match.groups()
-            if (len(words) != 3):
-                raise RuntimeError('Unexpected number of words in response:',
-                '"{}"'.format(ret))
-            elif(words[0] != 'I' or int(words[1]) != self.channel):
-                raise ValueError('Unexpected response format: "{}"'.format(ret))
-            else:
-                # response checks out so return fixed point response as float
-                return float(words[2])
+        return parse.tagged(self._instQuery(_str), 'I', self.channel)
 
     def measureVoltage(self, channel=None):
         # measure voltage and measure current asks for actual value
@@ -240,22 +196,7 @@ class AimTTiCPX400DP(SCPI):
             self.channel = channel
 
         _str = 'V{}O?'.format(self.channel)
-        ret = self._instQuery(_str)
-        # Pull out words from response
-        match = re.match('^([0-9.+-]+)([^\s]+)',ret)
-        if (match == None):
-            raise RuntimeError('Unexpected response: "{}"'.format(ret))
-        else:
-            # break out the words from the response
-            words = match.groups()
-            if (len(words) != 2):
-                raise RuntimeError('Unexpected number of words in response:,'
-                '"{}"'.format(ret))
-            elif(words[1] != 'V'):
-                raise ValueError('Unexpected response format: "{}"'.format(ret))
-            else:
-                # response checks out so return fixed point response as float
-                return float(words[0])
+        return parse.measured(self._instQuery(_str), 'V')
 
     def measureCurrent(self, channel=None):
 
@@ -263,20 +204,46 @@ class AimTTiCPX400DP(SCPI):
             self.channel = channel
 
         _str = 'I{}O?'.format(self.channel)
-        ret = self._instQuery(_str)
+        return parse.measured(self._instQuery(_str), 'A')
+
+    def measureAll(self, channels=None, setpoints=False):
+        """Return the measured voltage and current and the output state
+        of every channel, read with one compound message instead of a
+        query each
 
-        # Pull out words from response
-        match = re.match('^([0-9.+-]+)([^\s]+)',ret)
-        if (match == None):
-            raise RuntimeError('Unexpected response: "{}"'.format(ret))
-        else:
-            # break out the words from the response
-            words = match.groups()
-            if (len(words) != 2):
-                raise RuntimeError('Unexpected number of words in response:',
-                '"{}"'.format(ret))
-            elif(words[1] != 'A'):
-                raise ValueError('Unexpected response format: "{}"'.format(ret))
+        channels  - channel numbers to read, all of them if None
+        setpoints - also read the set voltage and current
+
+        Returns a dict keyed by (name, channel), with names 'Vmeas',
+        'Imeas' and 'on', plus 'Vset' and 'Iset' with setpoints
+        """
+        if channels is None:
+            channels = range(1, self._max_chan + 1)
+        queries = [('Vmeas', 'V{}O?'), ('Imeas', 'I{}O?'), ('on', 'OP{}?')]
+        if setpoints:
+            queries += [('Vset', 'V{}?'), ('Iset', 'I{}?')]
+
+        with self.batch() as batch:
+            replies = [(name, ch, batch.query(q.format(ch)))
+                           for ch in channels for name, q in queries]
+            # also sends when called inside an outer batch()
+            batch.flush()
+
+        status = {}
+        for name, ch, reply in replies:
+            ret = reply.result()
+            if name == 'on':
+                status[name, ch] = parse.boolean(ret)
+            elif name == 'Vmeas':
+                status[name, ch] = parse.measured(ret, 'V')
+            elif name == 'Imeas':
+                status[name, ch] = parse.measured(ret, 'A')
             else:
-                # response checks out so return fixed point response as float
-                return float(words[0])
+                status[name, ch] = parse.tagged(ret, name[0], ch)
+        return status
+
+    def _readback(self, channels):
+        """Return {channel: (volts, amps, on)} for ramp(), in one message"""
+        status = self.measureAll(channels)
+        return {ch: (status['Vmeas', ch], status['Imeas', ch], status['on', ch])
+                    for ch in channels}
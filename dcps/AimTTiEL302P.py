@@ -36,9 +36,20 @@ try:
 except ValueError:
     from SCPI import SCPI
 
-from time import sleep
+try:
+    from . import parse
+except ImportError:
+    import parse
+
 import pyvisa as visa
-import re
+
+# seconds a setter waits when completion is 'delay'. The EL302P acts on
+# each command as soon as it has parsed it, so this only has to cover
+# that: a command is about a dozen characters, ~15 ms at 9600 baud on
+# the USB serial port, and parsing it a few ms more. Where a step must
+# also have settled at the output, check the readbacks, as ramp() does,
+# or pass wait= to the setter
+SETTLE = 0.05
 
 class AimTTiEL302P(SCPI):
     """Basic class for controlling and accessing an Aim TTi EL302P-USB
@@ -51,13 +62,20 @@ class AimTTiEL302P(SCPI):
     only minimally adhere to the command standards.
     """
 
-    def __init__(self, resource, wait=1.0):
+    # commands are flat, there is no header path to return to the root of
+    _batch_root = ''
+
+    def __init__(self, resource, wait=SETTLE, completion='delay'):
         """Init the class with the instruments resource string
 
         resource - resource string or VISA descriptor,
                     like TCPIP0::192.168.1.100::9221::SOCKET
-        wait     - float that gives the default number of seconds to wait
-                    after sending each command
+        wait     - float that gives the number of seconds to wait after
+                    sending each command when completion is 'delay',
+                    SETTLE by default
+        completion - how setters wait for a command to take effect,
+                    see SCPI. Defaults to 'delay' as
+                    the EL302P has no *OPC?
 
         NOTE: According to the documentation for this power supply, the
         resource string when using the Ethernet access method must look
@@ -69,7 +87,8 @@ class AimTTiEL302P(SCPI):
         super(AimTTiEL302P, self).__init__(resource, max_chan=3, wait=wait,
                                         cmd_prefix='',
                                         read_termination='\n',
-                                        write_termination='\r\n')
+                                        write_termination='\r\n',
+                                        completion=completion)
 
     def setLocal(self):
         """Set the power supply to LOCAL mode where front panel keys work again
@@ -94,102 +113,86 @@ class AimTTiEL302P(SCPI):
         str_ = 'OUT?'
         ret = self._instQuery(str_)
 
-        if (ret=="OUT ON\r"):
-            return True
-        else:
-            return False
-
-        # Only check first character so that training whitespace gets ignored
-        if (ret[0] == '1'):
-            return True
-        else:
-            return False
+        return parse.keyword(ret) == 'OUT ON'
 
     def outputOn(self, channel=None, wait=None):
 
-        if wait is None:
-            wait = self._wait
-
         str_ = 'ON'
         self._instWrite(str_)
-        sleep(wait)             # give some time for PS to respond
+        self._complete(wait)    # wait for the command to take effect
 
     def outputOff(self, channel=None, wait=None):
 
-        if wait is None:
-            wait = self._wait
-
         str_ = 'OFF'
         self._instWrite(str_)
-        sleep(wait)             # give some time for PS to respond
+        self._complete(wait)    # wait for the command to take effect
 
 
     def setVoltage(self, voltage, channel=None, wait=None):
 
-        if wait is None:
-            wait = self._wait
         str_ = 'V {}'.format(voltage)
         self._instWrite(str_)
-        sleep(wait)             # give some time for PS to respond
+        self._complete(wait)    # wait for the command to take effect
 
     def setCurrent(self, current, channel=None, wait=None):
 
-        if wait is None:
-            wait = self._wait
-
         str_= 'I {}'.format(current)
         self._instWrite(str_)
-        sleep(wait)             # give some time for PS to respond
+        self._complete(wait)    # wait for the command to take effect
 
 
     def queryVoltage(self, channel=None):
         # desired voltage
         str_ = 'V?'
-        ret = self._instQuery(str_)
-        # Pull out words from response
-        match = re.match('V\s(\d*\.\d*)',ret)
-        if (match == None):
-            raise RuntimeError('Unexpected response: "{}"'.format(ret))
-        else:
-            # break out the words from the response
-            words = match.groups()
-            return float(words[0])
+        return parse.tagged(self._instQuery(str_), 'V')
 
     def queryCurrent(self, channel=None):
         # desired current
         str_ = 'I?'
-        ret = self._instQuery(str_)
-        # Pull out words from response
-        match = re.match('I\s(\d*\.\d*)',ret)
-        if (match == None):
-            raise RuntimeError('Unexpected response: "{}"'.format(ret))
-        else:
-            # break out the words from the response
-            words = match.groups()
-            return float(words[0])
+        return parse.tagged(self._instQuery(str_), 'I')
 
     def measureVoltage(self, channel=None):
         # actual voltage
         str_ = 'VO?'
-        ret = self._instQuery(str_)
-        # Pull out words from response
-        match = re.match('V\s(\d*\.\d*)',ret)
-        if (match == None):
-            raise RuntimeError('Unexpected response: "{}"'.format(ret))
-        else:
-            # break out the words from the response
-            words = match.groups()
-            return float(words[0])
+        return parse.tagged(self._instQuery(str_), 'V')
 
     def measureCurrent(self, channel=None):
         #actual current
         str_= 'IO?'
-        ret = self._instQuery(str_)
-        # Pull out words from response
-        match = re.match('I\s(\d*\.\d*)',ret)
-        if (match == None):
-            raise RuntimeError('Unexpected response: "{}"'.format(ret))
-        else:
-            # break out the words from the response
-            words = match.groups()
-            return float(words[0])
+        return parse.tagged(self._instQuery(str_), 'I')
+
+    def measureAll(self, channels=None, setpoints=False):
+        """Return the measured voltage and current and the output state,
+        read with one compound message instead of a query each
+
+        channels  - ignored, there is only the one output. Taken so that
+                    every Aim TTi driver's measureAll() is called the same
+        setpoints - also read the set voltage and current
+
+        Returns a dict keyed by (name, 1) like the other Aim TTi
+        drivers, with names 'Vmeas', 'Imeas' and 'on', plus 'Vset' and
+        'Iset' with setpoints
+        """
+        queries = [('Vmeas', 'VO?'), ('Imeas', 'IO?'), ('on', 'OUT?')]
+        if setpoints:
+            queries += [('Vset', 'V?'), ('Iset', 'I?')]
+
+        with self.batch() as batch:
+            replies = [(name, batch.query(q)) for name, q in queries]
+            # also sends when called inside an outer batch()
+            batch.flush()
+
+        status = {}
+        for name, reply in replies:
+            ret = reply.result()
+            if name == 'on':
+                status[name, 1] = (parse.keyword(ret) == 'OUT ON')
+            else:
+                status[name, 1] = parse.tagged(ret, name[0])
+        return status
+
+    def _readback(self, channels):
+        """Return {channel: (volts, amps, on)} for ramp(), in one message"""
+        status = self.measureAll(channels)
+        return {ch: (status['Vmeas', 1], status['Imeas', 1], status['on', 1])
+                    for ch in channels}
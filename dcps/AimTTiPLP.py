@@ -39,9 +39,12 @@ try:
 except ValueError:
     from SCPI import SCPI
 
-from time import sleep
+try:
+    from . import parse
+except ImportError:
+    import parse
+
 import pyvisa as visa
-import re
 
 class AimTTiPLP(SCPI):
     """Basic class for controlling and accessing an Aim TTi PL-P Series
@@ -54,11 +57,16 @@ class AimTTiPLP(SCPI):
     only minimally adhere to the command standards.
     """
 
-    def __init__(self, resource, wait=1.0):
+    # commands are flat, there is no header path to return to the root of
+    _batch_root = ''
+
+    def __init__(self, resource, wait=1.0, completion='opc'):
         """Init the class with the instruments resource string
 
         resource - resource string or VISA descriptor, like TCPIP0::192.168.1.100::9221::SOCKET
-        wait     - float that gives the default number of seconds to wait after sending each command
+        wait     - float that gives the number of seconds to wait after sending each command
+                   when completion is 'delay'
+        completion - how setters wait for a command to take effect, see SCPI
 
         NOTE: According to the documentation for this power supply, the
         resource string when using the Ethernet access method must look
@@ -70,7 +78,8 @@ class AimTTiPLP(SCPI):
         super(AimTTiPLP, self).__init__(resource, max_chan=3, wait=wait,
                                         cmd_prefix='',
                                         read_termination='\n',
-                                        write_termination='\r\n')
+                                        write_termination='\r\n',
+                                        completion=completion)
 
     def setLocal(self):
         """Set the power supply to LOCAL mode where front panel keys work again
@@ -137,14 +146,9 @@ class AimTTiPLP(SCPI):
         if channel is not None:
             self.channel = channel
 
-        # If a wait time is NOT passed in, set wait to the
-        # default time
-        if wait is None:
-            wait = self._wait
-
         str = 'OP{} 1'.format(self.channel)
         self._instWrite(str)
-        sleep(wait)             # give some time for PS to respond
+        self._complete(wait)    # wait for the command to take effect
 
     def outputOff(self, channel=None, wait=None):
         """Turn off the output for channel
@@ -157,42 +161,27 @@ class AimTTiPLP(SCPI):
         if channel is not None:
             self.channel = channel
 
-        # If a wait time is NOT passed in, set wait to the
-        # default time
-        if wait is None:
-            wait = self._wait
-
         str = 'OP{} 0'.format(self.channel)
         self._instWrite(str)
-        sleep(wait)             # give some time for PS to respond
+        self._complete(wait)    # wait for the command to take effect
 
     def outputOnAll(self, wait=None):
         """Turn on the output for ALL channels
 
         """
 
-        # If a wait time is NOT passed in, set wait to the
-        # default time
-        if wait is None:
-            wait = self._wait
-
         str = 'OPALL 1'.format(self.channel)
         self._instWrite(str)
-        sleep(wait)             # give some time for PS to respond
+        self._complete(wait)    # wait for the command to take effect
 
     def outputOffAll(self, wait=None):
         """Turn off the output for ALL channels
 
         """
 
-        # If a wait time is NOT passed in, set wait to the
-        # default time
-        if wait is None:
-            wait = self._wait
-
         str = 'OPALL 0'.format(self.channel)
         self._instWrite(str)
-        sleep(wait)             # give some time for PS to respond
+        self._complete(wait)    # wait for the command to take effect
 
     def setVoltage(self, voltage, channel=None, wait=None):
         """Set the voltage value for the channel
@@ -207,14 +196,9 @@ class AimTTiPLP(SCPI):
         if channel is not None:
             self.channel = channel
 
-        # If a wait time is NOT passed in, set wait to the
-        # default time
-        if wait is None:
-            wait = self._wait
-
         str = 'V{} {}'.format(self.channel, voltage)
         self._instWrite(str)
-        sleep(wait)             # give some time for PS to respond
+        self._complete(wait)    # wait for the command to take effect
 
     def setCurrent(self, current, channel=None, wait=None):
         """Set the current value for the channel
@@ -229,14 +213,9 @@ class AimTTiPLP(SCPI):
         if channel is not None:
             self.channel = channel
 
-        # If a wait time is NOT passed in, set wait to the
-        # default time
-        if wait is None:
-            wait = self._wait
-
         str = 'I{} {}'.format(self.channel, current)
         self._instWrite(str)
-        sleep(wait)             # give some time for PS to respond
+        self._complete(wait)    # wait for the command to take effect
 
 
     def queryVoltage(self, channel=None):
@@ -252,22 +231,7 @@ class AimTTiPLP(SCPI):
             self.channel = channel
 
         str = 'V{}?'.format(self.channel)
-        ret = self._instQuery(str)
-
-        # Pull out words from response
-        match = re.match('^([^\s0-9]+)([0-9]+)\s+([0-9.+-]+)',ret)
-        if (match == None):
-            raise RuntimeError('Unexpected response: "{}"'.format(ret))
-        else:
-            # break out the words from the response
-            words = match.groups()
-            if (len(words) != 3):
-                raise RuntimeError('Unexpected number of words in response: "{}"'.format(ret))
-            elif(words[0] != 'V' or int(words[1]) != self.channel):
-                raise ValueError('Unexpected response format: "{}"'.format(ret))
-            else:
-                # response checks out so return the fixed point response as a float()
-                return float(words[2])
+        return parse.tagged(self._instQuery(str), 'V', self.channel)
 
     def queryCurrent(self, channel=None):
         """Return what current set value is (not the measured current,
@@ -282,22 +246,7 @@ class AimTTiPLP(SCPI):
             self.channel = channel
 
         str = 'I{}?'.format(self.channel)
-        ret = self._instQuery(str)
-
-        # Pull out words from response
-        match = re.match('^([^\s0-9]+)([0-9]+)\s+([0-9.+-]+)',ret)
-        if (match == None):
-            raise RuntimeError('Unexpected response: "{}"'.format(ret))
-        else:
-            # break out the words from the response
-            words = match.groups()
-            if (len(words) != 3):
-                raise RuntimeError('Unexpected number of words in response: "{}"'.format(ret))
-            elif(words[0] != 'I' or int(words[1]) != self.channel):
-                raise ValueError('Unexpected response format: "{}"'.format(ret))
-            else:
-                # response checks out so return the fixed point response as a float()
-                return float(words[2])
+        return parse.tagged(self._instQuery(str), 'I', self.channel)
 
     def measureVoltage(self, channel=None):
         """Read and return a voltage measurement from channel
@@ -311,22 +260,7 @@ class AimTTiPLP(SCPI):
             self.channel = channel
 
         str = 'V{}O?'.format(self.channel)
-        ret = self._instQuery(str)
-
-        # Pull out words from response
-        match = re.match('^([0-9.+-]+)([^\s]+)',ret)
-        if (match == None):
-            raise RuntimeError('Unexpected response: "{}"'.format(ret))
-        else:
-            # break out the words from the response
-            words = match.groups()
-            if (len(words) != 2):
-                raise RuntimeError('Unexpected number of words in response: "{}"'.format(ret))
-            elif(words[1] != 'V'):
-                raise ValueError('Unexpected response format: "{}"'.format(ret))
-            else:
-                # response checks out so return the fixed point response as a float()
-                return float(words[0])
+        return parse.measured(self._instQuery(str), 'V')
 
     def measureCurrent(self, channel=None):
         """Read and return a current measurement from channel
@@ -340,22 +274,51 @@ class AimTTiPLP(SCPI):
             self.channel = channel
 
         str = 'I{}O?'.format(self.channel)
-        ret = self._instQuery(str)
+        return parse.measured(self._instQuery(str), 'A')
 
-        # Pull out words from response
-        match = re.match('^([0-9.+-]+)([^\s]+)',ret)
-        if (match == None):
-            raise RuntimeError('Unexpected response: "{}"'.format(ret))
-        else:
-            # break out the words from the response
-            words = match.groups()
-            if (len(words) != 2):
-                raise RuntimeError('Unexpected number of words in response: "{}"'.format(ret))
-            elif(words[1] != 'A'):
-                raise ValueError('Unexpected response format: "{}"'.format(ret))
+    def measureAll(self, channels=None, setpoints=False):
+        """Return the measured voltage and current and the output state
+        of every channel, read with one compound message instead of a
+        query each
+
+        channels  - channel numbers to read, all three if None; pass the
+                    ones there are for supplies with fewer outputs
+        setpoints - also read the set voltage and current
+
+        Returns a dict keyed by (name, channel), with names 'Vmeas',
+        'Imeas' and 'on', plus 'Vset' and 'Iset' with setpoints
+        """
+        if channels is None:
+            channels = range(1, self._max_chan + 1)
+        queries = [('Vmeas', 'V{}O?'), ('Imeas', 'I{}O?'), ('on', 'OP{}?')]
+        if setpoints:
+            queries += [('Vset', 'V{}?'), ('Iset', 'I{}?')]
+
+        with self.batch() as batch:
+            replies = [(name, ch, batch.query(q.format(ch)))
+                           for ch in channels for name, q in queries]
+            # also sends when called inside an outer batch()
+            batch.flush()
+
+        status = {}
+        for name, ch, reply in replies:
+            ret = reply.result()
+            if name == 'on':
+                # Only check first character so that there can be training whitespace that gets ignored
+                status[name, ch] = (ret[0] == '1')
+            elif name == 'Vmeas':
+                status[name, ch] = parse.measured(ret, 'V')
+            elif name == 'Imeas':
+                status[name, ch] = parse.measured(ret, 'A')
             else:
-                # response checks out so return the fixed point response as a float()
-                return float(words[0])
+                status[name, ch] = parse.tagged(ret, name[0], ch)
+        return status
+
+    def _readback(self, channels):
+        """Return {channel: (volts, amps, on)} for ramp(), in one message"""
+        status = self.measureAll(channels)
+        return {ch: (status['Vmeas', ch], status['Imeas', ch], status['on', ch])
+                    for ch in channels}
 
 
 if __name__ == '__main__':
@@ -364,7 +327,6 @@ if __name__ == '__main__':
     parser.add_argument('chan', nargs='?', type=int, help='Channel to access/control (starts at 1)', default=1)
     args = parser.parse_args()
 
-    from time import sleep
     from os import environ
     resource = environ.get('TTIPLP_IP', 'TCPIP0::192.168.1.100::9221::SOCKET')
     ttiplp = AimTTiPLP(resource)
@@ -1,7 +1,10 @@
 # Author: Laurel Carpenter
 # Date: July something 2021
 
-import visa
+try:
+    from . import parse, resources
+except ImportError:
+    import parse, resources
 from time import sleep
 
 """
@@ -28,13 +31,15 @@ class NewportESP301(object):
         self.timeout=timeout
         self.baud_rate=baud_rate
 
-    def open_inst(self):
-        rm=visa.ResourceManager()
-        self.inst=rm.open_resource(self.resource,baud_rate=self.baud_rate,
-            timeout=self.timeout)
+    def open_inst(self,fresh=False):
+        # the session comes from the shared pool in dcps.resources
+        # fresh: close any pooled session first and open a new one
+        self.inst=resources.openResource(self.resource,fresh=fresh,
+            baud_rate=self.baud_rate,timeout=self.timeout)
 
     def close_inst(self):
-        self.inst.close()
+        # hands the session back to the pool, which keeps it open
+        resources.release(self.inst)
 
     # baud rate must be set to 19200 for RS-232C connection
     def get_baud(self):
@@ -66,7 +71,7 @@ class NewportESP301(object):
 
     def get_units(self,axis):
         if axis<=self.max_axes:
-            ret=int(self.inst.query(("{}SN?").format(axis)))
+            ret=parse.integer(self.inst.query(("{}SN?").format(axis)))
             retlist=["encoder count","motor step","mm","um","in","min","uin",
                 "deg","grad","rad","mrad","urad"]
             if ret<len(retlist):
@@ -87,7 +92,7 @@ class NewportESP301(object):
         # encoder resolution
         if axis<=self.max_axes:
             ret=self.inst.query(("{}SU?").format(axis))
-            return float(ret)
+            return parse.number(ret)
 
     def update_motor(self,axis):
         if axis<=self.max_axes:
@@ -113,7 +118,7 @@ class NewportESP301(object):
         # returns amount of available memory
         ret=self.inst.query("XM")
         # units: bytes
-        return float(ret)
+        return parse.number(ret)
 
 
     # motor
@@ -131,10 +136,7 @@ class NewportESP301(object):
         # returns True if motor is on, False if motor is off
         if axis<=self.max_axes:
             ret=self.inst.query(("{}MO?").format(axis))
-            if ret=='1\r\n':
-                return True
-            else:
-                return False
+            return parse.boolean(ret)
 
 
     # motion
@@ -146,10 +148,7 @@ class NewportESP301(object):
         # returns True if motion is done, False if still moving
         if axis<=self.max_axes:
             ret=self.inst.query(("{}MD?").format(axis))
-            if ret=='0\r\n':
-                return False
-            else:
-                return True
+            return parse.boolean(ret)
 
     def stop_motion(self,axis):
         # stops motion on axis
@@ -216,14 +215,14 @@ class NewportESP301(object):
         if axis<=self.max_axes:
             ret=self.inst.query(("{}DP?").format(axis))
             # predef. units
-            return float(ret)
+            return parse.number(ret)
 
     def get_act_pos(self,axis):
         # returns actual position on axis
         if axis<=self.max_axes:
             ret=self.inst.query(("{}TP").format(axis))
             # predef. units
-            return float(ret)
+            return parse.number(ret)
 
     def move_abs_pos(self,axis,pos):
         # moves to absolute position 'pos'
@@ -255,14 +254,14 @@ class NewportESP301(object):
         if axis<=self.max_axes:
             ret=self.inst.query(("{}DV?").format(axis))
             # units: predef. units per s
-            return float(ret)
+            return parse.number(ret)
 
     def get_act_vel(self,axis):
         # returns actual velocity on axis
         if axis<=self.max_axes:
             ret=self.inst.query(("{}TV").format(axis))
             # units: predef. units per s
-            return float(ret)
+            return parse.number(ret)
 
     def set_vel(self,axis,vel=0):
         # sets velocity to 'vel'
@@ -287,7 +286,7 @@ class NewportESP301(object):
         if axis<=self.max_axes:
             ret=self.inst.query(("{}VU?").format(axis))
             # units = predef. units per s
-            return float(ret)
+            return parse.number(ret)
 
     # accel/decel
 
@@ -305,7 +304,7 @@ class NewportESP301(object):
         if axis<=self.max_axes:
             ret=self.inst.query(("{}AC?").format(axis))
             # units: predef. units per s^2
-            return float(ret)
+            return parse.number(ret)
 
     def set_decel(self,axis,decel=0):
         # sets deceleration to 'decel'
@@ -321,7 +320,7 @@ class NewportESP301(object):
         if axis<=self.max_axes:
             ret=self.inst.query(("{}AG?").format(axis))
             # units: predef. units per s^2
-            return float(ret)
+            return parse.number(ret)
 
     def set_max_accel(self,axis,max_):
         # sets maximum acceleration/deceleration to 'max_'
@@ -337,7 +336,7 @@ class NewportESP301(object):
         if axis<=self.max_axes:
             ret=self.inst.query(("{}AU?").format(axis))
             # units: predef. units per s^2
-            return float(ret)
+            return parse.number(ret)
 
 
     # limits
@@ -356,7 +355,7 @@ class NewportESP301(object):
         if axis<=self.max_axes:
             ret=self.inst.query(("{}SL?").format(axis))
             # predef. units
-            return float(ret)
+            return parse.number(ret)
 
     def set_right_lim(self,axis,lim):
         # sets right limit to 'lim'
@@ -372,7 +371,7 @@ class NewportESP301(object):
         if axis<=self.max_axes:
             ret=self.inst.query(("{}RL?").format(axis))
             # predef. units
-            return float(ret)
+            return parse.number(ret)
 
 
     # wait
@@ -8,46 +8,61 @@ try:
 except ValueError:
     from SCPI import SCPI
 
-from time import sleep
+try:
+    from . import parse
+except ImportError:
+    import parse
+
 import pyvisa as visa
 import re
 from math import inf
+from collections import namedtuple
 
 """
 class to control Rigol DG 5000 series function generator
 inherits SCPI as machine uses SCPI commands
 """
 
+# everything the pulser panel shows for one channel, see snapshot()
+PulseSnapshot=namedtuple('PulseSnapshot',['output','normal','impedance',
+    'sync','sync_pos','waveform','freq','amp','offset','delay','duty',
+    'pulse_delay','hold_width','lead','trail','width'])
+
+# queries in the order snapshot() sends them
+_snapshot_queries=[':OUTP{0}?',':OUTP{0}:POL?',':OUTP{0}:IMP?',
+    ':OUTP{0}:SYNC?',':OUTP{0}:SYNC:POL?',':SOUR{0}:APPL?',
+    ':SOUR{0}:PULS:DCYC?',':SOUR{0}:PULS:DEL?',':SOUR{0}:PULS:HOLD?',
+    ':SOUR{0}:PULS:TRAN?',':SOUR{0}:PULS:TRAN:TRA?',':SOUR{0}:PULS:WIDT?']
+
+# DEF is what APPL? reports for a parameter left at its default
+_keywords={'DEF':0}
+
 class RigolDG5000(SCPI):
-    def __init__(self, resource, wait=1.0):
+    def __init__(self, resource, wait=1.0, completion='opc'):
+        # completion: how setters wait for a command to take effect, see SCPI
+        # wait: seconds to sleep after each command when completion='delay'
         super(RigolDG5000, self).__init__(resource, max_chan=2, wait=wait,
                 cmd_prefix='',
                 read_termination='',
-                write_termination='\r\n')
+                write_termination='\r\n',
+                completion=completion)
         self.open()
 
     def isOutputOn(self, channel=None):
         _str = (':OUTP{}?').format(channel)
         ret = self._instQuery(_str)
 
-        if (ret=="ON\n\n"):
-            return True
-        else:
-            return False
+        return parse.boolean(ret)
 
     def outputOn(self, channel=None, wait=None):
-        if wait is None:
-            wait = self._wait
         str_ = (':OUTP{} ON').format(channel)
         self._instWrite(str_)
-        sleep(wait)             # give some time for PS to respond
+        self._complete(wait)    # wait for the command to take effect
 
     def outputOff(self, channel=None, wait=None):
-        if wait is None:
-            wait = self._wait
         str_ = (':OUTP{} OFF').format(channel)
         self._instWrite(str_)
-        sleep(wait)             # give some time for PS to respond
+        self._complete(wait)    # wait for the command to take effect
 
 
     # pulse
@@ -57,28 +72,19 @@ class RigolDG5000(SCPI):
         # amp: unit=Vpp
         # offset: unit=Vdc
         # delay: unit=s
-        if wait is None:
-            wait=self._wait
 
         str_=(":SOUR{}:APPL:PULS {},{},{},{}").format(channel,freq,amp,offset,
             delay)
         self._instWrite(str_)
-        sleep(wait)
+        self._complete(wait)
 
     def queryApply(self, channel=None):
         # ask what kind of pulse was applied
         str_=(":SOUR{}:APPL?").format(channel)
         ret=self._instQuery(str_)
-        ret=ret[:(len(ret)-2)] # remove '\n' from end of string
-        ret=ret.strip('"') # remove quotes from beginning and end of string
-        lst=ret.split(",") # split string into variables
-
-        for i in range(1,len(lst)):
-            # range(1,len(lst)) s.t. not converting waveform name to float
-            if lst[i]=="DEF":
-                lst[i]=0
-            else:
-                lst[i]=float(lst[i])
+        lst=parse.fields(ret) # split string into variables
+        # not converting waveform name to float
+        lst=[lst[0]]+[parse.number(x,_keywords) for x in lst[1:]]
         # lst='waveform name', 'freq', 'amp', 'offset', 'phase/delay'
         return lst
 
@@ -86,8 +92,6 @@ class RigolDG5000(SCPI):
         # set duty cycle
         # optional params min and max, to set min or max duty cycle
         # else, set by percentage
-        if wait is None:
-            wait=self._wait
 
         if Min: # set to minimum duty cycle
             str_=(":SOUR{}:PULS:DCYC MIN").format(channel)
@@ -97,20 +101,16 @@ class RigolDG5000(SCPI):
             str_=(":SOUR{}:PULS:DCYC {}").format(channel, pct)
 
         self._instWrite(str_)
-        sleep(wait)
+        self._complete(wait)
 
     def queryDutyCycle(self, channel=None):
         # ask for duty cycle as percentage
         str_=(":SOUR{}:PULS:DCYC?").format(channel)
         ret=self._instQuery(str_)
-        ret=ret.strip('"')
-        ret=float(ret)
-        return ret
+        return parse.number(ret)
 
     def pulseDelay(self,delay=None,channel=None,wait=None,Min=False,Max=False):
         # set pulse delay
-        if wait is None:
-            wait=self._wait
 
         if Min: # set minimum pulse delay
             str_=(":SOUR{}:PULS:DEL MIN").format(channel)
@@ -120,49 +120,36 @@ class RigolDG5000(SCPI):
             str_=(":SOUR{}:PULS:DEL {}").format(channel, delay)
 
         self._instWrite(str_)
-        sleep(wait)
+        self._complete(wait)
 
     def queryDelay(self, channel=None):
         # ask for pulse delay in seconds
         str_=(":SOUR{}:PULS:DEL?").format(channel)
         ret=self._instQuery(str_)
-        ret=ret.strip('"')
-        ret=float(ret)
-        return ret
+        return parse.number(ret)
 
     def holdWidth(self, channel=None, wait=None):
         # hold pulse width (instead of duty cycle)
-        if wait is None:
-            wait=self._wait
         str_=(":SOUR{}:PULS:HOLD WIDT").format(channel)
         self._instWrite(str_)
-        sleep(wait)
+        self._complete(wait)
 
     def holdDuty(self, channel=None, wait=None):
         # hold duty cycle (instead of pulse width)
-        if wait is None:
-            wait=self._wait
         str_=(":SOUR{}:PULS:HOLD DUTY").format(channel)
         self._instWrite(str_)
-        sleep(wait)
+        self._complete(wait)
 
     def isWidth(self, channel=None):
         #if not WIDT, DUTY
         # ask if holding pulse width or duty cycle
         str_=(":SOUR{}:PULS:HOLD?").format(channel)
         ret=self._instQuery(str_)
-        ret=ret.strip('"')
-
-        if ret=="WIDT\n":
-            return True
-        else:
-            return False
+        return parse.keyword(ret)=="WIDT"
 
     def transitionLeading(self,seconds=None,channel=None,wait=None,Min=False,
         Max=False):
         # set transition leading
-        if wait is None:
-            wait=self._wait
 
         if Min: # set transition leading to minimum
             str_=(":SOUR{}:PULS:TRAN MIN").format(channel)
@@ -172,21 +159,17 @@ class RigolDG5000(SCPI):
             str_=(":SOUR{}:PULS:TRAN {}").format(channel, seconds)
 
         self._instWrite(str_)
-        sleep(wait)
+        self._complete(wait)
 
     def queryTransLead(self, channel=None):
         # ask for transition leading in seconds
         str_=(":SOUR{}:PULS:TRAN?").format(channel)
         ret=self._instQuery(str_)
-        ret=ret.strip('"')
-        ret=float(ret)
-        return ret
+        return parse.number(ret)
 
     def transitionTrailing(self,seconds=None,channel=None,wait=None,Min=False,
         Max=False):
         # set transition trailing
-        if wait is None:
-            wait=self._wait
 
         if Min: # set transition trailing to minimum
             str_=(":SOUR{}:PULS:TRAN:TRA MIN").format(channel)
@@ -196,21 +179,17 @@ class RigolDG5000(SCPI):
             str_=(":SOUR{}:PULS:TRAN:TRA {}").format(channel, seconds)
 
         self._instWrite(str_)
-        sleep(wait)
+        self._complete(wait)
 
     def queryTransTrail(self, channel=None):
         # ask for transition trailing in seconds
         str_=(":SOUR{}:PULS:TRAN:TRA?").format(channel)
         ret=self._instQuery(str_)
-        ret=ret.strip('"')
-        ret=float(ret)
-        return ret
+        return parse.number(ret)
 
     def pulseWidth(self,seconds=None,channel=None,wait=None,Min=False,
         Max=False):
         # set pulse width
-        if wait is None:
-            wait=self._wait
 
         if Min: # set pulse width to minimum
             str_=(":SOUR{}:PULS:WIDT MIN").format(channel)
@@ -220,22 +199,18 @@ class RigolDG5000(SCPI):
             str_=(":SOUR{}:PULS:WIDT {}").format(channel, seconds)
 
         self._instWrite(str_)
-        sleep(wait)
+        self._complete(wait)
 
     def queryWidth(self, channel=None):
         # ask for pulse width in seconds
         str_=(":SOUR{}:PULS:WIDT?").format(channel)
         ret=self._instQuery(str_)
-        ret=ret.strip('"')
-        ret=float(ret)
-        return ret
+        return parse.number(ret)
 
     def setImpedance(self,ohms=None,channel=None,wait=None,inf=False,Min=False,
         Max=False):
         # set impedance
         # optional params for min or max, also for infinite (high Z)
-        if wait is None:
-            wait=self._wait
 
         if inf: # set high Z (infinite impedance)
             str_=(":OUTP{}:IMP INF").format(channel)
@@ -247,22 +222,19 @@ class RigolDG5000(SCPI):
             str_=(":OUTP{}:IMP {}").format(channel, ohms)
 
         self._instWrite(str_)
-        sleep(wait)
+        self._complete(wait)
 
     def queryImpedance(self, channel=None):
         # ask for impedance in ohms
         str_=(":OUTP{}:IMP?").format(channel)
         ret=self._instQuery(str_)
-        ret=ret.strip('"')
-        ret=float(ret)
-        return ret
+        return parse.number(ret)
 
     def isImpInf(self, channel=None):
         # ask if impedance is infinite
         str_=(":OUTP{}:IMP?").format(channel)
         ret=self._instQuery(str_)
-        ret=ret.strip('"')
-        ret=float(ret)
+        ret=parse.number(ret)
 
         if ret==inf:
             return True
@@ -271,118 +243,108 @@ class RigolDG5000(SCPI):
 
     def polarityNorm(self, channel=None, wait=None):
         # set polarity to normal
-        if wait is None:
-            wait=self._wait
         str_=(":OUTP{}:POL NORM").format(channel)
         self._instWrite(str_)
-        sleep(wait)
+        self._complete(wait)
 
     def polarityInv(self, channel=None, wait=None):
         # set polarity to inverted
-        if wait is None:
-            wait=self._wait
         str_=(":OUTP{}:POL INV").format(channel)
         self._instWrite(str_)
-        sleep(wait)
+        self._complete(wait)
 
     def isNorm(self, channel=None):
         # if not NORM, INV
         # ask if polarity is normal or inverted
         str_=(":OUTP{}:POL?").format(channel)
         ret=self._instQuery(str_)
-        ret=ret.strip('"')
-
-        if ret == "NORMAL\n\n":
-            return True
-        else:
-            return False
+        return parse.keyword(ret)=="NORMAL"
 
     def syncOn(self, channel=None, wait=None):
         # turn sync on
-        if wait is None:
-            wait=self._wait
         str_=(":OUTP{}:SYNC ON").format(channel)
         self._instWrite(str_)
-        sleep(wait)
+        self._complete(wait)
 
     def syncOff(self, channel=None, wait=None):
         # turn sync off
-        if wait is None:
-            wait=self._wait
         str_=(":OUTP{}:SYNC OFF").format(channel)
         self._instWrite(str_)
-        sleep(wait)
+        self._complete(wait)
 
     def isSyncOn(self, channel=None):
         # ask if sync is on or off
         str_=(":OUTP{}:SYNC?").format(channel)
         ret=self._instQuery(str_)
-        ret=ret.strip('"')
-
-        if ret=="ON\n":
-            return True
-        else:
-            return False
+        return parse.boolean(ret)
 
     def syncPolPos(self, channel=None, wait=None):
         # set sync polarity to positive
-        if wait is None:
-            wait=self._wait
         str_=(":OUTP{}:SYNC:POL POS").format(channel)
         self._instWrite(str_)
-        sleep(wait)
+        self._complete(wait)
 
     def syncPolNeg(self, channel=None, wait=None):
         # set sync polarity to negative
-        if wait is None:
-            wait=self._wait
         str_=(":OUTP{}:SYNC:POL NEG").format(channel)
         self._instWrite(str_)
-        sleep(wait)
+        self._complete(wait)
 
     def isSyncPolPos(self, channel=None):
         # if not POS, NEG
         # ask if sync polarity is positive or negative
         str_=(":OUTP{}:SYNC:POL?").format(channel)
         ret=self._instQuery(str_)
-        ret=ret.strip('"')
-
-        if ret=="POS\n":
-            return True
-        else:
-            return False
+        return parse.keyword(ret)=="POS"
 
     def saverOn(self, wait=None):
         # enable screensaver
-        if wait is None:
-            wait=self._wait
         str_=":DISP:SAV ON"
         self._instWrite(str_)
-        sleep(wait)
+        self._complete(wait)
 
     def saverOff(self, wait=None):
         # disable screensaver
-        if wait is None:
-            wait=self._wait
         str_=":DISP:SAV OFF"
         self._instWrite(str_)
-        sleep(wait)
+        self._complete(wait)
 
     def isSaverOn(self):
         # ask if screensaver enabled
         str_=":DISP:SAV?"
         ret=self._instQuery(str_)
-        ret=ret.strip('"')
-
-        if ret=="ON\n":
-            return True
-        else:
-            return False
+        return parse.boolean(ret)
 
     def saverImm(self, wait=None):
         # immediately enter screensaver state
-        if wait is None:
-            wait=self._wait
         str_=":DISP:SAV:IMM"
         self._instWrite(str_)
-        sleep(wait)
+        self._complete(wait)
+
+    # status
+    def snapshot(self, channel=None):
+        # ask for every output and pulse setting of a channel at once, as
+        # one compound query, and return them as a PulseSnapshot
+        str_=";".join(_snapshot_queries).format(channel)
+        ret=self._instQuery(str_)
+        lst=parse.fields(ret,";")
+
+        if len(lst)!=len(_snapshot_queries):
+            # firmware that does not answer compound queries in full, ask
+            # one at a time instead
+            lst=[]
+            for q in _snapshot_queries:
+                ret=self._instQuery(q.format(channel))
+                lst.append(parse.keyword(ret))
+
+        out,pol,imp,sync,syncpol,appl,dcyc,dly,hold,lead,trail,widt=lst
+        appl=parse.fields(appl) # waveform name, freq, amp, offset, delay
+        appl=[appl[0]]+[parse.number(a,_keywords) for a in appl[1:]]
+
+        return PulseSnapshot(output=parse.boolean(out),normal=(pol=="NORMAL"),
+            impedance=parse.number(imp),sync=parse.boolean(sync),
+            sync_pos=(syncpol=="POS"),waveform=appl[0],freq=appl[1],
+            amp=appl[2],offset=appl[3],delay=appl[4],
+            duty=parse.number(dcyc),pulse_delay=parse.number(dly),
+            hold_width=(hold=="WIDT"),lead=parse.number(lead),
+            trail=parse.number(trail),width=parse.number(widt))
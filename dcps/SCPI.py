@@ -35,21 +35,206 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
-from time import sleep
-import pyvisa
+from time import monotonic
+from math import copysign
+from contextlib import contextmanager
+from concurrent.futures import Future
+
+try:
+    from . import parse, resources, trace
+except ImportError:
+    import parse, resources, trace
+
+def readBlock(inst, out=None, chunk_size=None, trailer=1, max_prefix=64):
+    """Read an IEEE 488.2 definite length block from inst and return a
+    memoryview of the payload
+
+    The response may start with a header (ie. 'DAT2,') before the '#'
+    that starts the block. The header digit count and length are
+    parsed from '#N<len>' and exactly <len> payload bytes are read, in
+    chunks, into a preallocated buffer.
+
+    inst       - open PyVISA message based resource that is about to send a block
+    out        - optional writable buffer to read the payload into. It must be
+                 at least as large as the payload. If None, a bytearray is
+                 allocated.
+    chunk_size - number of bytes to request per read, defaults to inst.chunk_size
+    trailer    - number of bytes following the payload to read and discard
+                 (ie. the message terminator)
+    max_prefix - maximum number of bytes to skip while looking for '#'
+    """
+
+    # Skip anything in front of the block, one byte at a time
+    skipped = 0
+    while inst.read_bytes(1) != b'#':
+        skipped += 1
+        if skipped > max_prefix:
+            raise RuntimeError('No block header found in first {} bytes'.format(max_prefix))
+
+    digits = inst.read_bytes(1)
+    if not digits.isdigit() or digits == b'0':
+        # '#0' starts an indefinite length block which this cannot size
+        raise ValueError('Unexpected block header: "#{}"'.format(digits.decode(errors='replace')))
+
+    length = inst.read_bytes(int(digits))
+    if not length.isdigit():
+        raise ValueError('Unexpected block length: "{}"'.format(length.decode(errors='replace')))
+    length = int(length)
+
+    if out is None:
+        out = bytearray(length)
+    view = memoryview(out).cast('B')
+
+    if chunk_size is None:
+        chunk_size = inst.chunk_size
+
+    if len(view) < length:
+        # Drain the block so the next message starts cleanly
+        left = length + trailer
+        while left > 0:
+            left -= len(inst.read_bytes(min(chunk_size, left)))
+        raise ValueError('Buffer of {} bytes is too small for a block of {} bytes'.
+                             format(len(view), length))
+
+    pos = 0
+    while pos < length:
+        chunk = inst.read_bytes(min(chunk_size, length - pos))
+        view[pos:pos+len(chunk)] = chunk
+        pos += len(chunk)
+
+    if trailer:
+        inst.read_bytes(trailer)
+
+    return view[:length]
+
+class Batch(object):
+    """Commands collected by SCPI.batch() to be sent as compound messages
+
+    Writes and queries are joined with ';' into as few messages as the
+    instrument's input buffer allows. Each query gets a Future which
+    holds its reply once the message carrying it has been sent.
+    """
+
+    def __init__(self, scpi, max_len):
+        self._scpi = scpi
+        self._max_len = max_len
+        self._cmds = []          # commands not sent yet
+        self._futures = []       # one Future per query in _cmds
+        self._len = 0
+        self.complete = False    # a setter asked to wait for completion
+
+    def _add(self, cmd, future):
+        if (cmd[0] not in '*:'):
+            # ';' keeps the header path of the previous command, so go
+            # back to the root for every command
+            cmd = self._scpi._batch_root + cmd
+
+        if self._cmds and self._len + 1 + len(cmd) > self._max_len:
+            # would not fit in the input buffer, send what is there first
+            self.flush()
+
+        self._cmds.append(cmd)
+        self._len += len(cmd) + (1 if len(self._cmds) > 1 else 0)
+        if future is not None:
+            self._futures.append(future)
+
+    def write(self, cmd):
+        """Queue cmd to be sent with the next message"""
+        self._add(cmd, None)
+
+    def query(self, cmd):
+        """Queue cmd and return a Future for its reply"""
+        future = Future()
+        self._add(cmd, future)
+        return future
+
+    def flush(self):
+        """Send everything queued as one compound message and hand the
+        replies to their futures
+        """
+        if not self._cmds:
+            return
+
+        cmds, futures = self._cmds, self._futures
+        self._cmds, self._futures, self._len = [], [], 0
+        msg = ';'.join(cmds)
+        inst = self._scpi._inst
+
+        if not futures:
+            inst.write(msg)
+            return
+
+        try:
+            replies = inst.query(msg).split(';')
+            if len(replies) != len(futures):
+                # a reply held a ';' or the instrument did not answer each
+                # query. Throw away anything it still has to send and
+                # replay every command one at a time, writes included, so
+                # each query still follows the commands (ie. a channel
+                # select) that came before it.
+                inst.clear()
+                replies = []
+                for cmd in cmds:
+                    if '?' in cmd:
+                        replies.append(inst.query(cmd))
+                    else:
+                        inst.write(cmd)
+            for future, reply in zip(futures, replies):
+                future.set_result(reply)
+        except Exception as err:
+            for future in futures:
+                if not future.done():
+                    future.set_exception(err)
+            raise
+
+class RampAborted(RuntimeError):
+    """Raised by SCPI.ramp() when a readback shows the ramp must stop
+
+    The setpoints are left where the ramp got to, the outputs as they
+    are.
+
+    channel  - channel whose readback stopped the ramp
+    reason   - 'compliance', 'output off' or 'readback'
+    setpoint - last value the channel was set to
+    readback - (volts, amps, on) read from the channel
+    """
+
+    def __init__(self, channel, reason, setpoint, readback):
+        super(RampAborted, self).__init__(
+            'Ramp aborted on channel {}: {} at setpoint {} (read {} V, {} A)'.
+            format(channel, reason, setpoint, readback[0], readback[1]))
+        self.channel = channel
+        self.reason = reason
+        self.setpoint = setpoint
+        self.readback = readback
 
 class SCPI(object):
     """Basic class for controlling and accessing a Power Supply with Standard SCPI Commands"""
 
+    # prefix that returns a command to the root of the command tree when
+    # it follows a ';' in a compound message. Instruments with flat,
+    # non-SCPI commands set this to ''
+    _batch_root = ':'
+
+    # size of the instrument's input buffer in bytes, a batch never sends
+    # a longer message
+    _batch_max_len = 256
+
     def __init__(self, resource, max_chan=1, wait=1.0,
                      cmd_prefix = '',
                      read_termination = '',
-                     write_termination = ''):
+                     write_termination = '',
+                     completion = 'opc'):
         """Init the class with the instruments resource string
 
         resource   - resource string or VISA descriptor, like TCPIP0::172.16.2.13::INSTR
         max_chan   - number of channels in power supply
-        wait       - float that gives the default number of seconds to wait after sending each command
+        wait       - float that gives the number of seconds to wait after sending each command
+                     when completion is 'delay'
+        completion - how setters wait for a command to take effect:
+                     'opc'   - ask *OPC?, which answers once every preceding command is done
+                     'stb'   - send *OPC and poll the event status register until it is set
+                     'delay' - sleep for wait seconds, for instruments without *OPC
         cmd_prefix - optional command prefix (ie. some instruments require a ':' prefix)
         read_termination - optional read_termination parameter to pass to open_resource()
         write_termination - optional write_termination parameter to pass to open_resource()
@@ -57,22 +242,40 @@ class SCPI(object):
         self._resource = resource
         self._max_chan = max_chan                # number of channels
         self._wait = wait
+        if completion not in ('opc', 'stb', 'delay'):
+            raise ValueError('Invalid completion: {}'.format(completion))
+        self._completion = completion
+        self._poll = 0.01                        # seconds between 'stb' polls
+        self._timeout = 10.0                     # seconds before 'stb' gives up
         self._prefix = cmd_prefix
         self._curr_chan = 1                      # set the current channel to the first one
         self._read_termination = read_termination
         self._write_termination = write_termination
         self._inst = None        
+        self._batch = None       # Batch collecting commands, see batch()
 
-    def open(self):
-        """Open a connection to the VISA device with PYVISA-py python library"""
-        self._rm = pyvisa.ResourceManager('@py')
-        self._inst = self._rm.open_resource(self._resource,
+    def open(self, fresh=False):
+        """Open a connection to the VISA device with PYVISA-py python library
+
+        The session comes from the shared pool in dcps.resources, so
+        opening an instrument that was opened before reuses its session.
+
+        fresh - close any pooled session first and open a new one
+        """
+        self._rm = resources.resourceManager('@py')
+        self._inst = resources.openResource(self._resource, backend='@py',
+                                            fresh=fresh,
                                             read_termination=self._read_termination,
                                             write_termination=self._write_termination)
 
     def close(self):
-        """Close the VISA connection"""
-        self._inst.close()
+        """Close the VISA connection
+
+        The session goes back to the pool and stays open for the next
+        open(), use dcps.resources.closeResource() to really close it.
+        """
+        resources.release(self._inst)
+        self._inst = None
 
     @property
     def channel(self):
@@ -85,18 +288,82 @@ class SCPI(object):
                                  format(channel, 1, self._max_chan))
         self._curr_chan = value
 
+    @contextmanager
+    def batch(self, max_len=None):
+        """Collect the commands sent inside a with block into compound
+        messages, ie.
+
+            with psu.batch():
+                psu.setVoltage(5.0, 1)
+                psu.setCurrent(0.1, 1)
+                psu.outputOn(1)
+
+        sends the channel selects and settings as one message. Writes
+        are held until the block ends, the buffer fills up or a query
+        needs an answer; a driver query sends everything held so far
+        along with it and returns its reply as usual. Batch.query()
+        queues a query without sending and returns a Future instead.
+
+        max_len - longest message to send in bytes, defaults to
+                  _batch_max_len
+
+        Batches nest, an inner batch() joins the outer one.
+        """
+        if self._batch is not None:
+            yield self._batch
+            return
+
+        if max_len is None:
+            max_len = self._batch_max_len
+        self._batch = Batch(self, max_len)
+        try:
+            yield self._batch
+            self._batch.flush()
+            complete = self._batch.complete
+        finally:
+            self._batch = None
+
+        if complete:
+            # the setters inside left waiting to here, once for all of them
+            self._complete()
+
     def _instQuery(self, queryStr):
         if (queryStr[0] != '*'):
             queryStr = self._prefix + queryStr
-        #print("QUERY:",queryStr)
+        if self._batch is not None:
+            # the caller needs the reply now, so send the batch with it
+            future = self._batch.query(queryStr)
+            self._batch.flush()
+            return future.result()
         return self._inst.query(queryStr)
         
     def _instWrite(self, writeStr):
         if (writeStr[0] != '*'):
             writeStr = self._prefix + writeStr
-        #print("WRITE:",writeStr)
+        if self._batch is not None:
+            self._batch.write(writeStr)
+            return None
         return self._inst.write(writeStr)
         
+    def _instQueryBlock(self, queryStr, out=None, trailer=1):
+        """Send queryStr and return the definite length block response
+        as a memoryview, see readBlock()
+        """
+        if self._batch is not None:
+            # a block has to be read on its own
+            self._batch.flush()
+            return self._batchless(self._instQueryBlock, queryStr, out, trailer)
+        self._instWrite(queryStr)
+        return readBlock(self._inst, out=out, trailer=trailer)
+
+    def _batchless(self, func, *args):
+        """Call func with batching suspended"""
+        batch, self._batch = self._batch, None
+        try:
+            return func(*args)
+        finally:
+            self._batch = batch
+
     def _chStr(self, channel):
         """return the channel string given the channel number and using the format CHx"""
 
@@ -110,25 +377,49 @@ class SCPI(object):
     def _onORoff(self, str):
         """Check if string says it is ON or OFF and return True if ON
         and False if OFF
-        """
 
-        # Only check first two characters so do not need to deal with
-        # trailing whitespace and such
-        if str[:2] == 'ON':
-            return True
-        else:
-            return False
+        1 and 0, which some instruments answer instead, are understood
+        as well
+        """
+        return parse.boolean(str)
         
     def _waitCmd(self):
         """Wait until all preceeding commands complete"""
-        #self._instWrite('*WAI')
+        # *OPC? only answers once everything before it is done
+        self._instQuery('*OPC?')
+
+    def _pollCmd(self):
+        """Wait until all preceeding commands complete by polling the
+        Operation Complete bit of the event status register, for
+        instruments that time out on a long *OPC?
+        """
+        self._instQuery('*ESR?')        # clear any old events
         self._instWrite('*OPC')
-        wait = True
-        while(wait):
-            ret = self._instQuery('*OPC?')
-            if ret[0] == '1':
-                wait = False
-        
+        start = monotonic()
+        while not (parse.integer(self._instQuery('*ESR?')) & 1):
+            if monotonic() - start > self._timeout:
+                raise RuntimeError('Operation did not complete in {} seconds'.
+                                       format(self._timeout))
+            trace.sleep(self._poll, self._resource, 'poll *ESR?')
+
+    def _complete(self, wait=None):
+        """Return once the preceeding commands have taken effect
+
+        wait - if given, sleep this many seconds instead of using the
+               completion strategy
+        """
+        if wait is not None:
+            trace.sleep(wait, self._resource, 'complete')
+        elif self._batch is not None:
+            # nothing has been sent yet, wait once when the batch ends
+            self._batch.complete = True
+        elif self._completion == 'opc':
+            self._waitCmd()
+        elif self._completion == 'stb':
+            self._pollCmd()
+        else:
+            trace.sleep(self._wait, self._resource, 'complete')
+
     def idn(self):
         """Return response to *IDN? message"""
         return self._instQuery('*IDN?')
@@ -202,14 +493,9 @@ class SCPI(object):
             # If multi-channel device and channel parameter is passed, select it
             self._instWrite('INSTrument:NSELect {}'.format(self.channel))
                         
-        # If a wait time is NOT passed in, set wait to the
-        # default time
-        if wait is None:
-            wait = self._wait
-            
         str = 'OUTPut:STATe ON'
         self._instWrite(str)
-        sleep(wait)             # give some time for PS to respond
+        self._complete(wait)    # wait for the command to take effect
     
     def outputOff(self, channel=None, wait=None):
         """Turn off the output for channel
@@ -226,25 +512,15 @@ class SCPI(object):
             # If multi-channel device and channel parameter is passed, select it
             self._instWrite('INSTrument:NSELect {}'.format(self.channel))
             
-        # If a wait time is NOT passed in, set wait to the
-        # default time
-        if wait is None:
-            wait = self._wait
-            
         str = 'OUTPut:STATe OFF'
         self._instWrite(str)
-        sleep(wait)             # give some time for PS to respond
+        self._complete(wait)    # wait for the command to take effect
     
     def outputOnAll(self, wait=None):
         """Turn on the output for ALL channels
         
         """
 
-        # If a wait time is NOT passed in, set wait to the
-        # default time
-        if wait is None:
-            wait = self._wait
-
         for chan in range(1,self._max_chan+1):
             if (self._max_chan > 1):
                 # If multi-channel device, select next channel
@@ -252,18 +528,13 @@ class SCPI(object):
             
             self._instWrite('OUTPut:STATe ON')
             
-        sleep(wait)             # give some time for PS to respond
+        self._complete(wait)    # wait for the command to take effect
     
     def outputOffAll(self, wait=None):
         """Turn off the output for ALL channels
         
         """
 
-        # If a wait time is NOT passed in, set wait to the
-        # default time
-        if wait is None:
-            wait = self._wait
-
         for chan in range(1,self._max_chan+1):
             if (self._max_chan > 1):
                 # If multi-channel device, select next channel
@@ -271,7 +542,7 @@ class SCPI(object):
             
             self._instWrite('OUTPut:STATe OFF')
             
-        sleep(wait)             # give some time for PS to respond
+        self._complete(wait)    # wait for the command to take effect
     
     def setVoltage(self, voltage, channel=None, wait=None):
         """Set the voltage value for the channel
@@ -290,14 +561,9 @@ class SCPI(object):
             # If multi-channel device and channel parameter is passed, select it
             self._instWrite('INSTrument:NSELect {}'.format(self.channel))
             
-        # If a wait time is NOT passed in, set wait to the
-        # default time
-        if wait is None:
-            wait = self._wait
-            
         str = 'SOURce:VOLTage:LEVel:IMMediate:AMPLitude {}'.format(voltage)
         self._instWrite(str)
-        sleep(wait)             # give some time for PS to respond
+        self._complete(wait)    # wait for the command to take effect
         
     def setCurrent(self, current, channel=None, wait=None):
         """Set the current value for the channel
@@ -316,14 +582,9 @@ class SCPI(object):
             # If multi-channel device and channel parameter is passed, select it
             self._instWrite('INSTrument:NSELect {}'.format(self.channel))
             
-        # If a wait time is NOT passed in, set wait to the
-        # default time
-        if wait is None:
-            wait = self._wait
-            
         str = 'SOURce:CURRent:LEVel:IMMediate:AMPLitude {}'.format(current)
         self._instWrite(str)
-        sleep(wait)             # give some time for PS to respond
+        self._complete(wait)    # wait for the command to take effect
 
         
     def queryVoltage(self, channel=None):
@@ -344,7 +605,7 @@ class SCPI(object):
             
         str = 'SOURce:VOLTage:LEVel:IMMediate:AMPLitude?'
         ret = self._instQuery(str)
-        return float(ret)
+        return parse.number(ret)
     
     def queryCurrent(self, channel=None):
         """Return what current set value is (not the measured current,
@@ -364,7 +625,7 @@ class SCPI(object):
             
         str = 'SOURce:CURRent:LEVel:IMMediate:AMPLitude?'
         ret = self._instQuery(str)
-        return float(ret)
+        return parse.number(ret)
     
     def measureVoltage(self, channel=None):
         """Read and return a voltage measurement from channel
@@ -383,7 +644,7 @@ class SCPI(object):
             
         str = 'MEASure:VOLTage:DC?'
         val = self._instQuery(str)
-        return float(val)
+        return parse.number(val)
     
     def measureCurrent(self, channel=None):
         """Read and return a current measurement from channel
@@ -402,7 +663,7 @@ class SCPI(object):
             
         str = 'MEASure:CURRent:DC?'
         val = self._instQuery(str)
-        return float(val)
+        return parse.number(val)
     
     def setVoltageProtection(self, ovp, delay=None, channel=None, wait=None):
         """Set the over-voltage protection value for the channel
@@ -422,19 +683,14 @@ class SCPI(object):
             # If multi-channel device and channel parameter is passed, select it
             self._instWrite('INSTrument:NSELect {}'.format(self.channel))
             
-        # If a wait time is NOT passed in, set wait to the
-        # default time
-        if wait is None:
-            wait = self._wait
-            
         str = 'SOURce:VOLTage:PROTection:LEVel {}'.format(ovp)
         self._instWrite(str)
-        sleep(wait)             # give some time for PS to respond
+        self._complete(wait)    # wait for the command to take effect
         
         if delay is not None:
             str = 'SOURce:VOLTage:PROTection:DELay {}'.format(delay)
             self._instWrite(str)
-            sleep(wait)             # give some time for PS to respond
+            self._complete(wait)    # wait for the command to take effect
         
     def queryVoltageProtection(self, channel=None):
         """Return what the over-voltage protection set value is
@@ -453,7 +709,7 @@ class SCPI(object):
             
         str = 'SOURce:VOLTage:PROTection:LEVel?'
         ret = self._instQuery(str)
-        return float(ret)
+        return parse.number(ret)
     
     def voltageProtectionOn(self, channel=None, wait=None):
         """Enable Over-Voltage Protection on the output for channel
@@ -471,14 +727,9 @@ class SCPI(object):
             # If multi-channel device and channel parameter is passed, select it
             self._instWrite('INSTrument:NSELect {}'.format(self.channel))
                         
-        # If a wait time is NOT passed in, set wait to the
-        # default time
-        if wait is None:
-            wait = self._wait
-            
         str = 'SOURce:VOLTage:PROTection:STATe ON'
         self._instWrite(str)
-        sleep(wait)             # give some time for PS to respond
+        self._complete(wait)    # wait for the command to take effect
     
     def voltageProtectionOff(self, channel=None, wait=None):
         """Disable Over-Voltage Protection on the output for channel
@@ -495,13 +746,191 @@ class SCPI(object):
             # If multi-channel device and channel parameter is passed, select it
             self._instWrite('INSTrument:NSELect {}'.format(self.channel))
             
-        # If a wait time is NOT passed in, set wait to the
-        # default time
-        if wait is None:
-            wait = self._wait
-            
         str = 'SOURce:VOLTage:PROTection:STATe OFF'
         self._instWrite(str)
-        sleep(wait)             # give some time for PS to respond
+        self._complete(wait)    # wait for the command to take effect
+
+    def _readback(self, channels):
+        """Return {channel: (volts, amps, on)} as measured on each of
+        channels, for ramp() to check its steps against
+
+        Drivers that can read these in fewer messages override it.
+        """
+        return {ch: (self.measureVoltage(ch), self.measureCurrent(ch),
+                     self.isOutputOn(ch))
+                    for ch in channels}
+
+    def ramp(self, quantity, target, rate, step, channels=None,
+                 tolerance=None, compliance=0.98, settle=1.0, progress=None):
+        """Ramp the voltage or current of one or more channels to target
+        in steps, and return {channel: value} of where they ended up
+
+        Every step sets all the channels that still have to move in one
+        batch, waits for the instrument to complete it and reads back
+        every channel before the next, which starts once rate allows it.
+        No step is larger than step, so an instrument too slow for rate
+        makes for a slower ramp rather than a steeper one, and no time
+        is spent sleeping a fixed wait. Channels whose output is on are
+        checked after each step, and the ramp stops with RampAborted
+        when one of them
+
+          - turns off, ie. a protection trip
+          - reaches compliance, its measured current (voltage when
+            ramping current) at compliance times its limit, ie. a
+            voltage ramp that drove the load into current limiting
+          - does not read back within tolerance of its setpoint in
+            settle seconds
+
+        The last two only apply to a channel that regulates the
+        quantity being ramped when the ramp starts. Ramping the current
+        of a channel in constant voltage (or the voltage of one in
+        constant current) only moves a limit, which its readback does
+        not follow.
+
+        quantity   - 'V' or 'I'
+        target     - value to ramp to, or a dict of {channel: value} to
+                     ramp several channels to different values at once
+        rate       - volts or amps per second
+        step       - largest change of a single step, in volts or amps
+        channels   - channels to ramp to a single target, defaults to
+                     the current channel
+        tolerance  - largest difference between setpoint and readback,
+                     defaults to step
+        compliance - fraction of the limit that counts as compliance,
+                     None to not check
+        settle     - seconds a readback may take to come within tolerance
+        progress   - called as progress(setpoints, readbacks) after each
+                     step, both dicts by channel
+        """
+        if quantity == 'V':
+            setter, getter, limiter = (self.setVoltage, self.queryVoltage,
+                                       self.queryCurrent)
+        elif quantity == 'I':
+            setter, getter, limiter = (self.setCurrent, self.queryCurrent,
+                                       self.queryVoltage)
+        else:
+            raise ValueError('Invalid quantity: {}'.format(quantity))
+        if rate <= 0 or step <= 0:
+            raise ValueError('rate and step must be positive')
+
+        if isinstance(target, dict):
+            targets = dict(target)
+        else:
+            if channels is None:
+                channels = [self.channel]
+            targets = {ch: target for ch in channels}
+        if tolerance is None:
+            tolerance = step
+
+        values = {ch: getter(ch) for ch in targets}
+        limits = {ch: limiter(ch) for ch in targets}
+        checked = {}
+        for ch, (volts, amps, on) in self._readback(list(targets)).items():
+            if on:
+                # True if the channel regulates quantity, False if
+                # quantity is only its limit
+                checked[ch] = (self._regulating(quantity, values[ch],
+                                                limits[ch], volts, amps)
+                                   == quantity)
+
+        interval = step / rate
+        start = monotonic()
+        n = 0
+        while True:
+            moving = {}
+            for ch, value in values.items():
+                delta = targets[ch] - value
+                if delta:
+                    # rounded so a setting is never sent as 0.30000000000000004
+                    moving[ch] = (targets[ch] if abs(delta) <= step else
+                                      round(value + copysign(step, delta), 9))
+            if not moving:
+                return values
+
+            if n:
+                delay = start + n * interval - monotonic()
+                if delay > 0:
+                    trace.sleep(delay, self._resource, 'ramp')
+            n += 1
+
+            with self.batch() as batch:
+                for ch, value in moving.items():
+                    setter(value, ch)
+                if self._completion == 'delay':
+                    # the readbacks below are only answered once the
+                    # settings are done, no need to sleep as well
+                    batch.complete = False
+            values.update(moving)
+
+            readbacks = self._rampCheck(quantity, values, limits, checked,
+                                        tolerance, compliance, settle)
+            if progress is not None:
+                progress(dict(values), readbacks)
+
+    @staticmethod
+    def _regulating(quantity, setpoint, limit, volts, amps):
+        """Return 'V' if a channel is in constant voltage, 'I' if it is
+        in constant current
+
+        setpoint - setting of quantity, limit the setting of the other
+        volts    - measured voltage
+        amps     - measured current
+
+        A channel regulates whichever output is the larger fraction of
+        its setting, and voltage when both are 0.
+        """
+        vset, iset = ((setpoint, limit) if quantity == 'V' else
+                          (limit, setpoint))
+        return 'I' if amps * vset > volts * iset else 'V'
+
+    def _rampCheck(self, quantity, values, limits, checked, tolerance,
+                       compliance, settle):
+        """Read back every channel of a ramp and return the readbacks,
+        raising RampAborted if one of checked is off. Those that regulate
+        quantity (checked[ch] is True) also raise it in compliance or
+        when not within tolerance of their setpoint after settle seconds.
+        """
+        deadline = monotonic() + settle
+        while True:
+            readbacks = self._readback(list(values))
+            late = None
+            for ch, regulated in checked.items():
+                volts, amps, on = readbacks[ch]
+                measured, other = ((volts, amps) if quantity == 'V' else
+                                       (amps, volts))
+                if not on:
+                    raise RampAborted(ch, 'output off', values[ch],
+                                          readbacks[ch])
+                if not regulated:
+                    # quantity is only a limit, the output follows the
+                    # other setting
+                    continue
+                if (compliance is not None and
+                        other >= compliance * limits[ch]):
+                    raise RampAborted(ch, 'compliance', values[ch],
+                                          readbacks[ch])
+                if late is None and abs(measured - values[ch]) > tolerance:
+                    late = ch
+            if late is None:
+                return readbacks
+            if monotonic() > deadline:
+                raise RampAborted(late, 'readback', values[late],
+                                      readbacks[late])
+            # give the output time to move before reading it again
+            trace.sleep(self._poll, self._resource, 'ramp settle')
+
+    def rampProfile(self, quantity, segments, step, **kwargs):
+        """Run ramp() through segments one after the other and return
+        where the last one ended up
+
+        segments - list of (target, rate), ie. [(5.0, 1.0), (12.0, 0.5)]
+                   for 1 V/s up to 5 V, then 0.5 V/s up to 12 V
+
+        The other arguments are passed on to ramp().
+        """
+        values = None
+        for target, rate in segments:
+            values = self.ramp(quantity, target, rate, step, **kwargs)
+        return values
     
 
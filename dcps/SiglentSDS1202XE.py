@@ -1,8 +1,19 @@
 # Laurel Carpenter
 # 07/28/2021
 
-import visa
-from time import sleep
+from time import monotonic
+from threading import RLock
+import numpy as np
+
+try:
+    from .SCPI import readBlock
+except ImportError:
+    from SCPI import readBlock
+
+try:
+    from . import parse, resources, trace
+except ImportError:
+    import parse, resources, trace
 
 
 """
@@ -11,11 +22,49 @@ uses SCPI commands but does not inherit SCPI class because... ???
 something about chunk_size and timeout I think
 """
 
+def timeAxis(npts,tdiv,sara):
+    # sample times, trigger sits 7 divisions from the left
+    return np.arange(npts)/sara-tdiv*7
+
+def decodeWaveform(data,vdiv,ofst,tdiv,sara):
+    # convert raw int8 samples to (times, voltages) arrays
+    # each code is 1/25 of a division
+    volts=data*(vdiv/25)-ofst
+    return timeAxis(len(data),tdiv,sara),volts
+
+
+class WaveformSet(object):
+    # n captures of one channel, kept as the raw int8 codes
+    # raw: (n, npts) int8, times: (npts,) shared time axis
+    # vdiv, ofst: (n,) settings each capture was taken with
+    def __init__(self,raw,times,vdiv,ofst):
+        self.raw=raw
+        self.times=times
+        self.vdiv=vdiv
+        self.ofst=ofst
+
+    def __len__(self):
+        return len(self.raw)
+
+    def volts(self,i=None):
+        # scale to volts only when asked for
+        # i: capture index, None for an (n, npts) array of all captures
+        if i is None:
+            return (self.raw*(self.vdiv/25)[:,None]-self.ofst[:,None])
+        return self.raw[i]*(self.vdiv[i]/25)-self.ofst[i]
+
+
+
 class SiglentSDS1202XE(object):
     def __init__(self,resource,wait=0.5,max_channels=2,
             read_termination='',write_termination='/r/n',
-            chunk_size=20*1024**2,timeout=30000):
+            chunk_size=20*1024**2,timeout=30000,refresh=1.0,completion='opc'):
             # chunk size and timeout must be larger in order to read waveforms
+            # refresh: seconds before cached scale settings are re-read,
+            # None to only re-read them after one of the set_ functions
+            # completion: how the set_ functions wait for the scope, 'opc'
+            # to ask *OPC? (answers once the setting has taken effect) or
+            # 'delay' to sleep for wait seconds
 
         self.resource=resource
         self.wait=wait
@@ -24,53 +73,115 @@ class SiglentSDS1202XE(object):
         self.write_termination=write_termination
         self.chunk_size=chunk_size
         self.timeout=timeout
+        self.refresh=refresh
+        if completion not in ('opc','delay'):
+            raise ValueError(("Invalid completion: {}").format(completion))
+        self.completion=completion
+
+        self._scale={} # cached [vdiv,ofst,tdiv,sara] for each channel
+        self._scale_time={} # when each channel's settings were read
+
+        # held for every exchange with the scope, so the driver can be
+        # shared between the GUI and an acquisition thread
+        self.lock=RLock()
 
         self.open_inst()
         self.chdr_off()
         self.msiz_14m()
 
-    def open_inst(self):
-        rm=visa.ResourceManager()
-        self.inst=rm.open_resource(self.resource,chunk_size=self.chunk_size,
-            timeout=self.timeout)
+    def open_inst(self,fresh=False):
+        # the session comes from the shared pool in dcps.resources
+        # fresh: close any pooled session first and open a new one
+        self.inst=resources.openResource(self.resource,fresh=fresh,
+            chunk_size=self.chunk_size,timeout=self.timeout)
 
     def close_inst(self):
-        self.inst.close()
+        # hands the session back to the pool, which keeps it open
+        resources.release(self.inst)
+
+    def write(self,cmd):
+        with self.lock:
+            return self.inst.write(cmd)
+
+    def query(self,cmd):
+        with self.lock:
+            return self.inst.query(cmd)
+
+    def complete(self,wait=None):
+        # return once the commands sent so far have taken effect
+        # wait: seconds to sleep instead, if given
+        if wait is not None:
+            trace.sleep(wait,self.resource,'complete')
+        elif self.completion=='opc':
+            self.query("*OPC?")
+        else:
+            trace.sleep(self.wait,self.resource,'complete')
 
     def chdr_off(self):
-        self.inst.write("CHDR OFF")
+        self.write("CHDR OFF")
         # tells machine to send shortened responses
 
 
     def msiz_14m(self):
         # sets memory size to 14 M
-        if self.inst.query("MSIZ?") != "14M\n":
-            self.inst.write("MSIZ 14M")
+        if parse.keyword(self.query("MSIZ?"))!="14M":
+            self.write("MSIZ 14M")
+            self.invalidate() # sampling rate follows memory size
 
     def query_ofst(self,channel):
         # query voltage offset
-        ret=self.inst.query(("C{}:OFST?").format(channel))
-        return float(ret)
+        ret=self.query(("C{}:OFST?").format(channel))
+        return parse.number(ret)
 
     def query_vdiv(self,channel):
         # query voltage divisions
-        ret=self.inst.query(("C{}:VDIV?").format(channel))
-        return float(ret)
+        ret=self.query(("C{}:VDIV?").format(channel))
+        return parse.number(ret)
 
     def query_tdiv(self):
         # query time divisions
-        ret=self.inst.query("TDIV?")
-        return float(ret)
+        ret=self.query("TDIV?")
+        return parse.number(ret)
 
     def query_sara(self):
         # query sampling rate
-        ret=self.inst.query("SARA?")
-        return float(ret)
+        ret=self.query("SARA?")
+        return parse.number(ret)
 
     def query_trdl(self):
         # query trigger delay (time offset)
-        ret=self.inst.query("TRDL?")
-        return float(ret)
+        ret=self.query("TRDL?")
+        return parse.number(ret)
+
+    def invalidate(self,channel=None):
+        # forget cached scale settings for channel (all channels if None)
+        # so the next capture reads them from the scope again
+        if channel is None:
+            self._scale.clear()
+        else:
+            self._scale.pop(channel,None)
+
+    def query_scale(self,channel):
+        # query vdiv, ofst, tdiv and sara in one compound query
+        ret=self.query(("C{0}:VDIV?;C{0}:OFST?;TDIV?;SARA?").format(
+            channel))
+        lst=parse.fields(ret,';')
+        if len(lst)!=4:
+            # compound reply not understood, ask one at a time
+            return [self.query_vdiv(channel),self.query_ofst(channel),
+                self.query_tdiv(),self.query_sara()]
+        return [parse.number(x) for x in lst]
+
+    def scale(self,channel):
+        # return [vdiv,ofst,tdiv,sara] for channel
+        # settings are cached, and only re-read when stale
+        with self.lock:
+            now=monotonic()
+            if (channel not in self._scale) or ((self.refresh is not None) and
+                    (now-self._scale_time[channel]>self.refresh)):
+                self._scale[channel]=self.query_scale(channel)
+                self._scale_time[channel]=now
+            return self._scale[channel]
 
     def set_vdiv(self,channel,vdiv,wait=None):
         # set voltage divisions
@@ -82,10 +193,9 @@ class SiglentSDS1202XE(object):
             vdiv="500UV" # change unicode mu to letter u
         vdiv.replace(' ','') # get rid of space in '10 mV'
         vdiv=vdiv.upper() # set unit uppercase
-        self.inst.write(("C{}:VDIV {}").format(channel,vdiv))
-        if wait is None:
-            wait=self.wait
-        sleep(wait)
+        self.write(("C{}:VDIV {}").format(channel,vdiv))
+        self.invalidate(channel)
+        self.complete(wait)
 
     def set_ofst(self,channel,ofst,unit,wait=None):
         # set voltage offset
@@ -93,10 +203,9 @@ class SiglentSDS1202XE(object):
         if unit=="\u03BCV":
             unit="UV" # change unicode mu to letter u
         unit=unit.upper() # set unit uppercase
-        self.inst.write(("C{}:OFST {}{}").format(channel,ofst,unit))
-        if wait is None:
-            wait=self.wait
-        sleep(wait)
+        self.write(("C{}:OFST {}{}").format(channel,ofst,unit))
+        self.invalidate(channel)
+        self.complete(wait)
 
     def set_tdiv(self,tdiv,unit,wait=None):
         # set time divisions
@@ -110,10 +219,9 @@ class SiglentSDS1202XE(object):
         elif (unit=='s') and ((tdiv=='200') or (tdiv=='500')):
             tdiv='100' # can't set tdiv to 200 or 500 S, so set to max (100 S)
         unit=unit.upper() # set unit uppercase
-        self.inst.write(("TDIV {}{}").format(tdiv,unit))
-        if wait is None:
-            wait=self.wait
-        sleep(wait)
+        self.write(("TDIV {}{}").format(tdiv,unit))
+        self.invalidate() # tdiv (and sara) are shared by all channels
+        self.complete(wait)
 
     def set_trdl(self,trdl,unit,wait=None):
         # set trigger delay
@@ -128,41 +236,63 @@ class SiglentSDS1202XE(object):
         else:
             mult=1
 
-        if (trdl*mult)<=(self.tdiv*10):
+        tdiv=self.scale(1)[2]
+        if (trdl*mult)<=(tdiv*10):
             unit=unit.upper()
-            self.inst.write(("TRDL {}{}").format(trdl,unit))
-            if wait is None:
-                wait=self.wait
-            sleep(wait)
+            self.write(("TRDL {}{}").format(trdl,unit))
+            self.invalidate()
+            self.complete(wait)
+
+    def getWaveformRaw(self,channel,out=None):
+        # return unscaled waveform data as an int8 array
+        # out: optional int8 array to read the data into
+        with self.lock:
+            self.write(("C{}:WF? DAT2").format(channel))
+            # block is followed by two message end bits
+            block=readBlock(self.inst,out=out,trailer=2)
+        if out is not None and len(block)!=len(out):
+            raise RuntimeError(("Expected {} points, got {}").format(len(out),
+                len(block)))
+        return np.frombuffer(block,dtype=np.int8) # no copy is made
+
+    def getWaveformArray(self,channel):
+        # return waveform data as numpy arrays
+        data=self.getWaveformRaw(channel)
+        vdiv,ofst,tdiv,sara=self.scale(channel)
+        return decodeWaveform(data,vdiv,ofst,tdiv,sara)
 
     def getWaveform(self,channel):
-        # return waveform data
-        self.inst.write(("C{}:WF? DAT2").format(channel))
-        ret=list(self.inst.read_raw())[15:]
-        ret.pop() # remove last two items (message end bits)
-        ret.pop()
-        ret.pop(0) # remove message start bit
-        vdiv=self.query_vdiv(channel)
-        ofst=self.query_ofst(channel)
-
-        vlist=[]
-        # calculate correct voltages
-        for v in ret:
-            if v>127:
-                v=v-255
-            v=(v/25*vdiv-ofst)
-            vlist.append(v)
-
-        tdiv=self.query_tdiv()
-        sara=self.query_sara()
-
-        tlist=[]
-        # calculate correct times
-        for i in range(len(vlist)):
-            t=-tdiv*7+i/sara
-            tlist.append(t)
-
-        return tlist,vlist
+        # return waveform data as lists, for older callers
+        t,v=self.getWaveformArray(channel)
+        return t.tolist(),v.tolist()
+
+    def capture_many(self,channel,n):
+        # capture n waveforms into one preallocated (n, npts) int8 array
+        # every capture must have the same number of points
+        first=self.getWaveformRaw(channel)
+        raw=np.empty((n,len(first)),dtype=np.int8)
+        vdiv=np.empty(n)
+        ofst=np.empty(n)
+
+        raw[0]=first
+        vdiv[0],ofst[0],tdiv,sara=self.scale(channel)
+        for i in range(1,n):
+            self.getWaveformRaw(channel,out=raw[i])
+            vdiv[i],ofst[i]=self.scale(channel)[:2]
+
+        return WaveformSet(raw,timeAxis(raw.shape[1],tdiv,sara),vdiv,ofst)
+
+    def capture_stream(self,channel,n,sink):
+        # capture n waveforms and hand each one to sink as it arrives
+        # sink.append(raw,vdiv,ofst,tdiv,sara), ie. a WaveformWriter
+        # one buffer is reused, so memory stays flat for any n
+        buf=None
+        for i in range(n):
+            if buf is None:
+                buf=np.array(self.getWaveformRaw(channel))
+            else:
+                self.getWaveformRaw(channel,out=buf)
+            sink.append(buf,*self.scale(channel))
 
     def waveformSetup(self, FP=None, NP=None, SP=None, wait=None):
         #FP: First point
@@ -189,37 +319,27 @@ class SiglentSDS1202XE(object):
         if SP is None:
             SP=self.querySetup()[2]
 
-        self.inst.write(("WFSU? FP,{},NP,{},SP,{}").format(FP,NP,SP))
+        self.write(("WFSU FP,{},NP,{},SP,{}").format(FP,NP,SP))
         # default: FP=0,NP=1000,SP=4
-        if wait is None:
-            wait=self.wait
-        sleep(wait)
+        self.complete(wait)
 
     def querySetup(self):
-        ret=self.inst.query("WFSU?")
-        ret=ret.strip("'")
-        lst=ret.split(',')
-        return [float(lst[1]),float(lst[3]),float(lst[5])]
+        ret=self.query("WFSU?")
+        setup=parse.pairs(ret)
+        return [setup['FP'],setup['NP'],setup['SP']]
         # format: [FP,NP,SP]
 
     def startAcq(self,wait=None):
         # start signal acquisition
-        self.inst.write("TRMD AUTO")
-        if wait is None:
-            wait=self.wait
-        sleep(wait)
+        self.write("TRMD AUTO")
+        self.complete(wait)
 
     def stopAcq(self,wait=None):
         # stop signal acquisition
-        self.inst.write("STOP")
-        if wait is None:
-            wait=self.wait
-        sleep(wait)
+        self.write("STOP")
+        self.complete(wait)
 
     def isAcq(self):
         # ask if currently acquiring signal
-        ret=self.inst.query("TRMD?")
-        if ret=="STOP\n":
-            return False
-        else:
-            return True
+        ret=self.query("TRMD?")
+        return parse.keyword(ret)!="STOP"
@@ -1,6 +1,19 @@
 
+# Shared VISA resource managers and sessions
+from dcps import resources
+from dcps.resources import openAll
+
+# Per-command timing of the instrument traffic
+from dcps import trace
+
+# Parsing of instrument replies, shared by every driver
+from dcps import parse
+
+# Simulated instruments, opened with SIM:: resource strings
+from dcps import sim
+
 # Standard SCPI commands
-from dcps.SCPI import SCPI
+from dcps.SCPI import SCPI, RampAborted
 
 # Support of Rigol DP832A and other DP800 power supplies
 from dcps.RigolDP800 import RigolDP800
@@ -21,3 +34,6 @@ from dcps.BK9115 import BK9115
 from dcps.NewportESP301 import NewportESP301
 
 from dcps.SiglentSDS1202XE import SiglentSDS1202XE
+
+# asyncio access to any of the above
+from dcps.aio import AsyncInstrument
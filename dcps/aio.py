@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#-------------------------------------------------------------------------------
+#  asyncio access to the dcps instrument classes
+#
+#  VISA calls block, so every call is run on an executor thread. Each
+#  resource gets its own single thread executor: calls to one instrument
+#  stay in order while calls to different instruments overlap.
+#-------------------------------------------------------------------------------
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+# one single thread executor per resource string
+_executors = {}
+_executors_lock = Lock()
+
+def resourceOf(driver):
+    """Return the resource string of a dcps driver
+
+    SCPI based classes keep it in _resource, SiglentSDS1202XE and
+    NewportESP301 in resource.
+    """
+    resource = getattr(driver, '_resource', None)
+    if resource is None:
+        resource = getattr(driver, 'resource', None)
+    if resource is None:
+        raise ValueError('Cannot tell the resource of {!r}'.format(driver))
+    return resource
+
+def executor(resource):
+    """Return the executor that runs every call for resource, creating it
+    the first time
+    """
+    with _executors_lock:
+        ex = _executors.get(resource)
+        if ex is None:
+            ex = ThreadPoolExecutor(max_workers=1,
+                                    thread_name_prefix='dcps {}'.format(resource))
+            _executors[resource] = ex
+        return ex
+
+def shutdown(wait=True):
+    """Stop all executor threads, ie. before the program exits"""
+    with _executors_lock:
+        executors = list(_executors.values())
+        _executors.clear()
+    for ex in executors:
+        ex.shutdown(wait=wait)
+
+class AsyncInstrument(object):
+    """Wrap a dcps driver so every method can be awaited
+
+        psu = AsyncInstrument(AimTTiCPX400DP(resource))
+        await psu.open()
+        volts = await psu.measureVoltage(1)
+
+    Each method of the driver becomes a coroutine function taking the
+    same arguments, which runs the method on the resource's executor.
+    query() and write() send a raw command, whatever the driver calls
+    its own accessors.
+
+    The wrapped driver is still available as .sync. Calls through both
+    at once are not serialised, so use one or the other while awaited
+    calls are in flight.
+    """
+
+    def __init__(self, driver):
+        """driver - an instance of any dcps instrument class"""
+        self.sync = driver
+        self.resource = resourceOf(driver)
+        self._executor = executor(self.resource)
+
+    def run(self, func, *args, **kwargs):
+        """Run func(*args, **kwargs) on this instrument's executor and
+        return an awaitable for its result
+        """
+        loop = asyncio.get_running_loop()
+        return loop.run_in_executor(self._executor,
+                                    functools.partial(func, *args, **kwargs))
+
+    def __getattr__(self, name):
+        # only called for names not found on the wrapper itself
+        attr = getattr(self.sync, name)
+        if not callable(attr):
+            return attr
+
+        @functools.wraps(attr)
+        async def call(*args, **kwargs):
+            return await self.run(attr, *args, **kwargs)
+        return call
+
+    async def query(self, queryStr):
+        """Send queryStr and return the response"""
+        if hasattr(self.sync, '_instQuery'):
+            return await self.run(self.sync._instQuery, queryStr)
+        if hasattr(self.sync, 'query'):
+            return await self.run(self.sync.query, queryStr)
+        return await self.run(self.sync.inst.query, queryStr)
+
+    async def write(self, writeStr):
+        """Send writeStr"""
+        if hasattr(self.sync, '_instWrite'):
+            return await self.run(self.sync._instWrite, writeStr)
+        if hasattr(self.sync, 'write'):
+            return await self.run(self.sync.write, writeStr)
+        return await self.run(self.sync.inst.write, writeStr)
+
+async def gather(*calls):
+    """Await calls to several instruments at once and return their
+    results in order, so polling takes as long as the slowest
+    instrument rather than the sum of all of them
+
+        v, snap = await gather(psu.measureVoltage(1), pulser.snapshot(1))
+    """
+    return await asyncio.gather(*calls)
+
+
+if __name__ == '__main__':
+    # time polling several instruments one after another and together,
+    # using stand ins that take a fixed time to answer
+    from time import sleep, perf_counter
+
+    class Slow(object):
+        def __init__(self, resource, delay):
+            self.resource = resource
+            self.delay = delay
+
+        def query(self, queryStr):
+            sleep(self.delay)
+            return queryStr
+
+    insts = [AsyncInstrument(Slow('SLOW{}'.format(i), 0.1 * (i + 1)))
+                 for i in range(4)]
+
+    async def main():
+        start = perf_counter()
+        for inst in insts:
+            await inst.query('*IDN?')
+        print('one at a time: {:.2f} s'.format(perf_counter() - start))
+
+        start = perf_counter()
+        await gather(*[inst.query('*IDN?') for inst in insts])
+        print('together:      {:.2f} s'.format(perf_counter() - start))
+
+    asyncio.run(main())
+    shutdown()
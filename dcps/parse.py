@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#-------------------------------------------------------------------------------
+#  Parse instrument replies
+#
+#  Every driver turns its replies into numbers, booleans and lists with
+#  these functions, so they all accept the same things: surrounding
+#  whitespace and termination characters, quotes, and the keywords SCPI
+#  uses for special values. The grammars are compiled once, when the
+#  module is imported, and the common case of a bare number or ON/OFF
+#  never reaches a regular expression at all.
+#
+#  python -m dcps.parse times each of them per reply.
+#-------------------------------------------------------------------------------
+
+import re
+
+class ResponseError(RuntimeError, ValueError):
+    """A reply that does not parse as what was asked for
+
+    It is both a RuntimeError and a ValueError, the two the drivers
+    raised for a bad reply before they shared this module.
+    """
+
+_NUMBER = r'[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?'
+
+# 'V1 5.000' (Aim TTi setting) or 'V 5.000' (EL302P)
+_TAGGED = re.compile(r'\s*([A-Za-z]+)(\d*)\s+(' + _NUMBER + ')')
+
+# '5.003V' (Aim TTi measurement)
+_MEASURED = re.compile(r'\s*(' + _NUMBER + r')\s*([A-Za-z]+)')
+
+_BOOLEANS = {'1': True, 'ON': True, 'TRUE': True,
+             '0': False, 'OFF': False, 'FALSE': False}
+
+def _error(reply):
+    return ResponseError('Unexpected response: "{}"'.format(reply))
+
+def keyword(reply):
+    """Return reply without the whitespace, termination and quotes
+    around it, ie. 'NORMAL' for '"NORMAL"\\n'
+    """
+    return reply.strip().strip('"\'').strip()
+
+def number(reply, keywords=None):
+    """Return a numeric reply as a float
+
+    keywords - dict of words the instrument may send instead of a
+               number and what they stand for, ie. {'DEF': 0}
+
+    Besides what float() takes (which includes INF and NAN) the number
+    may be quoted.
+    """
+    try:
+        return float(reply)
+    except ValueError:
+        pass
+    word = keyword(reply)
+    if keywords is not None and word in keywords:
+        return keywords[word]
+    try:
+        return float(word)
+    except ValueError:
+        raise _error(reply) from None
+
+def integer(reply):
+    """Return a numeric reply as an int, ie. the *ESR? register"""
+    try:
+        return int(reply)
+    except ValueError:
+        pass
+    value = number(reply)
+    if value != int(value):
+        raise _error(reply)
+    return int(value)
+
+def boolean(reply):
+    """Return True for a reply of ON, 1 or TRUE and False for OFF, 0 or
+    FALSE, in any case
+    """
+    value = _BOOLEANS.get(reply)
+    if value is None:
+        value = _BOOLEANS.get(keyword(reply).upper())
+        if value is None:
+            raise _error(reply)
+    return value
+
+def fields(reply, sep=','):
+    """Return the fields of a list reply as strings, each without the
+    whitespace and quotes around it
+    """
+    return [f.strip().strip('"\'') for f in keyword(reply).split(sep)]
+
+def numbers(reply, sep=',', keywords=None):
+    """Return the fields of a list reply as floats, see number()"""
+    return [number(f, keywords) for f in fields(reply, sep)]
+
+def pairs(reply, sep=','):
+    """Return a reply of alternating names and numbers as a dict, ie.
+    {'FP': 0.0, 'NP': 1000.0, 'SP': 4.0} for 'FP,0,NP,1000,SP,4'
+    """
+    lst = fields(reply, sep)
+    if len(lst) % 2:
+        raise _error(reply)
+    return dict(zip(lst[::2], [number(v) for v in lst[1::2]]))
+
+def tagged(reply, name=None, channel=None):
+    """Return the number of a reply that repeats the setting it is for,
+    ie. 5.0 for 'V1 5.000'
+
+    name    - check the reply is for this setting, ie. 'V'
+    channel - check the reply is for this channel, for replies that
+              have one
+    """
+    match = _TAGGED.match(reply)
+    if match is None:
+        raise _error(reply)
+    tag, ch, value = match.groups()
+    if ((name is not None and tag != name) or
+            (channel is not None and (not ch or int(ch) != channel))):
+        raise ResponseError('Unexpected response format: "{}"'.format(reply))
+    return float(value)
+
+def measured(reply, unit=None):
+    """Return the number of a reply followed by its unit, ie. 5.003 for
+    '5.003V'
+
+    unit - check the reply is in this unit
+    """
+    match = _MEASURED.match(reply)
+    if match is None:
+        raise _error(reply)
+    value, got = match.groups()
+    if unit is not None and got != unit:
+        raise ResponseError('Unexpected response format: "{}"'.format(reply))
+    return float(value)
+
+
+if __name__ == '__main__':
+    # time each parser on a typical reply, next to the bare float() or
+    # string compare it is built around
+    from timeit import Timer
+
+    cases = [
+        ('float()',  lambda: float('+5.00000E+00\n')),
+        ('number',   lambda: number('+5.00000E+00\n')),
+        ('number quoted', lambda: number('"5.000"\n')),
+        ('integer',  lambda: integer('+32\n')),
+        ('== "ON\\n"', lambda: 'ON\n' == 'ON\n'),
+        ('boolean',  lambda: boolean('ON\n')),
+        ('boolean 1', lambda: boolean('1')),
+        ('keyword',  lambda: keyword('"NORMAL"\n')),
+        ('numbers',  lambda: numbers('1.0E+03,5.0,0.0,0.0\n')),
+        ('numbers DEF', lambda: numbers('1.0E+03,5.0,DEF,DEF\n',
+                                        keywords={'DEF': 0})),
+        ('fields x12', lambda: fields('ON;NORMAL;5.0E+01;OFF;POS;'
+                                      '"PULSE,1.0E+03,5,0,0";50;0;DUTY;'
+                                      '1.0E-08;1.0E-08;5.0E-04\n', ';')),
+        ('pairs',    lambda: pairs('FP,0,NP,1000,SP,4\n')),
+        ('tagged',   lambda: tagged('V1 5.000\r\n', 'V', 1)),
+        ('measured', lambda: measured('5.003V\r\n', 'V')),
+    ]
+
+    for name, func in cases:
+        timer = Timer(func)
+        loops, _ = timer.autorange()
+        best = min(timer.repeat(5, loops)) / loops
+        print('{:<14} {:8.3f} us/reply'.format(name, best * 1e6))
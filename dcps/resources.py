@@ -0,0 +1,177 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#-------------------------------------------------------------------------------
+#  Process wide registry of VISA resource managers and sessions
+#
+#  Creating a ResourceManager initialises its backend and enumerates the
+#  buses, which is slow. The registry keeps one ResourceManager per backend
+#  and one session per resource string. A driver that closes its
+#  connection hands the session back to the pool, so opening the same
+#  instrument again (ie. reopening a GUI) reuses it. Sessions are only
+#  really closed by closeResource(), closeAll() or when the program exits.
+#
+#  SIM:: resource strings, and resource strings redirected to them, open a
+#  simulated instrument from dcps.sim instead, see there.
+#
+#  Every session is handed out wrapped in a dcps.trace.TracedSession, so
+#  the traffic of all the drivers can be timed in one place.
+#-------------------------------------------------------------------------------
+
+import atexit
+from concurrent.futures import ThreadPoolExecutor, wait as waitFutures
+from threading import Lock
+
+import pyvisa
+from pyvisa.errors import InvalidSession
+
+try:
+    from . import sim, trace
+except ImportError:
+    import sim, trace
+
+# backend string ('' for the default, '@py' for pyvisa-py) -> ResourceManager
+_managers = {}
+# (backend, resource string) -> open session
+_sessions = {}
+# (backend, resource string) -> Lock held while that resource is opened
+_opening = {}
+_lock = Lock()
+
+def resourceManager(backend=''):
+    """Return the ResourceManager for backend, creating it the first time
+
+    backend - '' for the default VISA library, '@py' for pyvisa-py
+    """
+    with _lock:
+        rm = _managers.get(backend)
+        if rm is None:
+            rm = pyvisa.ResourceManager(backend)
+            _managers[backend] = rm
+        return rm
+
+def _isOpen(session):
+    try:
+        session.session
+    except InvalidSession:
+        return False
+    return True
+
+def openResource(resource, backend='', fresh=False, **kwargs):
+    """Return an open session for resource, reusing the pooled one if
+    there is one
+
+    resource - resource string, like TCPIP0::172.16.2.13::INSTR
+    backend  - ResourceManager backend, see resourceManager()
+    fresh    - close any pooled session first and open a new one,
+               ie. to reconnect after the instrument was power cycled
+    kwargs   - attributes to set on the session, as for open_resource();
+               they are set again when a pooled session is reused
+    """
+    key = (backend, resource)
+    with _lock:
+        opening = _opening.setdefault(key, Lock())
+
+    # different resources open at the same time, the same one only once
+    with opening:
+        with _lock:
+            session = _sessions.get(key)
+        if session is not None and (fresh or not _isOpen(session)):
+            _close(key, session)
+            session = None
+
+        if session is None:
+            if sim.isSimulated(resource):
+                session = sim.openResource(resource, **kwargs)
+            else:
+                session = resourceManager(backend).open_resource(resource,
+                                                                 **kwargs)
+            session = trace.wrap(session, resource)
+            with _lock:
+                _sessions[key] = session
+        else:
+            for name, value in kwargs.items():
+                setattr(session, name, value)
+        return session
+
+def release(session):
+    """Hand session back to the pool once a driver is done with it
+
+    The session stays open so the next openResource() for the same
+    resource can reuse it.
+    """
+    if session is not None and not _isOpen(session):
+        with _lock:
+            for key, pooled in list(_sessions.items()):
+                if pooled is session:
+                    del _sessions[key]
+
+def _close(key, session):
+    with _lock:
+        if _sessions.get(key) is session:
+            del _sessions[key]
+    try:
+        session.close()
+    except Exception:
+        pass
+
+def closeResource(resource, backend=''):
+    """Close the pooled session for resource, if there is one"""
+    key = (backend, resource)
+    with _lock:
+        session = _sessions.get(key)
+    if session is not None:
+        _close(key, session)
+
+def closeAll():
+    """Close every pooled session and resource manager"""
+    with _lock:
+        sessions = list(_sessions.items())
+        managers = list(_managers.values())
+        _managers.clear()
+    for key, session in sessions:
+        _close(key, session)
+    for rm in managers:
+        try:
+            rm.close()
+        except Exception:
+            pass
+
+atexit.register(closeAll)
+
+def _opener(driver):
+    # SCPI based classes have open(), SiglentSDS1202XE and NewportESP301
+    # open_inst()
+    opener = getattr(driver, 'open', None)
+    if opener is None:
+        opener = getattr(driver, 'open_inst')
+    return opener
+
+def openAll(drivers, timeout=None):
+    """Open the connections of several drivers at the same time
+
+    drivers - dcps instrument instances
+    timeout - seconds to wait for all of them, None to wait as long as
+              it takes
+
+    Returns a list with, for each driver in order, None if it opened or
+    the exception it raised. A driver still opening after timeout gets a
+    TimeoutError; its thread finishes in the background.
+    """
+    drivers = list(drivers)
+    if not drivers:
+        return []
+    pool = ThreadPoolExecutor(max_workers=len(drivers),
+                              thread_name_prefix='dcps open')
+    futures = [pool.submit(_opener(driver)) for driver in drivers]
+    waitFutures(futures, timeout=timeout)
+    pool.shutdown(wait=False)
+
+    errors = []
+    for driver, future in zip(drivers, futures):
+        if not future.done():
+            errors.append(TimeoutError('{} did not open within {} s'.format(
+                type(driver).__name__, timeout)))
+        else:
+            errors.append(future.exception())
+    return errors
@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#-------------------------------------------------------------------------------
+#  Simulated instruments for the dcps drivers
+#
+#  A resource string of the form SIM::<model>[::<name>]::INSTR opens a
+#  simulated instrument instead of a real one, through the same
+#  dcps.resources pool, so any driver can be pointed at it:
+#
+#      psu = AimTTiCPX400DP('SIM::CPX400DP::INSTR')
+#      psu.open()
+#      psu.setVoltage(5.0, 1)
+#
+#  Every distinct resource string is its own instrument, which keeps its
+#  state until reset(). Messages to it take as long as its Link says,
+#  which configure() changes. redirect() points a real resource string at
+#  a simulated one, so code with hard wired resource strings (ie. the
+#  GUIs) runs against simulators unchanged.
+#-------------------------------------------------------------------------------
+
+from threading import Lock
+
+from .aimtti import CPX400DP, EL302P, PLP
+from .base import SimInstrument, SimSupply, quantity
+from .link import Link
+from .newport import ESP301
+from .rigol import DG5000
+from .scpi import BK9115, DP800, SCPIPSU
+from .session import SimSession
+from .siglent import SDS1202XE, pulses, sine
+
+# model name in resource strings -> SimInstrument class
+MODELS = {cls.model: cls for cls in (CPX400DP, EL302P, PLP, SCPIPSU, DP800,
+                                     BK9115, DG5000, SDS1202XE, ESP301)}
+
+_devices = {}        # SIM:: resource string -> SimInstrument
+_links = {}          # SIM:: resource string -> Link
+_redirects = {}      # real resource string -> SIM:: resource string
+_lock = Lock()
+
+def resolve(resource):
+    """Return the SIM:: resource string resource was redirected to, or
+    resource itself
+    """
+    return _redirects.get(resource, resource)
+
+def isSimulated(resource):
+    """Return True if resource is, or was redirected to, a SIM:: string"""
+    return resolve(resource).upper().startswith('SIM::')
+
+def _model(resource):
+    parts = resource.split('::')
+    if len(parts) < 2 or parts[0].upper() != 'SIM':
+        raise ValueError('Not a simulated resource: "{}"'.format(resource))
+    model = parts[1].upper()
+    if model not in MODELS:
+        raise ValueError('Unknown simulated model "{}", expected one of {}'.
+                             format(parts[1], ', '.join(sorted(MODELS))))
+    return MODELS[model]
+
+def add(resource, instrument, link=None):
+    """Use instrument, a SimInstrument set up by the caller, for resource
+
+        sim.add('SIM::SDS1202XE::INSTR', SDS1202XE(noise=0, seed=1))
+
+    link - Link for it, the model's default if None
+    """
+    with _lock:
+        _devices[resource] = instrument
+        if link is None:
+            link = Link(**instrument.link)
+        _links[resource] = link
+    return instrument
+
+def device(resource):
+    """Return the simulated instrument behind resource, creating it the
+    first time, ie. to look at or change its state directly
+    """
+    resource = resolve(resource)
+    with _lock:
+        inst = _devices.get(resource)
+        if inst is None:
+            cls = _model(resource)
+            inst = cls()
+            _devices[resource] = inst
+            _links[resource] = Link(**cls.link)
+        return inst
+
+def link(resource):
+    """Return the Link of resource's simulated instrument"""
+    device(resource)
+    return _links[resolve(resource)]
+
+def configure(resource, **kwargs):
+    """Change the Link of resource's simulated instrument
+
+    kwargs - latency, jitter, bandwidth and/or seed, see Link
+    """
+    lnk = link(resource)
+    seed = kwargs.pop('seed', None)
+    for name, value in kwargs.items():
+        if not hasattr(lnk, name):
+            raise TypeError('Link has no setting "{}"'.format(name))
+        setattr(lnk, name, value)
+    if seed is not None:
+        lnk.seed(seed)
+    return lnk
+
+def redirect(resource, simulated):
+    """Open simulated, a SIM:: resource string, whenever resource is
+    opened
+    """
+    _model(simulated)
+    with _lock:
+        _redirects[resource] = simulated
+
+def redirectAll(mapping):
+    """redirect() every resource string in mapping to its SIM:: string"""
+    for resource, simulated in mapping.items():
+        redirect(resource, simulated)
+
+def reset():
+    """Forget every simulated instrument, Link and redirect
+
+    Sessions already open keep talking to the old instruments, close
+    them first with dcps.resources.closeAll().
+    """
+    with _lock:
+        _devices.clear()
+        _links.clear()
+        _redirects.clear()
+
+def openResource(resource, **kwargs):
+    """Return a new SimSession to resource's simulated instrument
+
+    kwargs - session attributes, as for pyvisa's open_resource()
+    """
+    simulated = resolve(resource)
+    inst = device(simulated)
+    return SimSession(simulated, inst, _links[simulated], **kwargs)
@@ -0,0 +1,176 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#-------------------------------------------------------------------------------
+#  Simulated Aim TTi power supplies, for AimTTiCPX400DP, AimTTiPLP and
+#  AimTTiEL302P
+#
+#  Each output drives a resistive load, see SimSupply.
+#-------------------------------------------------------------------------------
+
+from .base import SimSupply
+
+class _AimTTi(SimSupply):
+    """Front panel lock shared by the Aim TTi supplies"""
+
+    terminator = '\r\n'
+    # USB virtual serial port
+    link = dict(latency=0.005, jitter=0.002, bandwidth=11520)
+
+    def reset(self):
+        super(_AimTTi, self).reset()
+        self.locked = False
+
+    def _ifLock(self):
+        self.locked = True
+
+    def _local(self):
+        self.locked = False
+
+class CPX400DP(_AimTTi):
+    """Simulated Aim TTi CPX400DP, two 60 V 20 A outputs with voltage
+    tracking
+    """
+
+    model = 'CPX400DP'
+    idn = 'THURLBY THANDAR, CPX400DP, 0, 1.00-1.00-1.00'
+    channels = 2
+    max_voltage = 60.0
+    max_current = 20.0
+
+    _commands = [
+        (r'V(\d) (.+)', 'setVoltage'),
+        (r'I(\d) (.+)', 'setCurrent'),
+        (r'V(\d)\?', 'queryVoltage'),
+        (r'I(\d)\?', 'queryCurrent'),
+        (r'V(\d)O\?', 'measureVoltage'),
+        (r'I(\d)O\?', 'measureCurrent'),
+        (r'OP(\d) ([01])', 'setOutput'),
+        (r'OP(\d)\?', 'queryOutput'),
+        (r'OPALL ([01])', 'setOutputAll'),
+        (r'CONFIG (\d)', 'setConfig'),
+        (r'CONFIG\?', 'queryConfig'),
+        (r'IFLOCK', '_ifLock'),
+        (r'LOCAL', '_local'),
+    ]
+
+    def reset(self):
+        super(CPX400DP, self).reset()
+        self.config = 2          # 0 voltage tracking, 2 independent
+
+    def voltageSetpoint(self, ch):
+        # output 2 follows output 1 while tracking
+        if ch == 2 and self.config == 0:
+            return self.vset[1]
+        return self.vset[ch]
+
+    def setVoltage(self, ch, value):
+        self._setVoltage(self._channel(ch), value)
+
+    def setCurrent(self, ch, value):
+        self._setCurrent(self._channel(ch), value)
+
+    def queryVoltage(self, ch):
+        ch = self._channel(ch)
+        return 'V{} {:.3f}'.format(ch, self.voltageSetpoint(ch))
+
+    def queryCurrent(self, ch):
+        ch = self._channel(ch)
+        return 'I{} {:.3f}'.format(ch, self.iset[ch])
+
+    def measureVoltage(self, ch):
+        return '{:.3f}V'.format(self.measure(self._channel(ch))[0])
+
+    def measureCurrent(self, ch):
+        return '{:.3f}A'.format(self.measure(self._channel(ch))[1])
+
+    def setOutput(self, ch, state):
+        self.on[self._channel(ch)] = (state == '1')
+
+    def queryOutput(self, ch):
+        return '1' if self.on[self._channel(ch)] else '0'
+
+    def setOutputAll(self, state):
+        for ch in self.on:
+            self.on[ch] = (state == '1')
+
+    def setConfig(self, config):
+        if config not in ('0', '2'):
+            raise ValueError('config {}'.format(config))
+        if self.config != int(config) and self.on[2]:
+            # the supply refuses to change mode with output 2 on
+            raise ValueError('output 2 is on')
+        self.config = int(config)
+
+    def queryConfig(self):
+        return str(self.config)
+
+class PLP(CPX400DP):
+    """Simulated Aim TTi PL303QTMD-P, three 30 V 3 A outputs
+
+    It answers the same numbered commands as the CPX400DP, over the LAN
+    socket, but has no voltage tracking.
+    """
+
+    model = 'PLP'
+    idn = 'THURLBY THANDAR, PL303QTMD-P, 0, 3.01-4.06'
+    # port 9221 LAN socket
+    link = dict(latency=0.002, jitter=0.001, bandwidth=1e6)
+    channels = 3
+    max_voltage = 30.0
+    max_current = 3.0
+
+    _commands = [(pattern, name) for pattern, name in CPX400DP._commands
+                     if not pattern.startswith('CONFIG')]
+
+class EL302P(_AimTTi):
+    """Simulated Aim TTi EL302P-USB, one 30 V 2 A output
+
+    Like the real one it has no *OPC?, so AimTTiEL302P waits a fixed
+    time instead.
+    """
+
+    model = 'EL302P'
+    idn = 'THURLBY-THANDAR,EL302P-USB,0,1.00'
+    opc = False
+
+    _commands = [
+        (r'V (.+)', 'setVoltage'),
+        (r'I (.+)', 'setCurrent'),
+        (r'V\?', 'queryVoltage'),
+        (r'I\?', 'queryCurrent'),
+        (r'VO\?', 'measureVoltage'),
+        (r'IO\?', 'measureCurrent'),
+        (r'ON', 'outputOn'),
+        (r'OFF', 'outputOff'),
+        (r'OUT\?', 'queryOutput'),
+        (r'IFLOCK', '_ifLock'),
+        (r'LOCAL', '_local'),
+    ]
+
+    def setVoltage(self, value):
+        self._setVoltage(1, value)
+
+    def setCurrent(self, value):
+        self._setCurrent(1, value)
+
+    def queryVoltage(self):
+        return 'V {:.3f}'.format(self.vset[1])
+
+    def queryCurrent(self):
+        return 'I {:.3f}'.format(self.iset[1])
+
+    def measureVoltage(self):
+        return 'V {:.3f}'.format(self.measure(1)[0])
+
+    def measureCurrent(self):
+        return 'I {:.3f}'.format(self.measure(1)[1])
+
+    def outputOn(self):
+        self.on[1] = True
+
+    def outputOff(self):
+        self.on[1] = False
+
+    def queryOutput(self):
+        return 'OUT ON' if self.on[1] else 'OUT OFF'
@@ -0,0 +1,233 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#-------------------------------------------------------------------------------
+#  Common parts of the simulated instruments
+#-------------------------------------------------------------------------------
+
+import random
+import re
+from threading import RLock
+
+# SI prefixes accepted in front of a unit, ie. the M of 10MV
+_prefixes = {'': 1.0, 'N': 1e-9, 'U': 1e-6, 'M': 1e-3, 'K': 1e3}
+
+_quantity = re.compile(r'^\s*([-+]?[0-9]*\.?[0-9]+(?:[eE][-+]?[0-9]+)?)'
+                       r'\s*([A-Za-z]*)\s*$')
+
+def quantity(text, unit=''):
+    """Return text, a number with an optional prefixed unit like '10 MV',
+    '500UV' or '1.5', as a float in the base unit
+
+    unit - the base unit to strip from the end, ie. 'V' or 'S'
+    """
+    match = _quantity.match(text)
+    if match is None:
+        raise ValueError('Not a number: "{}"'.format(text))
+    value, suffix = match.groups()
+    suffix = suffix.upper()
+    if unit and suffix.endswith(unit.upper()):
+        suffix = suffix[:-len(unit)]
+    if suffix not in _prefixes:
+        raise ValueError('Unknown unit: "{}"'.format(text))
+    return float(value) * _prefixes[suffix]
+
+class SimInstrument(object):
+    """A simulated instrument, which answers the messages a dcps driver
+    sends it
+
+    Subclasses list their commands in _commands as (pattern, method
+    name) pairs. A pattern is a regular expression matched against the
+    whole command, ignoring case, and the method is called with its
+    groups. The method returns the reply, a str or bytes, or None for
+    commands that send nothing back.
+
+    A message may hold several commands joined with ';', as sent by
+    SCPI.batch(). Their replies are joined with ';' and the message's
+    reply ends with terminator. A command that is not understood is
+    logged in errors and answers nothing, so a query the real
+    instrument does not know times out here too.
+    """
+
+    # model name used in SIM:: resource strings, ie. SIM::CPX400DP::INSTR
+    model = None
+    # answer to *IDN?
+    idn = 'dcps,SIMULATED,0,0'
+    # ends every reply
+    terminator = '\n'
+    # False for instruments without *OPC and *OPC? (ie. the EL302P)
+    opc = True
+    # arguments of the Link a new instance of this model talks through
+    link = {}
+
+    # (pattern, method name), see above
+    _commands = []
+
+    _common = [
+        (r'\*IDN\?', '_idn'),
+        (r'\*OPC\?', '_opcQuery'),
+        (r'\*OPC', '_opcSet'),
+        (r'\*ESR\?', '_esrQuery'),
+        (r'\*CLS', '_cls'),
+        (r'\*RST', 'reset'),
+        (r'\*WAI', '_nothing'),
+        (r':?SYST(?:em)?:ERR(?:or)?\?', '_error'),
+    ]
+
+    def __init__(self):
+        self.lock = RLock()
+        self.errors = []         # (code, message) not read by SYST:ERR? yet
+        self.messages = 0        # messages handled, for benchmarks
+        self.commands = 0        # commands in those messages
+        self._status = 0         # event status register
+        self.reset()
+
+    @classmethod
+    def _table(cls):
+        # compiled command table, built once per class
+        table = cls.__dict__.get('_compiled')
+        if table is None:
+            pairs = cls._common + cls._commands
+            table = [(re.compile(pattern, re.IGNORECASE), name)
+                         for pattern, name in pairs]
+            cls._compiled = table
+        return table
+
+    def reset(self):
+        """Return to the power on state, also run by *RST"""
+        pass
+
+    def handle(self, message):
+        """Act on message and return the reply as bytes, or None"""
+        with self.lock:
+            self.messages += 1
+            replies = []
+            for cmd in message.split(';'):
+                cmd = cmd.strip()
+                if not cmd:
+                    continue
+                self.commands += 1
+                reply = self._dispatch(cmd)
+                if reply is not None:
+                    replies.append(reply)
+
+        if not replies:
+            return None
+        if len(replies) == 1 and isinstance(replies[0], bytes):
+            return replies[0]      # ie. a waveform block, sent as is
+        return (';'.join(replies) + self.terminator).encode('ascii')
+
+    def _dispatch(self, cmd):
+        for pattern, name in self._table():
+            match = pattern.fullmatch(cmd)
+            if match is not None:
+                try:
+                    return getattr(self, name)(*match.groups())
+                except ValueError as err:
+                    self.error(-224, 'Illegal parameter value: {}'.format(err))
+                    return None
+        self.error(-113, 'Undefined header: {}'.format(cmd))
+        return None
+
+    def error(self, code, message):
+        """Log an error like the instrument's error queue would"""
+        self.errors.append((code, message))
+        self._status |= 0x20      # command error
+
+    def _idn(self):
+        return self.idn
+
+    def _opcQuery(self):
+        if not self.opc:
+            self.error(-113, 'Undefined header: *OPC?')
+            return None
+        return '1'
+
+    def _opcSet(self):
+        if not self.opc:
+            self.error(-113, 'Undefined header: *OPC')
+            return None
+        self._status |= 0x01      # operation complete
+
+    def _esrQuery(self):
+        esr, self._status = self._status, 0
+        return str(esr)
+
+    def _cls(self):
+        self.errors = []
+        self._status = 0
+
+    def _nothing(self, *args):
+        return None
+
+    def _error(self):
+        if not self.errors:
+            return '0,"No error"'
+        code, message = self.errors.pop(0)
+        return '{},"{}"'.format(code, message)
+
+class SimSupply(SimInstrument):
+    """Outputs, setpoints and loads shared by the simulated power
+    supplies
+
+    Each output drives a resistive load. The measured voltage and current
+    follow from the setpoints the way a real supply's would: constant
+    voltage until the load draws the current limit, constant current from
+    then on, and 0 while the output is off.
+    """
+
+    channels = 1
+    max_voltage = 30.0
+    max_current = 2.0
+
+    def __init__(self, load=10.0, noise=0.0, seed=None):
+        """load  - ohms of the load on every output
+        noise - standard deviation, in volts and amps, added to
+                measurements, 0 for exact readings
+        seed  - seed of the noise, so runs can be repeated
+        """
+        self.load = {ch: load for ch in range(1, self.channels + 1)}
+        self.noise = noise
+        self._random = random.Random(seed)
+        super(SimSupply, self).__init__()
+
+    def reset(self):
+        self.vset = {ch: 0.0 for ch in range(1, self.channels + 1)}
+        self.iset = {ch: 0.0 for ch in range(1, self.channels + 1)}
+        self.on = {ch: False for ch in range(1, self.channels + 1)}
+
+    def _channel(self, ch):
+        ch = int(ch)
+        if ch < 1 or ch > self.channels:
+            raise ValueError('no output {}'.format(ch))
+        return ch
+
+    def _setVoltage(self, ch, value):
+        value = quantity(value, 'V')
+        if value < 0 or value > self.max_voltage:
+            raise ValueError('{} V out of range'.format(value))
+        self.vset[ch] = value
+
+    def _setCurrent(self, ch, value):
+        value = quantity(value, 'A')
+        if value < 0 or value > self.max_current:
+            raise ValueError('{} A out of range'.format(value))
+        self.iset[ch] = value
+
+    def voltageSetpoint(self, ch):
+        return self.vset[ch]
+
+    def measure(self, ch):
+        """Return the (volts, amps) output ch delivers into its load"""
+        if not self.on[ch]:
+            return 0.0, 0.0
+        volts = self.voltageSetpoint(ch)
+        amps = volts / self.load[ch]
+        if amps > self.iset[ch]:
+            # current limited
+            amps = self.iset[ch]
+            volts = amps * self.load[ch]
+        if self.noise:
+            volts = max(0.0, volts + self._random.gauss(0, self.noise))
+            amps = max(0.0, amps + self._random.gauss(0, self.noise))
+        return volts, amps
@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#-------------------------------------------------------------------------------
+#  Timing model of the connection to a simulated instrument
+#-------------------------------------------------------------------------------
+
+import random
+from time import sleep
+
+class Link(object):
+    """How long a simulated instrument takes to exchange a message
+
+    Every write and every read costs
+
+        latency + a random extra of up to jitter + bytes / bandwidth
+
+    seconds, which the calling thread spends asleep, like it would
+    waiting on the bus. Calls on different sessions overlap.
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, bandwidth=None, seed=None):
+        """latency   - seconds of turnaround for every write or read
+        jitter    - largest random extra, in seconds, added to latency
+        bandwidth - bytes per second through the link, None for no limit
+                    (ie. 1920 for 19200 baud serial)
+        seed      - seed of the jitter, so runs can be repeated
+        """
+        self.latency = latency
+        self.jitter = jitter
+        self.bandwidth = bandwidth
+        self._random = random.Random(seed)
+
+    def seed(self, seed):
+        """Restart the jitter from seed"""
+        self._random.seed(seed)
+
+    def cost(self, nbytes):
+        """Return the seconds a transfer of nbytes takes"""
+        t = self.latency
+        if self.jitter:
+            t += self._random.uniform(0, self.jitter)
+        if self.bandwidth:
+            t += nbytes / self.bandwidth
+        return t
+
+    def transfer(self, nbytes):
+        """Sleep for as long as a transfer of nbytes takes"""
+        t = self.cost(nbytes)
+        if t > 0:
+            sleep(t)
+        return t
+
+    def __repr__(self):
+        return 'Link(latency={}, jitter={}, bandwidth={})'.format(
+            self.latency, self.jitter, self.bandwidth)
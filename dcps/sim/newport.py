@@ -0,0 +1,295 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#-------------------------------------------------------------------------------
+#  Simulated Newport ESP301 motion controller, for NewportESP301
+#
+#  A move follows a trapezoidal velocity profile set by the axis'
+#  velocity, acceleration and deceleration, and the position is worked out
+#  from the time whenever it is asked for, so a stage takes as long to get
+#  somewhere as a real one would. Positions are in whatever units SN set,
+#  no conversion is done.
+#
+#  WT and WS make the controller hold back the commands that follow until
+#  the time is up or the axis has stopped, like the real one. AB, the
+#  emergency stop, is acted on straight away.
+#-------------------------------------------------------------------------------
+
+from math import sqrt
+from time import monotonic, sleep
+
+from .base import SimInstrument, quantity
+
+class Move(object):
+    """A move from start to end, begun at t0, with a trapezoidal (or, for
+    short moves, triangular) velocity profile
+    """
+
+    def __init__(self, start, end, vel, accel, decel, t0):
+        self.start = start
+        self.end = end
+        self.t0 = t0
+        self._sign = 1 if end >= start else -1
+        dist = abs(end - start)
+        self._accel = accel
+        self._decel = decel
+        if vel * vel * (1 / accel + 1 / decel) / 2 > dist:
+            # never gets up to speed
+            vel = sqrt(2 * dist * accel * decel / (accel + decel))
+        self._vel = vel
+        self._ta = vel / accel if vel else 0.0
+        self._tb = vel / decel if vel else 0.0
+        self._tc = ((dist - vel * (self._ta + self._tb) / 2) / vel
+                        if vel else 0.0)
+        self.duration = self._ta + self._tc + self._tb
+
+    def at(self, t):
+        """Return the (position, velocity) at time t"""
+        dt = t - self.t0
+        v, a, b = self._vel, self._accel, self._decel
+        ta, tc = self._ta, self._tc
+        if dt <= 0:
+            x, speed = 0.0, 0.0
+        elif dt < ta:
+            x, speed = a * dt * dt / 2, a * dt
+        elif dt < ta + tc:
+            x, speed = v * ta / 2 + v * (dt - ta), v
+        elif dt < self.duration:
+            u = dt - ta - tc
+            x, speed = v * ta / 2 + v * tc + v * u - b * u * u / 2, v - b * u
+        else:
+            return self.end, 0.0
+        return self.start + self._sign * x, self._sign * speed
+
+    def done(self, t):
+        return t - self.t0 >= self.duration
+
+class _Axis(object):
+    # one stage and its settings, in the controller's power on state
+    def __init__(self):
+        self.units = 2           # mm
+        self.resolution = 1e-4
+        self.motor = False
+        self.pos = 0.0
+        self.target = 0.0
+        self.move = None
+        self.vel = 5.0
+        self.max_vel = 10.0
+        self.accel = 20.0
+        self.decel = 20.0
+        self.max_accel = 40.0
+        self.left = -100.0
+        self.right = 100.0
+
+    def state(self, t):
+        # (position, velocity) at time t, forgetting a finished move
+        if self.move is None:
+            return self.pos, 0.0
+        pos, vel = self.move.at(t)
+        if self.move.done(t):
+            self.pos = self.move.end
+            self.move = None
+        return pos, vel
+
+    def halt(self, t):
+        # stop where the stage is now
+        self.pos = self.state(t)[0]
+        self.move = None
+
+class ESP301(SimInstrument):
+    """Simulated Newport ESP301 with three axes"""
+
+    model = 'ESP301'
+    idn = 'ESP301 Version 3.0.1 12/15/10'
+    terminator = '\r\n'
+    # RS-232C at 19200 baud
+    link = dict(latency=0.005, jitter=0.002, bandwidth=1920)
+    axes = 3
+
+    # error codes TE? reports, see the ESP301 manual
+    NO_ERROR = 0
+    COMMAND_ERROR = 6
+    MOTOR_OFF = 8
+    LIMIT = 13
+
+    _commands = [
+        (r'(\d)MO', 'motorOn'),
+        (r'(\d)MF', 'motorOff'),
+        (r'(\d)MO\?', 'queryMotor'),
+        (r'(\d)MD\?', 'queryDone'),
+        (r'AB', 'abort'),
+        (r'(\d)ST', 'stop'),
+        (r'(\d)MV([+-])', 'moveIndefinite'),
+        (r'(\d)PA(.+)', 'moveAbsolute'),
+        (r'(\d)PR(.+)', 'moveRelative'),
+        (r'(\d)TP\??', 'queryPosition'),
+        (r'(\d)DP\?', 'queryTarget'),
+        (r'(\d)TV\??', 'queryVelocity'),
+        (r'(\d)DV\?', 'querySetVelocity'),
+        (r'(\d)(VA|VU|AC|AG|AU|SL|RL|SU)\?', 'querySetting'),
+        (r'(\d)(VA|VU|AC|AG|AU|SL|RL|SU)(.+)', 'setSetting'),
+        (r'(\d)SN\?', 'queryUnits'),
+        (r'(\d)SN(\d+)', 'setUnits'),
+        (r'(\d)DH(.*)', 'defineHome'),
+        (r'(\d)QD', '_nothing'),
+        (r'(\d)WS(.*)', 'waitStop'),
+        (r'WT(.+)', 'waitTime'),
+        (r'SA\?', 'queryAddress'),
+        (r'SA(\d+)', 'setAddress'),
+        (r'XM', 'queryMemory'),
+        (r'TE\??', 'queryError'),
+        (r'TB\??', 'queryErrorMessage'),
+    ]
+
+    # setting command -> _Axis attribute
+    _settings = {'VA': 'vel', 'VU': 'max_vel', 'AC': 'accel', 'AG': 'decel',
+                 'AU': 'max_accel', 'SL': 'left', 'RL': 'right',
+                 'SU': 'resolution'}
+
+    def reset(self):
+        self.axis = {n: _Axis() for n in range(1, self.axes + 1)}
+        self.address = 1
+        self.code = self.NO_ERROR
+        self._busy_until = 0.0   # WT and WS hold commands back until then
+
+    def handle(self, message):
+        # commands wait behind a WT or WS, except the emergency stop
+        if message.strip().upper() != 'AB':
+            wait = self._busy_until - monotonic()
+            if wait > 0:
+                sleep(wait)
+        return super(ESP301, self).handle(message)
+
+    def error(self, code, message):
+        super(ESP301, self).error(code, message)
+        self.code = self.COMMAND_ERROR
+
+    def _axis(self, n):
+        n = int(n)
+        if n < 1 or n > self.axes:
+            raise ValueError('no axis {}'.format(n))
+        return self.axis[n]
+
+    def _goto(self, ax, target):
+        # start a move to target from wherever the stage is
+        if not ax.motor:
+            self.code = self.MOTOR_OFF
+            return
+        if target < ax.left or target > ax.right:
+            self.code = self.LIMIT
+            return
+        now = monotonic()
+        ax.halt(now)
+        ax.target = target
+        ax.move = Move(ax.pos, target, min(ax.vel, ax.max_vel),
+                       min(ax.accel, ax.max_accel),
+                       min(ax.decel, ax.max_accel), now)
+
+    # motor
+    def motorOn(self, n):
+        self._axis(n).motor = True
+
+    def motorOff(self, n):
+        ax = self._axis(n)
+        ax.halt(monotonic())
+        ax.motor = False
+
+    def queryMotor(self, n):
+        return '1' if self._axis(n).motor else '0'
+
+    # motion
+    def queryDone(self, n):
+        ax = self._axis(n)
+        ax.state(monotonic())
+        return '1' if ax.move is None else '0'
+
+    def abort(self):
+        # stops every axis and turns the motors off
+        now = monotonic()
+        for ax in self.axis.values():
+            ax.halt(now)
+            ax.motor = False
+        self._busy_until = 0.0
+
+    def stop(self, n):
+        # the real controller decelerates, this stops dead
+        self._axis(n).halt(monotonic())
+
+    def moveIndefinite(self, n, direction):
+        ax = self._axis(n)
+        self._goto(ax, ax.right if direction == '+' else ax.left)
+
+    def moveAbsolute(self, n, text):
+        self._goto(self._axis(n), quantity(text))
+
+    def moveRelative(self, n, text):
+        ax = self._axis(n)
+        self._goto(ax, ax.target + quantity(text))
+
+    # position and velocity
+    def queryPosition(self, n):
+        return '{:.5f}'.format(self._axis(n).state(monotonic())[0])
+
+    def queryTarget(self, n):
+        return '{:.5f}'.format(self._axis(n).target)
+
+    def queryVelocity(self, n):
+        return '{:.5f}'.format(self._axis(n).state(monotonic())[1])
+
+    def querySetVelocity(self, n):
+        return '{:.5f}'.format(self._axis(n).vel)
+
+    def querySetting(self, n, name):
+        value = getattr(self._axis(n), self._settings[name.upper()])
+        return '{:g}'.format(value)
+
+    def setSetting(self, n, name, text):
+        setattr(self._axis(n), self._settings[name.upper()], quantity(text))
+
+    def queryUnits(self, n):
+        return str(self._axis(n).units)
+
+    def setUnits(self, n, units):
+        units = int(units)
+        if units > 11:
+            raise ValueError('units {}'.format(units))
+        self._axis(n).units = units
+
+    def defineHome(self, n, text):
+        ax = self._axis(n)
+        home = quantity(text) if text.strip() else 0.0
+        ax.halt(monotonic())
+        ax.pos = ax.target = home
+
+    # waiting
+    def waitStop(self, n, text):
+        ax = self._axis(n)
+        now = monotonic()
+        ax.state(now)
+        delay = quantity(text) / 1000 if text.strip() else 0.0
+        if ax.move is not None:
+            self._busy_until = max(self._busy_until,
+                                   ax.move.t0 + ax.move.duration + delay)
+
+    def waitTime(self, text):
+        self._busy_until = max(self._busy_until, monotonic()) + \
+            quantity(text) / 1000
+
+    # controller
+    def queryAddress(self):
+        return str(self.address)
+
+    def setAddress(self, address):
+        self.address = int(address)
+
+    def queryMemory(self):
+        return '60000'
+
+    def queryError(self):
+        code, self.code = self.code, self.NO_ERROR
+        return str(code)
+
+    def queryErrorMessage(self):
+        code, self.code = self.code, self.NO_ERROR
+        return '{}, 0, {}'.format(code, 'NO ERROR DETECTED' if not code
+                                  else 'ERROR')
@@ -0,0 +1,226 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#-------------------------------------------------------------------------------
+#  Simulated Rigol DG5000 pulse generator, for RigolDG5000
+#
+#  Each channel keeps its output, sync and pulse settings. Frequency, duty
+#  cycle and width are coupled like on the real one: the held value (see
+#  :PULS:HOLD) stays put when the frequency changes and the other follows.
+#-------------------------------------------------------------------------------
+
+from .base import SimInstrument, quantity
+
+# (minimum, maximum, default) of each numeric setting
+_limits = {
+    'freq': (1e-6, 50e6, 1e3),
+    'amp': (1e-3, 10.0, 5.0),
+    'offset': (-5.0, 5.0, 0.0),
+    'delay': (0.0, 1e3, 0.0),
+    'duty': (0.001, 99.999, 50.0),
+    'pulse_delay': (0.0, 1e3, 0.0),
+    'lead': (4e-9, 1e-3, 1e-8),
+    'trail': (4e-9, 1e-3, 1e-8),
+    'impedance': (1.0, 10e3, 50.0),
+}
+
+def _sci(value):
+    # numbers are sent back like 1.000000E+03
+    return '{:.6E}'.format(value)
+
+class DG5000(SimInstrument):
+    """Simulated Rigol DG5252 with two channels"""
+
+    model = 'DG5000'
+    idn = 'RIGOL TECHNOLOGIES,DG5252,DG5T220100004,00.01.12'
+    # USBTMC
+    link = dict(latency=0.001, jitter=0.0005, bandwidth=1e6)
+    channels = 2
+
+    # headers may start with ':', only the short forms the driver sends
+    # are understood
+    _commands = [
+        (r':?OUTP(\d)\?', 'queryOutput'),
+        (r':?OUTP(\d) (ON|OFF|1|0)', 'setOutput'),
+        (r':?OUTP(\d):IMP\?', 'queryImpedance'),
+        (r':?OUTP(\d):IMP (.+)', 'setImpedance'),
+        (r':?OUTP(\d):POL\?', 'queryPolarity'),
+        (r':?OUTP(\d):POL (NORM|NORMAL|INV|INVERTED)', 'setPolarity'),
+        (r':?OUTP(\d):SYNC\?', 'querySync'),
+        (r':?OUTP(\d):SYNC (ON|OFF|1|0)', 'setSync'),
+        (r':?OUTP(\d):SYNC:POL\?', 'querySyncPolarity'),
+        (r':?OUTP(\d):SYNC:POL (POS|NEG)', 'setSyncPolarity'),
+        (r':?SOUR(\d):APPL\?', 'queryApply'),
+        (r':?SOUR(\d):APPL:PULS (.*)', 'applyPulse'),
+        (r':?SOUR(\d):PULS:DCYC\?', 'queryDuty'),
+        (r':?SOUR(\d):PULS:DCYC (.+)', 'setDuty'),
+        (r':?SOUR(\d):PULS:DEL\?', 'queryPulseDelay'),
+        (r':?SOUR(\d):PULS:DEL (.+)', 'setPulseDelay'),
+        (r':?SOUR(\d):PULS:HOLD\?', 'queryHold'),
+        (r':?SOUR(\d):PULS:HOLD (WIDT|DUTY)', 'setHold'),
+        (r':?SOUR(\d):PULS:TRAN\?', 'queryLead'),
+        (r':?SOUR(\d):PULS:TRAN (.+)', 'setLead'),
+        (r':?SOUR(\d):PULS:TRAN:TRA\?', 'queryTrail'),
+        (r':?SOUR(\d):PULS:TRAN:TRA (.+)', 'setTrail'),
+        (r':?SOUR(\d):PULS:WIDT\?', 'queryWidth'),
+        (r':?SOUR(\d):PULS:WIDT (.+)', 'setWidth'),
+        (r':?DISP:SAV\?', 'querySaver'),
+        (r':?DISP:SAV (ON|OFF)', 'setSaver'),
+        (r':?DISP:SAV:IMM', '_nothing'),
+    ]
+
+    def reset(self):
+        self.state = {}
+        for ch in range(1, self.channels + 1):
+            st = {name: lim[2] for name, lim in _limits.items()}
+            st.update(output=False, normal=True, sync=True, sync_pos=True,
+                      waveform='PULSE', hold_width=True)
+            st['width'] = st['duty'] / 100 / st['freq']
+            self.state[ch] = st
+        self.saver = False
+
+    def _channel(self, ch):
+        ch = int(ch)
+        if ch < 1 or ch > self.channels:
+            raise ValueError('no channel {}'.format(ch))
+        return self.state[ch]
+
+    def _value(self, name, text, unit=''):
+        # text as a number within the limits of setting name, or its
+        # MIN, MAX or DEF value
+        low, high, default = _limits[name]
+        word = text.strip().upper()
+        if word in ('MIN', 'MINIMUM'):
+            return low
+        if word in ('MAX', 'MAXIMUM'):
+            return high
+        if word in ('DEF', 'DEFAULT'):
+            return default
+        value = quantity(text, unit)
+        if value < low or value > high:
+            raise ValueError('{} {} out of range'.format(name, value))
+        return value
+
+    def _couple(self, st):
+        # bring the setting that is not held in line with the period
+        if st['hold_width']:
+            duty = st['width'] * st['freq'] * 100
+            low, high, _ = _limits['duty']
+            st['duty'] = min(max(duty, low), high)
+        st['width'] = st['duty'] / 100 / st['freq']
+
+    # output
+    def queryOutput(self, ch):
+        # the DG5000 ends this answer with an extra newline, which
+        # RigolDG5000.isOutputOn() expects
+        return ('ON' if self._channel(ch)['output'] else 'OFF') + '\n'
+
+    def setOutput(self, ch, state):
+        self._channel(ch)['output'] = state.upper() in ('ON', '1')
+
+    def queryImpedance(self, ch):
+        imp = self._channel(ch)['impedance']
+        return 'INFINITY' if imp == float('inf') else _sci(imp)
+
+    def setImpedance(self, ch, text):
+        st = self._channel(ch)
+        if text.strip().upper() in ('INF', 'INFINITY'):
+            st['impedance'] = float('inf')
+        else:
+            st['impedance'] = self._value('impedance', text, 'OHM')
+
+    def queryPolarity(self, ch):
+        # extra newline, as for :OUTP?
+        return ('NORMAL' if self._channel(ch)['normal'] else 'INVERTED') + '\n'
+
+    def setPolarity(self, ch, pol):
+        self._channel(ch)['normal'] = pol.upper().startswith('NORM')
+
+    def querySync(self, ch):
+        return 'ON' if self._channel(ch)['sync'] else 'OFF'
+
+    def setSync(self, ch, state):
+        self._channel(ch)['sync'] = state.upper() in ('ON', '1')
+
+    def querySyncPolarity(self, ch):
+        return 'POS' if self._channel(ch)['sync_pos'] else 'NEG'
+
+    def setSyncPolarity(self, ch, pol):
+        self._channel(ch)['sync_pos'] = (pol.upper() == 'POS')
+
+    # pulse
+    def queryApply(self, ch):
+        st = self._channel(ch)
+        return '"{},{},{},{},{}"'.format(st['waveform'], _sci(st['freq']),
+            _sci(st['amp']), _sci(st['offset']), _sci(st['delay']))
+
+    def applyPulse(self, ch, args):
+        st = self._channel(ch)
+        names = ['freq', 'amp', 'offset', 'delay']
+        args = [a for a in args.split(',')]
+        if len(args) > len(names):
+            raise ValueError('too many parameters')
+        # check every value before changing any
+        values = {name: self._value(name, text)
+                      for name, text in zip(names, args) if text.strip()}
+        st.update(values)
+        st['waveform'] = 'PULSE'
+        self._couple(st)
+
+    def queryDuty(self, ch):
+        return _sci(self._channel(ch)['duty'])
+
+    def setDuty(self, ch, text):
+        st = self._channel(ch)
+        st['duty'] = self._value('duty', text)
+        st['width'] = st['duty'] / 100 / st['freq']
+
+    def queryPulseDelay(self, ch):
+        return _sci(self._channel(ch)['pulse_delay'])
+
+    def setPulseDelay(self, ch, text):
+        self._channel(ch)['pulse_delay'] = self._value('pulse_delay', text, 'S')
+
+    def queryHold(self, ch):
+        return 'WIDT' if self._channel(ch)['hold_width'] else 'DUTY'
+
+    def setHold(self, ch, hold):
+        self._channel(ch)['hold_width'] = (hold.upper() == 'WIDT')
+
+    def queryLead(self, ch):
+        return _sci(self._channel(ch)['lead'])
+
+    def setLead(self, ch, text):
+        self._channel(ch)['lead'] = self._value('lead', text, 'S')
+
+    def queryTrail(self, ch):
+        return _sci(self._channel(ch)['trail'])
+
+    def setTrail(self, ch, text):
+        self._channel(ch)['trail'] = self._value('trail', text, 'S')
+
+    def queryWidth(self, ch):
+        return _sci(self._channel(ch)['width'])
+
+    def setWidth(self, ch, text):
+        st = self._channel(ch)
+        period = 1 / st['freq']
+        word = text.strip().upper()
+        if word in ('MIN', 'MINIMUM'):
+            width = _limits['duty'][0] / 100 * period
+        elif word in ('MAX', 'MAXIMUM'):
+            width = _limits['duty'][1] / 100 * period
+        else:
+            width = quantity(text, 'S')
+        duty = width / period * 100
+        if duty < _limits['duty'][0] or duty > _limits['duty'][1]:
+            raise ValueError('width {} out of range'.format(width))
+        st['duty'] = duty
+        st['width'] = width
+
+    # display
+    def querySaver(self):
+        return 'ON' if self.saver else 'OFF'
+
+    def setSaver(self, state):
+        self.saver = (state.upper() == 'ON')
@@ -0,0 +1,176 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#-------------------------------------------------------------------------------
+#  Simulated standard SCPI power supplies, for SCPI itself, RigolDP800 and
+#  BK9115
+#
+#  Commands select an output with INSTrument:NSELect and then set, query
+#  and measure it, as SCPI.py sends them. Headers take the long or short
+#  form of each node, may start with ':' (the root that SCPI.batch()
+#  prefixes every joined command with) and may leave out the optional
+#  nodes, ie. VOLT 5 is SOURce:VOLTage:LEVel:IMMediate:AMPLitude 5.
+#  Each output drives a resistive load, see SimSupply, and its
+#  over-voltage protection turns it off when it is set above the level.
+#-------------------------------------------------------------------------------
+
+import re
+
+from .base import SimSupply, quantity
+
+def header(spec):
+    """Return a regular expression matching the SCPI header spec
+
+    spec - header in the usual notation, the short form in upper case
+           and optional nodes in [], ie. '[SOURce:]VOLTage[:LEVel]'
+    """
+    def node(match):
+        short, rest = match.groups()
+        return short + ('(?:{})?'.format(rest.upper()) if rest else '')
+    pattern = re.sub(r'([A-Z]+)([a-z]*)', node, spec)
+    return ':?' + pattern.replace('[', '(?:').replace(']', ')?')
+
+# a boolean parameter
+_BOOL = '(ON|OFF|1|0)'
+
+_VOLT = '[SOURce:]VOLTage[:LEVel][:IMMediate][:AMPLitude]'
+_CURR = '[SOURce:]CURRent[:LEVel][:IMMediate][:AMPLitude]'
+_OVP = '[SOURce:]VOLTage:PROTection'
+
+class SCPIPSU(SimSupply):
+    """Simulated power supply with three 30 V 3 A outputs that answers
+    the standard SCPI commands, for the SCPI class itself
+    """
+
+    model = 'SCPIPSU'
+    idn = 'dcps,SCPIPSU,0,1.0'
+    # LXI over the LAN
+    link = dict(latency=0.002, jitter=0.001, bandwidth=1e6)
+    channels = 3
+    max_voltage = 30.0
+    max_current = 3.0
+    # replies of OUTPut:STATe? and the like, for False and True
+    states = ('0', '1')
+
+    _commands = [(header(spec) + args, name) for spec, args, name in [
+        ('INSTrument:NSELect', r' (\d+)', 'select'),
+        ('INSTrument:NSELect', r'\?', 'querySelect'),
+        ('OUTPut[:STATe]', ' ' + _BOOL, 'setOutput'),
+        ('OUTPut[:STATe]', r'\?', 'queryOutput'),
+        (_VOLT, ' (.+)', 'setVoltage'),
+        (_VOLT, r'\?', 'queryVoltage'),
+        (_CURR, ' (.+)', 'setCurrent'),
+        (_CURR, r'\?', 'queryCurrent'),
+        ('MEASure[:SCALar]:VOLTage[:DC]', r'\?', 'measureVoltage'),
+        ('MEASure[:SCALar]:CURRent[:DC]', r'\?', 'measureCurrent'),
+        (_OVP + '[:LEVel]', ' (.+)', 'setProtection'),
+        (_OVP + '[:LEVel]', r'\?', 'queryProtection'),
+        (_OVP + ':DELay', ' (.+)', 'setProtectionDelay'),
+        (_OVP + ':STATe', ' ' + _BOOL, 'setProtectionState'),
+        (_OVP + ':STATe', r'\?', 'queryProtectionState'),
+        ('SYSTem:LOCal', '', '_local'),
+        ('SYSTem:REMote', '', '_remote'),
+        ('SYSTem:RWLock[:STATe]', '(?: ' + _BOOL + ')?', '_rwLock'),
+        ('SYSTem:BEEPer[:STATe]', ' ' + _BOOL, 'setBeeper'),
+    ]]
+
+    def reset(self):
+        super(SCPIPSU, self).reset()
+        self.selected = 1
+        self.ovp = {ch: self.max_voltage * 1.1
+                        for ch in range(1, self.channels + 1)}
+        self.ovp_delay = {ch: 0.0 for ch in range(1, self.channels + 1)}
+        self.protect = {ch: False for ch in range(1, self.channels + 1)}
+        self.remote = False
+        self.locked = False
+        self.beeper = True
+
+    def _state(self, value):
+        return value.upper() in ('ON', '1')
+
+    def _protect(self, ch):
+        # over-voltage protection trips at once, the delay is kept but
+        # not simulated
+        if self.protect[ch] and self.on[ch] and self.vset[ch] > self.ovp[ch]:
+            self.on[ch] = False
+
+    def select(self, ch):
+        self.selected = self._channel(ch)
+
+    def querySelect(self):
+        return str(self.selected)
+
+    def setOutput(self, state):
+        self.on[self.selected] = self._state(state)
+        self._protect(self.selected)
+
+    def queryOutput(self):
+        return self.states[self.on[self.selected]]
+
+    def setVoltage(self, value):
+        self._setVoltage(self.selected, value)
+        self._protect(self.selected)
+
+    def queryVoltage(self):
+        return '{:.3f}'.format(self.vset[self.selected])
+
+    def setCurrent(self, value):
+        self._setCurrent(self.selected, value)
+
+    def queryCurrent(self):
+        return '{:.3f}'.format(self.iset[self.selected])
+
+    def measureVoltage(self):
+        return '{:.3f}'.format(self.measure(self.selected)[0])
+
+    def measureCurrent(self):
+        return '{:.3f}'.format(self.measure(self.selected)[1])
+
+    def setProtection(self, value):
+        self.ovp[self.selected] = quantity(value, 'V')
+        self._protect(self.selected)
+
+    def queryProtection(self):
+        return '{:.3f}'.format(self.ovp[self.selected])
+
+    def setProtectionDelay(self, value):
+        self.ovp_delay[self.selected] = quantity(value, 'S')
+
+    def setProtectionState(self, state):
+        self.protect[self.selected] = self._state(state)
+        self._protect(self.selected)
+
+    def queryProtectionState(self):
+        return self.states[self.protect[self.selected]]
+
+    def _local(self):
+        self.remote = False
+        self.locked = False
+
+    def _remote(self):
+        self.remote = True
+
+    def _rwLock(self, state=None):
+        self.remote = True
+        self.locked = state is None or self._state(state)
+
+    def setBeeper(self, state):
+        self.beeper = self._state(state)
+
+class DP800(SCPIPSU):
+    """Simulated Rigol DP832, three outputs answering ON and OFF"""
+
+    model = 'DP800'
+    idn = 'RIGOL TECHNOLOGIES,DP832,DP8C000000000,00.01.14'
+    states = ('OFF', 'ON')
+
+class BK9115(SCPIPSU):
+    """Simulated BK Precision 9115, one 80 V 60 A output"""
+
+    model = 'BK9115'
+    idn = 'B&K Precision,9115,000000000000,1.00-1.00'
+    # USBTMC
+    link = dict(latency=0.001, jitter=0.0005, bandwidth=1e6)
+    channels = 1
+    max_voltage = 80.0
+    max_current = 60.0
@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#-------------------------------------------------------------------------------
+#  Stand in for a PyVISA message based resource, talking to a simulated
+#  instrument instead of a bus
+#-------------------------------------------------------------------------------
+
+from threading import Lock
+from time import sleep
+
+from pyvisa.constants import StatusCode
+from pyvisa.errors import InvalidSession, VisaIOError
+
+class SimSession(object):
+    """The part of pyvisa's MessageBasedResource the dcps drivers use
+
+    write() hands the message to the instrument, which answers at once
+    into an output buffer that read(), read_bytes() and read_raw() take
+    from. Both directions go through the instrument's Link, so they take
+    as long as it says. A read with nothing (or not enough) to take
+    waits for timeout and raises the same VisaIOError a real session
+    would.
+    """
+
+    def __init__(self, resource_name, instrument, link,
+                 read_termination=None, write_termination='\r\n',
+                 timeout=2000, chunk_size=20*1024, **kwargs):
+        """resource_name - the SIM:: resource string that was opened
+        instrument    - the SimInstrument answering
+        link          - the Link messages go through
+        kwargs        - any other attributes, ie. baud_rate, kept but unused
+        """
+        self.resource_name = resource_name
+        self.instrument = instrument
+        self.link = link
+        self.read_termination = read_termination
+        self.write_termination = write_termination
+        self.timeout = timeout
+        self.chunk_size = chunk_size
+        self.baud_rate = 9600
+        for name, value in kwargs.items():
+            setattr(self, name, value)
+        self._out = bytearray()
+        self._lock = Lock()
+        self._open = True
+
+    @property
+    def session(self):
+        if not self._open:
+            raise InvalidSession()
+        return id(self)
+
+    def close(self):
+        self._open = False
+        with self._lock:
+            self._out.clear()
+
+    def clear(self):
+        """Drop anything the instrument sent that was not read"""
+        with self._lock:
+            self._out.clear()
+
+    def write(self, message, termination=None, encoding=None):
+        """Send message and return the number of bytes written"""
+        self.session
+        if termination is None:
+            termination = self.write_termination or ''
+        data = (message + termination).encode(encoding or 'ascii')
+        self.link.transfer(len(data))
+        reply = self.instrument.handle(message)
+        if reply:
+            with self._lock:
+                self._out += reply
+        return len(data)
+
+    def write_raw(self, message):
+        return self.write(message.decode('ascii'), termination='')
+
+    def _timeout(self):
+        # a real session waits this long for bytes that never come
+        if self.timeout is not None:
+            sleep(self.timeout / 1000)
+        raise VisaIOError(StatusCode.error_timeout)
+
+    def _take(self, count):
+        # take count bytes from the front of the output buffer, or
+        # everything there is if count is None
+        with self._lock:
+            if count is None:
+                count = len(self._out)
+            if count == 0 or len(self._out) < count:
+                data = None
+            else:
+                data = bytes(self._out[:count])
+                del self._out[:count]
+        if data is None:
+            self._timeout()
+        self.link.transfer(len(data))
+        return data
+
+    def read(self, termination=None, encoding=None):
+        """Return the next message, without its termination"""
+        self.session
+        if termination is None:
+            termination = self.read_termination
+        if termination:
+            term = termination.encode('ascii')
+            with self._lock:
+                end = self._out.find(term)
+            if end < 0:
+                self._timeout()
+            data = self._take(end + len(term))[:end]
+        else:
+            # no termination character, read to the end of the message
+            data = self._take(None)
+        return data.decode(encoding or 'ascii')
+
+    def read_bytes(self, count, chunk_size=None, break_on_termchar=False):
+        """Return exactly count bytes"""
+        self.session
+        return self._take(count)
+
+    def read_raw(self, size=None):
+        """Return everything the instrument has sent"""
+        self.session
+        return self._take(None)
+
+    def query(self, message, delay=None):
+        """Send message and return the reply"""
+        self.write(message)
+        if delay:
+            sleep(delay)
+        return self.read()
+
+    def __repr__(self):
+        return '<SimSession({!r})>'.format(self.resource_name)
@@ -0,0 +1,232 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#-------------------------------------------------------------------------------
+#  Simulated Siglent SDS1202X-E oscilloscope, for SiglentSDS1202XE
+#
+#  Every C<n>:WF? DAT2 sends a fresh capture of that channel's signal as an
+#  IEEE 488.2 block of int8 codes, scaled with the channel's volts/div and
+#  offset and sampled at the rate the timebase and memory depth give, with
+#  trigger jitter and noise on top. While stopped the last capture is sent
+#  again.
+#-------------------------------------------------------------------------------
+
+import numpy as np
+
+from .base import SimInstrument, quantity
+
+# memory depths MSIZ accepts, as sent and in points
+_depths = {'14K': 14e3, '140K': 140e3, '1.4M': 1.4e6, '14M': 14e6}
+
+def sine(freq=250e3, amp=1.0, offset=0.0):
+    """Signal of a sine wave, amp volts peak, for SDS1202XE.signals"""
+    def signal(t):
+        return amp * np.sin(2 * np.pi * freq * t) + offset
+    return signal
+
+def pulses(freq=100e3, amp=2.0, duty=30.0, rise=20e-9):
+    """Signal of a pulse train from 0 to amp volts with edges rise seconds
+    long, triggered on the rising edge at t=0
+    """
+    period = 1 / freq
+    width = duty / 100 * period
+    def signal(t):
+        phase = np.mod(t, period)
+        up = np.clip(phase / rise, 0, 1)
+        down = np.clip((phase - width) / rise, 0, 1)
+        return amp * (up - down)
+    return signal
+
+class SDS1202XE(SimInstrument):
+    """Simulated Siglent SDS1202X-E with two channels
+
+    signals - {channel: function of an array of times in seconds from
+              the trigger, returning volts}, a sine on channel 1 and a
+              pulse train on channel 2 unless given
+    noise   - standard deviation of the noise added to every sample, in
+              volts
+    jitter  - standard deviation of the trigger position, in seconds
+    seed    - seed of the noise and jitter, so runs can be repeated
+    """
+
+    model = 'SDS1202XE'
+    idn = 'Siglent Technologies,SDS1202X-E,SDS1ECDD2R8216,8.1.6.1.37R2'
+    # USBTMC, the scope itself is the slow part of a transfer
+    link = dict(latency=0.002, jitter=0.001, bandwidth=4e6)
+    channels = 2
+    max_sara = 1e9
+
+    _commands = [
+        (r'CHDR (OFF|SHORT|LONG)', 'setHeader'),
+        (r'MSIZ\?', 'queryDepth'),
+        (r'MSIZ (\S+)', 'setDepth'),
+        (r'C(\d):VDIV\?', 'queryVdiv'),
+        (r'C(\d):VDIV (.+)', 'setVdiv'),
+        (r'C(\d):OFST\?', 'queryOffset'),
+        (r'C(\d):OFST (.+)', 'setOffset'),
+        (r'TDIV\?', 'queryTdiv'),
+        (r'TDIV (.+)', 'setTdiv'),
+        (r'SARA\?', 'querySara'),
+        (r'TRDL\?', 'queryTrdl'),
+        (r'TRDL (.+)', 'setTrdl'),
+        (r'TRMD\?', 'queryTrigger'),
+        (r'TRMD (AUTO|NORM|SINGLE|STOP)', 'setTrigger'),
+        (r'STOP', 'stop'),
+        (r'WFSU\?', 'querySetup'),
+        (r'WFSU (.+)', 'setSetup'),
+        (r'C(\d):WF\? DAT2', 'waveform'),
+    ]
+
+    def __init__(self, signals=None, noise=0.01, jitter=1e-9, seed=None):
+        if signals is None:
+            signals = {1: sine(), 2: pulses()}
+        self.signals = signals
+        self.noise = noise
+        self.trigger_jitter = jitter
+        self._rng = np.random.default_rng(seed)
+        self.captures = 0        # waveforms sent, for benchmarks
+        super(SDS1202XE, self).__init__()
+
+    def reset(self):
+        self.header = 'SHORT'
+        self.depth = '14K'
+        self.vdiv = {ch: 1.0 for ch in range(1, self.channels + 1)}
+        self.ofst = {ch: 0.0 for ch in range(1, self.channels + 1)}
+        self.tdiv = 1e-6
+        self.trdl = 0.0
+        self.trmd = 'AUTO'
+        self.setup = {'FP': 0, 'NP': 0, 'SP': 0}
+        self._last = {}          # last capture of each channel
+
+    def _channel(self, ch):
+        ch = int(ch)
+        if ch < 1 or ch > self.channels:
+            raise ValueError('no channel {}'.format(ch))
+        return ch
+
+    def _answer(self, header, value, unit=''):
+        # CHDR OFF leaves the header and unit out of the answer
+        if self.header == 'OFF':
+            return value
+        return '{} {}{}'.format(header, value, unit)
+
+    def sara(self):
+        """Return the sampling rate the timebase and memory depth give"""
+        return min(self.max_sara, _depths[self.depth] / (14 * self.tdiv))
+
+    def points(self):
+        """Return the number of points in a capture"""
+        return int(round(self.sara() * self.tdiv * 14))
+
+    # settings
+    def setHeader(self, header):
+        self.header = header.upper()
+
+    def queryDepth(self):
+        return self._answer('MSIZ', self.depth)
+
+    def setDepth(self, depth):
+        depth = depth.upper()
+        if depth not in _depths:
+            raise ValueError('memory depth {}'.format(depth))
+        self.depth = depth
+
+    def queryVdiv(self, ch):
+        ch = self._channel(ch)
+        return self._answer('C{}:VDIV'.format(ch),
+                            '{:.2E}'.format(self.vdiv[ch]), 'V')
+
+    def setVdiv(self, ch, text):
+        ch = self._channel(ch)
+        vdiv = quantity(text, 'V')
+        if vdiv < 500e-6 or vdiv > 10:
+            raise ValueError('{} V/div out of range'.format(vdiv))
+        self.vdiv[ch] = vdiv
+
+    def queryOffset(self, ch):
+        ch = self._channel(ch)
+        return self._answer('C{}:OFST'.format(ch),
+                            '{:.2E}'.format(self.ofst[ch]), 'V')
+
+    def setOffset(self, ch, text):
+        ch = self._channel(ch)
+        self.ofst[ch] = quantity(text, 'V')
+
+    def queryTdiv(self):
+        return self._answer('TDIV', '{:.2E}'.format(self.tdiv), 'S')
+
+    def setTdiv(self, text):
+        tdiv = quantity(text, 'S')
+        if tdiv < 1e-9 or tdiv > 100:
+            raise ValueError('{} s/div out of range'.format(tdiv))
+        self.tdiv = tdiv
+
+    def querySara(self):
+        return self._answer('SARA', '{:.2E}'.format(self.sara()), 'Sa/s')
+
+    def queryTrdl(self):
+        return self._answer('TRDL', '{:.2E}'.format(self.trdl), 'S')
+
+    def setTrdl(self, text):
+        self.trdl = quantity(text, 'S')
+
+    def queryTrigger(self):
+        return self._answer('TRMD', self.trmd)
+
+    def setTrigger(self, mode):
+        self.trmd = mode.upper()
+
+    def stop(self):
+        self.trmd = 'STOP'
+
+    def querySetup(self):
+        return self._answer('WFSU', 'FP,{FP},NP,{NP},SP,{SP}'.format(
+            **self.setup))
+
+    def setSetup(self, text):
+        words = [w.strip().upper() for w in text.split(',')]
+        if len(words) % 2:
+            raise ValueError('WFSU {}'.format(text))
+        setup = dict(self.setup)
+        for name, value in zip(words[::2], words[1::2]):
+            if name not in setup:
+                raise ValueError('WFSU {}'.format(name))
+            setup[name] = int(float(value))
+        self.setup = setup
+
+    # waveforms
+    def capture(self, ch):
+        """Return a new capture of channel ch as int8 codes"""
+        n = self.points()
+        sara = self.sara()
+        # sample times from the trigger, which sits 7 divisions in
+        t = np.arange(n) / sara - self.tdiv * 7 + self.trdl
+        if self.trigger_jitter:
+            t += self._rng.normal(0, self.trigger_jitter)
+        volts = self.signals[ch](t) if ch in self.signals else np.zeros(n)
+        if self.noise:
+            volts = volts + self._rng.normal(0, self.noise, n)
+        # each code is 1/25 of a division
+        codes = np.rint((volts + self.ofst[ch]) * 25 / self.vdiv[ch])
+        self.captures += 1
+        return np.clip(codes, -128, 127).astype(np.int8)
+
+    def waveform(self, ch):
+        ch = self._channel(ch)
+        if self.trmd != 'STOP' or ch not in self._last:
+            self._last[ch] = self.capture(ch)
+        data = self._last[ch]
+
+        # WFSU picks the first point, the number of points (0 for all)
+        # and the step between them (0 or 1 for every point)
+        first, count, step = (self.setup['FP'], self.setup['NP'],
+                              self.setup['SP'])
+        data = data[first::max(step, 1)]
+        if count:
+            data = data[:count]
+
+        size = str(len(data)).zfill(9)
+        header = 'C{}:WF '.format(ch) if self.header != 'OFF' else ''
+        # the block is followed by two newlines, as from the real scope
+        return ((header + 'DAT2,#9' + size).encode('ascii') +
+                data.tobytes() + b'\n\n')
@@ -0,0 +1,335 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#-------------------------------------------------------------------------------
+#  Per-command instrumentation of the instrument traffic
+#
+#  Every session dcps.resources hands out is wrapped in a TracedSession,
+#  so the traffic of SCPI, SiglentSDS1202XE and NewportESP301 alike goes
+#  through one place. While enabled, each write, query and read is timed
+#  and counted per resource and command, with the bytes moved, errors and
+#  a latency histogram. The sleeps the drivers do while waiting for a
+#  setting to take effect are recorded too, so they show up next to the
+#  commands.
+#
+#      trace.enable(events=True)
+#      ...
+#      print(trace.table())            # hot commands first
+#      trace.exportTrace('trace.json') # open in chrome://tracing or Perfetto
+#
+#  Disabled (the default), a traced session only checks one flag before
+#  passing each call on.
+#-------------------------------------------------------------------------------
+
+from bisect import bisect_right
+from collections import deque
+from functools import lru_cache
+import json
+import os
+import re
+import sys
+from threading import Event, Lock, Thread, current_thread
+import time
+
+_enabled = False
+_lock = Lock()
+_stats = {}          # (resource, op, command) -> CommandStats
+_events = None       # deque of trace events, None when not recording them
+_t0 = time.perf_counter()
+_reporter = None
+
+# upper edges of the latency histogram buckets, 10 us to 10 s with four
+# buckets per decade, plus one for anything longer
+EDGES = [10 ** (e / 4) for e in range(-20, 5)]
+
+class CommandStats(object):
+    """Counts, bytes, errors and latencies of one command"""
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.bytes_out = 0
+        self.bytes_in = 0
+        self.total = 0.0
+        self.min = None
+        self.max = 0.0
+        self.histogram = [0] * (len(EDGES) + 1)
+
+    def add(self, elapsed, bytes_out=0, bytes_in=0, error=False):
+        self.count += 1
+        self.errors += bool(error)
+        self.bytes_out += bytes_out
+        self.bytes_in += bytes_in
+        self.total += elapsed
+        if self.min is None or elapsed < self.min:
+            self.min = elapsed
+        if elapsed > self.max:
+            self.max = elapsed
+        self.histogram[bisect_right(EDGES, elapsed)] += 1
+
+    def percentile(self, q):
+        """Return the upper edge of the histogram bucket holding the q-th
+        percentile (0 to 100), an upper bound good to a factor of 1.8
+        within the fastest and slowest call
+        """
+        if not self.count:
+            return None
+        rank = q / 100 * self.count
+        seen = 0
+        for i, n in enumerate(self.histogram):
+            seen += n
+            if seen >= rank and n:
+                edge = EDGES[i] if i < len(EDGES) else self.max
+                return max(self.min, min(edge, self.max))
+        return self.max
+
+_TRAILING_NUMBER = re.compile(r'(?<=[A-Za-z])[-+]?[0-9.]+(?:[eE][-+]?[0-9]+)?$')
+
+@lru_cache(maxsize=4096)
+def commandKey(message):
+    """Return message without its arguments, so every setting of a
+    command is counted together: 'V1 5.0' -> 'V1', '1PA2.5' -> '1PA',
+    ':SOUR1:APPL:PULS 1000,5,0,0' -> ':SOUR1:APPL:PULS'. The commands of
+    a compound message are kept, joined with ';'
+    """
+    keys = []
+    for cmd in message.strip().split(';'):
+        cmd = cmd.strip()
+        if ' ' in cmd:
+            cmd = cmd.split(' ', 1)[0]
+        else:
+            # arguments written straight after the command, ie. Newport's
+            cmd = _TRAILING_NUMBER.sub('', cmd)
+        keys.append(cmd)
+    return ';'.join(keys)
+
+def enable(events=False, max_events=1000000):
+    """Start recording
+
+    events     - also keep every call as a trace event for exportTrace()
+    max_events - most trace events kept, the oldest are dropped first
+    """
+    global _enabled, _events
+    with _lock:
+        if events:
+            _events = deque(_events or (), maxlen=max_events)
+        _enabled = True
+
+def disable():
+    """Stop recording, what was recorded is kept"""
+    global _enabled
+    _enabled = False
+
+def isEnabled():
+    return _enabled
+
+def reset():
+    """Forget everything recorded so far"""
+    with _lock:
+        _stats.clear()
+        if _events is not None:
+            _events.clear()
+
+def record(resource, op, command, start, end, bytes_out=0, bytes_in=0,
+           error=None):
+    """Record one call that ran from start to end (perf_counter times)
+
+    op - 'write', 'query', 'read' or 'sleep'
+    """
+    key = (resource, op, command)
+    with _lock:
+        st = _stats.get(key)
+        if st is None:
+            st = _stats[key] = CommandStats()
+        st.add(end - start, bytes_out, bytes_in, error is not None)
+        if _events is not None:
+            thread = current_thread()
+            event = {'name': command, 'cat': op, 'ph': 'X',
+                     'ts': (start - _t0) * 1e6, 'dur': (end - start) * 1e6,
+                     'pid': resource, 'tid': thread.name,
+                     'args': {'bytes_out': bytes_out, 'bytes_in': bytes_in}}
+            if error is not None:
+                event['args']['error'] = repr(error)
+            _events.append(event)
+
+def sleep(seconds, resource=None, why='sleep'):
+    """time.sleep(seconds), recorded as a 'sleep' of resource when enabled"""
+    if not _enabled:
+        time.sleep(seconds)
+        return
+    start = time.perf_counter()
+    time.sleep(seconds)
+    record(resource, 'sleep', why, start, time.perf_counter())
+
+def stats():
+    """Return a row for each recorded (resource, op, command), the most
+    total time first
+    """
+    with _lock:
+        items = [(key, st) for key, st in _stats.items()]
+        rows = []
+        for (resource, op, command), st in items:
+            rows.append({'resource': resource, 'op': op, 'command': command,
+                         'count': st.count, 'errors': st.errors,
+                         'bytes_out': st.bytes_out, 'bytes_in': st.bytes_in,
+                         'total': st.total, 'mean': st.total / st.count,
+                         'min': st.min, 'p50': st.percentile(50),
+                         'p90': st.percentile(90), 'p99': st.percentile(99),
+                         'max': st.max, 'histogram': list(st.histogram)})
+    rows.sort(key=lambda row: row['total'], reverse=True)
+    return rows
+
+def table(top=None):
+    """Return the stats as a text table, the most total time first
+
+    top - only the first this many rows, None for all of them
+    """
+    rows = stats()
+    if top is not None:
+        rows = rows[:top]
+    lines = ['{:<28} {:<5} {:<24} {:>7} {:>4} {:>10} {:>9} {:>8} {:>8} '
+             '{:>8} {:>8}'.format('resource', 'op', 'command', 'count', 'err',
+                                  'bytes', 'total ms', 'mean ms', 'p50 ms',
+                                  'p90 ms', 'max ms')]
+    for row in rows:
+        lines.append('{:<28} {:<5} {:<24} {:>7} {:>4} {:>10} {:>9.1f} '
+                     '{:>8.2f} {:>8.2f} {:>8.2f} {:>8.2f}'.format(
+            str(row['resource'])[-28:], row['op'], row['command'][:24],
+            row['count'], row['errors'], row['bytes_out'] + row['bytes_in'],
+            row['total'] * 1e3, row['mean'] * 1e3, row['p50'] * 1e3,
+            row['p90'] * 1e3, row['max'] * 1e3))
+    return '\n'.join(lines)
+
+def exportStats(filename):
+    """Write the stats to filename as JSON"""
+    with open(filename, 'w') as f:
+        json.dump({'edges': EDGES, 'stats': stats()}, f, indent=1)
+
+def exportTrace(filename):
+    """Write the recorded trace events to filename in the Chrome trace
+    event format, with one track per resource and thread
+    """
+    with _lock:
+        events = list(_events or ())
+    # the format wants numeric processes, name them after the resources
+    pids = {}
+    out = []
+    for event in events:
+        resource = event['pid']
+        if resource not in pids:
+            pids[resource] = len(pids) + 1
+            out.append({'name': 'process_name', 'ph': 'M',
+                        'pid': pids[resource],
+                        'args': {'name': str(resource)}})
+        event = dict(event, pid=pids[resource])
+        out.append(event)
+    with open(filename, 'w') as f:
+        json.dump({'traceEvents': out, 'displayTimeUnit': 'ms'}, f)
+
+def startReporting(interval=10.0, top=15, file=None):
+    """Print the table to file (stderr by default) every interval seconds
+    until stopReporting()
+    """
+    global _reporter
+    stopReporting()
+    stop = Event()
+
+    def report():
+        while not stop.wait(interval):
+            print(table(top), file=file or sys.stderr)
+            print(file=file or sys.stderr)
+
+    thread = Thread(target=report, name='dcps trace report', daemon=True)
+    _reporter = (thread, stop)
+    thread.start()
+
+def stopReporting():
+    global _reporter
+    if _reporter is not None:
+        thread, stop = _reporter
+        stop.set()
+        thread.join()
+        _reporter = None
+
+class TracedSession(object):
+    """Wraps a VISA session, recording its traffic while enabled
+
+    Everything other than write(), query() and the reads is passed
+    straight to the session, attributes included.
+    """
+
+    def __init__(self, session, resource):
+        object.__setattr__(self, '_session', session)
+        object.__setattr__(self, '_resource', resource)
+        # the command a following read() belongs to
+        object.__setattr__(self, '_last', None)
+
+    def __getattr__(self, name):
+        return getattr(self._session, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._session, name, value)
+
+    def _call(self, op, command, func, args, kwargs, bytes_out):
+        start = time.perf_counter()
+        try:
+            ret = func(*args, **kwargs)
+        except Exception as err:
+            record(self._resource, op, command, start, time.perf_counter(),
+                   bytes_out, 0, err)
+            raise
+        end = time.perf_counter()
+        bytes_in = len(ret) if isinstance(ret, (str, bytes)) else 0
+        record(self._resource, op, command, start, end, bytes_out, bytes_in)
+        return ret
+
+    def _sent(self, message):
+        term = getattr(self._session, 'write_termination', None) or ''
+        return len(message) + len(term)
+
+    def write(self, message, *args, **kwargs):
+        if not _enabled:
+            return self._session.write(message, *args, **kwargs)
+        command = commandKey(message)
+        object.__setattr__(self, '_last', command)
+        return self._call('write', command, self._session.write,
+                          (message,) + args, kwargs, self._sent(message))
+
+    def query(self, message, *args, **kwargs):
+        if not _enabled:
+            return self._session.query(message, *args, **kwargs)
+        command = commandKey(message)
+        object.__setattr__(self, '_last', command)
+        return self._call('query', command, self._session.query,
+                          (message,) + args, kwargs, self._sent(message))
+
+    def read(self, *args, **kwargs):
+        if not _enabled:
+            return self._session.read(*args, **kwargs)
+        return self._call('read', self._last, self._session.read,
+                          args, kwargs, 0)
+
+    def read_bytes(self, *args, **kwargs):
+        if not _enabled:
+            return self._session.read_bytes(*args, **kwargs)
+        return self._call('read', self._last, self._session.read_bytes,
+                          args, kwargs, 0)
+
+    def read_raw(self, *args, **kwargs):
+        if not _enabled:
+            return self._session.read_raw(*args, **kwargs)
+        return self._call('read', self._last, self._session.read_raw,
+                          args, kwargs, 0)
+
+    def __repr__(self):
+        return '<TracedSession({!r})>'.format(self._session)
+
+def wrap(session, resource):
+    """Return session wrapped in a TracedSession for resource"""
+    if isinstance(session, TracedSession):
+        return session
+    return TracedSession(session, resource)
+
+# DCPS_TRACE=1 in the environment records from the start
+if os.environ.get('DCPS_TRACE'):
+    enable(events=True)
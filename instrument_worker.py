@@ -0,0 +1,112 @@
+# Per-instrument I/O threads for the GUIs
+# every instrument gets one InstrumentWorker, a thread that owns all of its
+# VISA traffic. the GUI hands it jobs and gets the results back as Qt
+# signals, so a slow reply from one instrument never freezes the window.
+#
+# jobs wait in a priority queue: anything the user clicked runs before the
+# background polls, and a poll that is already waiting is not queued twice,
+# so polls never pile up behind a slow instrument.
+#
+# usage:
+#   worker=InstrumentWorker(psu,'PSU 1')
+#   worker.start()
+#   worker.submit(psu.setVoltage,5.0)                # user action
+#   worker.poll(read_status,show_status)   # show_status(read_status())
+#   ...
+#   worker.stop()
+
+from PyQt5.QtCore import QObject, pyqtSignal, pyqtSlot
+
+from itertools import count
+from queue import PriorityQueue
+from threading import Lock, Thread
+import traceback
+
+# job priorities, lower runs first
+URGENT=-10 # ahead of queued user actions too, ie. an emergency stop
+USER=0
+STOP=5 # stop() lets user actions finish but drops waiting polls
+POLL=10
+
+class InstrumentWorker(QObject):
+    # (callback,result) of a finished job, delivered on the GUI thread
+    _done=pyqtSignal(object,object)
+    # emitted with a message when a job raises
+    error=pyqtSignal(str)
+
+    def __init__(self,driver,name=None):
+        # driver: the dcps instance this thread owns
+        # name: used in error messages and the thread name
+        super(InstrumentWorker,self).__init__()
+        self.driver=driver
+        self.name=name if name is not None else type(driver).__name__
+        self._queue=PriorityQueue()
+        self._seq=count() # keeps jobs of equal priority in order
+        self._polls=set() # keys of polls waiting in the queue
+        self._lock=Lock()
+        self._thread=None
+        # the worker lives on the GUI thread, so emitting from the I/O
+        # thread queues the callback onto the GUI thread
+        self._done.connect(self._deliver)
+
+    def start(self):
+        self._thread=Thread(target=self._run,name=self.name,daemon=True)
+        self._thread.start()
+
+    def stop(self,timeout=None):
+        # finish waiting user actions, then end the thread
+        if self._thread is None:
+            return
+        self._put(STOP,None)
+        self._thread.join(timeout)
+        self._thread=None
+
+    def isRunning(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def submit(self,func,*args,callback=None,priority=USER,**kwargs):
+        # run func(*args,**kwargs) on the I/O thread ahead of any polls
+        # callback(result) is then called on the GUI thread
+        self._put(priority,(func,args,kwargs,callback,None))
+
+    def poll(self,func,callback=None,key=None):
+        # run func() on the I/O thread behind any user actions
+        # a poll with the same key (default: func) that is still waiting
+        # is not queued again
+        if key is None:
+            key=func
+        with self._lock:
+            if key in self._polls:
+                return
+            self._polls.add(key)
+        self._put(POLL,(func,(),{},callback,key))
+
+    def _put(self,priority,job):
+        self._queue.put((priority,next(self._seq),job))
+
+    def _run(self):
+        while True:
+            priority,seq,job=self._queue.get()
+            if job is None:
+                break
+            func,args,kwargs,callback,key=job
+            if key is not None:
+                with self._lock:
+                    self._polls.discard(key)
+            try:
+                ret=func(*args,**kwargs)
+            except Exception as err:
+                self.error.emit(("{}: {}").format(self.name,
+                    traceback.format_exception_only(type(err),err)[-1].strip()))
+                continue
+            if callback is not None:
+                self._done.emit(callback,ret)
+
+    @pyqtSlot(object,object)
+    def _deliver(self,callback,ret):
+        # an exception escaping a slot would abort the whole program
+        try:
+            callback(ret)
+        except Exception as err:
+            self.error.emit(("{}: {}").format(self.name,
+                traceback.format_exception_only(type(err),err)[-1].strip()))
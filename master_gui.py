@@ -6,24 +6,41 @@ from psu2 import PSU2
 from pulse import Pulse
 from scope import Scope
 from motion import Motion
+from connector import Connector
+from readback_log import ReadbackLog
 
 from PyQt5.QtCore import Qt, QSize, QTimer
 from PyQt5.QtGui import QPalette
 from PyQt5.QtWidgets import QApplication, QDialog, QGridLayout, QWidget
 
+from dcps import sim, trace
+
+from time import strftime
 import sys
 
+# the simulators that stand in for the lab's instruments when run with --sim
+SIMULATED={'ASRL/dev/ttyACM1::INSTR':'SIM::EL302P::INSTR',
+    'ASRL/dev/ttyACM0::INSTR':'SIM::CPX400DP::INSTR',
+    'USB0::6833::1600::DG5T220100004\x00::0::INSTR':'SIM::DG5000::INSTR',
+    'USB0::62701::60986::SDS1ECDD2R8216::0::INSTR':'SIM::SDS1202XE::INSTR',
+    'ASRL/dev/ttyUSB0::INSTR':'SIM::ESP301::INSTR'}
+
 class WidgetGallery(QDialog):
-    def __init__(self,parent=None):
+    def __init__(self,parent=None,log=None):
+        # log: ReadbackLog for the PSU measurements, one keeping them only
+        # in memory if None
         super(WidgetGallery,self).__init__(parent)
 
         mainLayout=QGridLayout()
+        self.log=log if log is not None else ReadbackLog()
 
-        self.PSU1=PSU1()
-        self.PSU2=PSU2()
-        self.Pulse=Pulse()
+        # every panel starts as a placeholder and is filled in as its
+        # instrument answers, all four connect at the same time
+        self.PSU1=PSU1(connect=False,log=self.log)
+        self.PSU2=PSU2(connect=False,log=self.log)
+        self.Pulse=Pulse(connect=False)
         #self.Scope=Scope()
-        self.Motion=Motion()
+        self.Motion=Motion(connect=False)
 
 
         mainLayout.addWidget(self.PSU1,0,1)
@@ -38,7 +55,21 @@ class WidgetGallery(QDialog):
         self.Motion.setMaximumSize(700,1000)
         self.setLayout(mainLayout)
 
+        # seconds before a panel that is still connecting is given up on
+        self.connector=Connector([self.PSU1,self.PSU2,self.Pulse,self.Motion],
+            timeout=10)
+        # start once the event loop runs, so the window shows first
+        QTimer.singleShot(0,self.connector.start)
+
     def closeEvent(self,event):
+        # let each panel finish what the user asked for, then stop its I/O
+        # thread so the shutdown commands below have the instrument to
+        # themselves
+        for panel in [self.PSU1,self.PSU2,self.Pulse,self.Motion]:
+            if panel.isConnected:
+                panel.poller.stop()
+                panel.worker.stop(timeout=5)
+        self.log.close()
         if self.PSU1.isConnected:
             self.PSU1.aim1.outputOff(wait=0)
             self.PSU1.aim1.close()
@@ -50,7 +81,7 @@ class WidgetGallery(QDialog):
             self.Pulse.Rigol.outputOff(2,wait=0)
             self.Pulse.Rigol.close()
         """if self.Scope.isConnected:
-            self.Scope.Siglent.close_inst()"""
+            self.Scope.close_scope()"""
         if self.Motion.isConnected:
             self.Motion.newport.motor_off(1)
             self.Motion.newport.motor_off(2)
@@ -59,8 +90,25 @@ class WidgetGallery(QDialog):
 
 
 if __name__=="__main__":
+    if "--sim" in sys.argv:
+        sim.redirectAll(SIMULATED)
+    if "--trace" in sys.argv:
+        # time every command, with a table of the busiest ones on stderr
+        # every 10 s and the whole trace in trace.json on exit
+        trace.enable(events=True)
+        trace.startReporting(10)
+    # the PSU measurements go to readbacks_<date>_<time>/ unless --no-log,
+    # load_readbacks() in readback_log.py reads them back
+    log=None
+    if "--no-log" not in sys.argv:
+        log=ReadbackLog(strftime("readbacks_%Y%m%d_%H%M%S"))
     app=QApplication(sys.argv)
     app.setStyle('Fusion')
-    wg=WidgetGallery()
+    wg=WidgetGallery(log=log)
     wg.show()
-    sys.exit(app.exec_())
+    ret=app.exec_()
+    if trace.isEnabled():
+        trace.stopReporting()
+        print(trace.table(),file=sys.stderr)
+        trace.exportTrace('trace.json')
+    sys.exit(ret)
@@ -2,54 +2,83 @@
 # 07/28/2021
 # adapted from motion_control_gui.py
 
-from PyQt5.QtCore import Qt, QSize, QTimer
+from PyQt5.QtCore import Qt, QSize
 from PyQt5.QtGui import QPalette
 from PyQt5.QtWidgets import (QApplication, QComboBox, QDialog, QFrame,
     QGridLayout, QGroupBox, QHBoxLayout, QLabel, QLCDNumber, QLineEdit,
     QPushButton, QVBoxLayout, QWidget, QMessageBox)
 
 from dcps import NewportESP301
+from instrument_worker import InstrumentWorker, URGENT
+from poller import Poller
 from pyvisa.errors import VisaIOError
 from serial.serialutil import SerialException
 
 wait=100
 
 class Motion(QDialog):
-    def __init__(self,parent=None):
+    def __init__(self,parent=None,connect=True):
+        # connect=False only shows a placeholder, open_instrument() and
+        # show_instrument() are then left to the caller (see connector.py)
         super(Motion,self).__init__(parent)
 
-        mainLayout=QGridLayout()
-        try:
-            self.create_control_box()
-            self.isConnected=True
-        except VisaIOError as err:
-            self.control_box=QLabel("Motion Controller Not Connected:",str(err))
-            self.isConnected=False
-        except SerialException as err:
-            self.control_box=QLabel("Motion Controller Not Connected:",str(err))
-            self.isConnected=False
+        self.mainLayout=QGridLayout()
+        self.isConnected=False
+        self.control_box=QLabel("Motion Controller Connecting\u2026")
 
-        mainLayout.addWidget(self.control_box)
-        self.setLayout(mainLayout)
+        self.mainLayout.addWidget(self.control_box)
+        self.setLayout(self.mainLayout)
 
+        if connect:
+            try:
+                self.open_instrument()
+                err=None
+            except VisaIOError as e:
+                err=e
+            except SerialException as e:
+                err=e
+            self.show_instrument(err)
 
     def open_newport(self,path):
         self.newport=NewportESP301(path)
         self.newport.open_inst()
 
-
-    def create_control_box(self):
-
+    def open_instrument(self):
+        # connect and read everything the panel shows, touches no widgets
+        # so it can run on any thread
         self.open_newport('ASRL/dev/ttyUSB0::INSTR')
+        self.newport.set_units(1,'mm')
+        self.newport.set_units(2,'mm')
+        self.status=self.read_status()
 
-        self.qTimer=QTimer()
-        self.qTimer.setInterval(1000)
-        self.qTimer.start()
+    def show_instrument(self,err):
+        # swap the placeholder for the control box, or for the error if err
+        old=self.control_box
+        if err is None:
+            self.create_control_box()
+            self.isConnected=True
+        else:
+            self.control_box=QLabel("Motion Controller Not Connected: "+
+                str(err))
+        self.mainLayout.replaceWidget(old,self.control_box)
+        old.deleteLater()
+
+    def create_control_box(self):
 
-        self.qTimer.timeout.connect(self.check_motor1)
-        self.qTimer.timeout.connect(self.check_motor2)
-        self.qTimer.timeout.connect(self.check_pos1)
-        self.qTimer.timeout.connect(self.check_pos2)
+        # all controller traffic from here on runs on its own thread
+        self.worker=InstrumentWorker(self.newport,"Motion")
+        self.worker.error.connect(print)
+        self.worker.start()
+
+        # positions are read fast while the stages move and less often once
+        # they stop, the motor states rarely. both are read again straight
+        # after the GUI moves or toggles something
+        self.poller=Poller(self.worker)
+        self.poller.add('pos',self.read_pos,self.show_pos,
+            interval=0.25,max_interval=2)
+        self.poller.add('motor',self.read_motor,self.show_motors,
+            interval=1,max_interval=8)
+        self.poller.start()
 
         self.control_box=QGroupBox("Newport Motion Controller")
         self.control_layout=QGridLayout()
@@ -113,9 +142,6 @@ class Motion(QDialog):
         self.unitmenu.addItem('mRad')
         self.unitmenu.addItem('\u03BCRad')
 
-        self.newport.set_units(1,'mm')
-        self.newport.set_units(2,'mm')
-
         self.unitbutton=QPushButton("Set Unit")
         self.unitbutton.clicked.connect(self.on_unit_clicked)
 
@@ -146,11 +172,7 @@ class Motion(QDialog):
         self.motor1disp.setAlignment(Qt.AlignCenter)
         self.motor1disp.setFrameShape(QFrame.StyledPanel)
 
-        try:
-            self.motor1on=self.newport.is_motor_on(1)
-            self.newport.wait_time(wait)
-        except:
-            self.motor1on=False
+        self.motor1on=self.status.get(('on',1),False)
 
         if self.motor1on:
             self.motor1disp.setText("Motor is On")
@@ -177,11 +199,7 @@ class Motion(QDialog):
 
         self.actpos1label=QLabel("Actual")
         self.actpos1disp=QLCDNumber()
-        try:
-            self.actpos1=self.newport.get_act_pos(1)
-            self.newport.wait_time(wait)
-        except:
-            self.actpos1=0
+        self.actpos1=self.status.get(('pos',1),0)
         self.actpos1disp.display(self.actpos1)
 
         self.abs1edit=QLineEdit()
@@ -236,11 +254,7 @@ class Motion(QDialog):
         self.motor2disp.setAlignment(Qt.AlignCenter)
         self.motor2disp.setFrameShape(QFrame.StyledPanel)
 
-        try:
-            self.motor2on=self.newport.is_motor_on(2)
-            self.newport.wait_time(wait)
-        except:
-            self.motor2on=False
+        self.motor2on=self.status.get(('on',2),False)
 
         if self.motor2on:
             self.motor2disp.setText("Motor is On")
@@ -267,11 +281,7 @@ class Motion(QDialog):
 
         self.actpos2label=QLabel("Actual")
         self.actpos2disp=QLCDNumber()
-        try:
-            self.actpos2=self.newport.get_act_pos(2)
-            self.newport.wait_time(wait)
-        except:
-            self.actpos2=0
+        self.actpos2=self.status.get(('pos',2),0)
         self.actpos2disp.display(self.actpos2)
 
         self.abs2edit=QLineEdit()
@@ -307,150 +317,176 @@ class Motion(QDialog):
         #self.pos2layout.addWidget(self.rl2button,6,1)
 
 
-    def check_motor1(self):
-        try:
-            self.motor1on=self.newport.is_motor_on(1)
-            self.newport.wait_time(wait)
-            if self.motor1on:
-                self.motor1disp.setText("Motor is On")
-                self.motor1disp.setStyleSheet('background:limegreen')
-            else:
-                self.motor1disp.setText("Motor is Off")
-                self.motor1disp.setStyleSheet('background:red')
-        except:
-            pass
-
-    def check_pos1(self):
-        self.actpos1=self.newport.get_act_pos(1)
-        self.actpos1disp.display(self.actpos1)
-        self.newport.wait_time(wait)
+    def read_status(self):
+        # runs on the worker thread, everything the displays show
+        status=self.read_motor()
+        status.update(self.read_pos())
+        return status
 
-    def check_motor2(self):
-        try:
-            self.motor2on=self.newport.is_motor_on(2)
-            self.newport.wait_time(wait)
-            if self.motor2on:
-                self.motor2disp.setText("Motor is On")
-                self.motor2disp.setStyleSheet('background:limegreen')
-            else:
-                self.motor2disp.setText("Motor is Off")
-                self.motor2disp.setStyleSheet('background:red')
-        except:
-            pass
-
-    def check_pos2(self):
-        try:
-            self.actpos2=self.newport.get_act_pos(2)
+    def read_motor(self):
+        # runs on the worker thread
+        status={}
+        for axis in [1,2]:
+            try:
+                status['on',axis]=self.newport.is_motor_on(axis)
+                self.newport.wait_time(wait)
+            except:
+                pass
+        return status
+
+    def read_pos(self):
+        # runs on the worker thread
+        status={}
+        for axis in [1,2]:
+            try:
+                status['pos',axis]=self.newport.get_act_pos(axis)
+                self.newport.wait_time(wait)
+            except:
+                pass
+        return status
+
+    def show_motors(self, status):
+        self.check_motor1(status)
+        self.check_motor2(status)
+
+    def show_pos(self, status):
+        self.check_pos1(status)
+        self.check_pos2(status)
+
+    def show_motor(self, disp, on):
+        if on:
+            disp.setText("Motor is On")
+            disp.setStyleSheet('background:limegreen')
+        else:
+            disp.setText("Motor is Off")
+            disp.setStyleSheet('background:red')
+
+    def check_motor1(self, status):
+        if ('on',1) in status:
+            self.motor1on=status['on',1]
+            self.show_motor(self.motor1disp,self.motor1on)
+
+    def check_pos1(self, status):
+        if ('pos',1) in status:
+            self.actpos1=status['pos',1]
+            self.actpos1disp.display(self.actpos1)
+
+    def check_motor2(self, status):
+        if ('on',2) in status:
+            self.motor2on=status['on',2]
+            self.show_motor(self.motor2disp,self.motor2on)
+
+    def check_pos2(self, status):
+        if ('pos',2) in status:
+            self.actpos2=status['pos',2]
             self.actpos2disp.display(self.actpos2)
-            self.newport.wait_time(wait)
-        except:
-            pass
 
     def on_abort_clicked(self):
         # some sort of alert/check?
+        # goes ahead of anything still queued
+        self.worker.submit(self.abort_job,priority=URGENT)
+        self.poller.refresh('pos')
+
+    def abort_job(self):
+        # runs on the worker thread
         self.newport.abort_motion()
         self.newport.wait_time(wait)
 
     def on_wait_clicked(self):
-        try:
-            w=self.wait_edit.text()
-            self.newport.wait_time(w)
-        except:
-            pass
+        w=self.wait_edit.text()
+        self.worker.submit(self.newport.wait_time,w)
 
     def toggle_motor1(self):
-        try:
-            if self.newport.is_motor_on(1):
-                self.newport.wait_time(wait)
-                self.newport.motor_off(1)
-                self.motor1disp.setText("Motor is Off")
-                self.motor1disp.setStyleSheet('background:red')
-            else:
-                self.newport.wait_time(wait)
-                self.newport.motor_on(1)
-                self.motor1disp.setText("Motor is On")
-                self.motor1disp.setStyleSheet('background:limegreen')
+        self.worker.submit(self.toggle_motor_job,1,
+            callback=lambda on: self.show_motor(self.motor1disp,on))
+        self.poller.refresh('motor')
+
+    def toggle_motor_job(self, axis):
+        # runs on the worker thread, returns whether the motor is now on
+        if self.newport.is_motor_on(axis):
             self.newport.wait_time(wait)
-        except:
-            pass
+            self.newport.motor_off(axis)
+            on=False
+        else:
+            self.newport.wait_time(wait)
+            self.newport.motor_on(axis)
+            on=True
+        self.newport.wait_time(wait)
+        return on
 
     def on_unit_clicked(self):
-        try:
-            unit=self.unitmenu.currentText()
-            if unit[0]=="\u03BC":
-                unit=unit.replace("\u03BC","u")
-            self.newport.set_units(1,unit)
-            self.newport.set_units(2,unit)
-        except:
-            pass
+        unit=self.unitmenu.currentText()
+        if unit[0]=="\u03BC":
+            unit=unit.replace("\u03BC","u")
+        self.worker.submit(self.newport.set_units,1,unit)
+        self.worker.submit(self.newport.set_units,2,unit)
+        self.poller.refresh('pos')
 
     def toggle_motor2(self):
-        try:
-            if self.newport.is_motor_on(2):
-                self.newport.wait_time(wait)
-                self.newport.motor_off(2)
-                self.motor2disp.setText("Motor is Off")
-                self.motor2disp.setStyleSheet('background:red')
-            else:
-                self.newport.wait_time(wait)
-                self.newport.motor_on(2)
-                self.motor2disp.setText("Motor is On")
-                self.motor2disp.setStyleSheet('background:limegreen')
-            self.newport.wait_time(wait)
-        except:
-            pass
+        self.worker.submit(self.toggle_motor_job,2,
+            callback=lambda on: self.show_motor(self.motor2disp,on))
+        self.poller.refresh('motor')
+
+    def move_rel_job(self, axis, disp):
+        # runs on the worker thread
+        self.newport.move_rel_pos(axis,disp)
+        self.newport.wait_motion_stop(axis)
 
     def on_left_clicked(self):
-        try:
-            self.newport.move_rel_pos(1,-1)
-            self.newport.wait_motion_stop(1)
-        except:
-            pass
+        self.worker.submit(self.move_rel_job,1,-1)
+        self.poller.refresh('pos')
 
     def on_right_clicked(self):
-        try:
-            self.newport.move_rel_pos(1,1)
-            self.newport.wait_motion_stop(1)
-        except:
-            pass
+        self.worker.submit(self.move_rel_job,1,1)
+        self.poller.refresh('pos')
 
     def on_down_clicked(self):
-        try:
-            self.newport.move_rel_pos(2,-1)
-            self.newport.wait_motion_stop(2)
-        except:
-            pass
+        self.worker.submit(self.move_rel_job,2,-1)
+        self.poller.refresh('pos')
 
     def on_up_clicked(self):
-        try:
-            self.newport.move_rel_pos(2,1)
-            self.newport.wait_motion_stop(2)
-        except:
-            pass
+        self.worker.submit(self.move_rel_job,2,1)
+        self.poller.refresh('pos')
+
+    def move_abs_job(self, axis, pos):
+        # runs on the worker thread, returns the new desired position
+        self.newport.move_abs_pos(axis,pos)
+        self.newport.wait_motion_stop(axis)
+        return pos
+
+    def move_by_job(self, axis, disp):
+        # runs on the worker thread, returns the new desired position
+        pos=self.newport.get_des_pos(axis)
+        self.newport.wait_time(wait)
+        self.newport.move_rel_pos(axis,disp)
+        self.newport.wait_motion_stop(axis)
+        return pos+disp
+
+    def show_despos1(self, pos):
+        self.despos1=pos
+        self.despos1disp.display(self.despos1)
+
+    def show_despos2(self, pos):
+        self.despos2=pos
+        self.despos2disp.display(self.despos2)
 
     def on_abs1_clicked(self):
-        pos=float(self.abs1edit.text())
-        #if pos>self.llim1 and pos<self.rlim1:
         try:
-            self.newport.move_abs_pos(1,pos)
-            self.newport.wait_motion_stop(1)
-            self.despos1=pos
-            self.despos1disp.display(self.despos1)
-        except:
-            pass
+            pos=float(self.abs1edit.text())
+        except ValueError:
+            return
+        #if pos>self.llim1 and pos<self.rlim1:
+        self.worker.submit(self.move_abs_job,1,pos,callback=self.show_despos1)
+        self.poller.refresh('pos')
 
     def on_rel1_clicked(self):
         try:
             disp=float(self.rel1edit.text())
-            pos=self.newport.get_abs_pos(1)
-            self.newport.wait_time(wait)
-            #if pos+disp>self.llim1 and pos+disp<self.rlim1:
-            self.newport.move_rel_pos(1,disp)
-            self.newport.wait_motion_stop(1)
-            self.despos1=pos+disp
-            self.despos1disp.display(self.despos1)
-        except:
-            pass
+        except ValueError:
+            return
+        #if pos+disp>self.llim1 and pos+disp<self.rlim1:
+        self.worker.submit(self.move_by_job,1,disp,callback=self.show_despos1)
+        self.poller.refresh('pos')
 
     def on_ll1_clicked(self):
         self.llim1=float(self.ll1edit.text())
@@ -461,28 +497,22 @@ class Motion(QDialog):
         self.rl1disp.display(self.rlim1)
 
     def on_abs2_clicked(self):
-        pos=float(self.abs2edit.text())
-        #if pos>self.llim2 and pos<self.rlim2:
         try:
-            self.newport.move_abs_pos(2,pos)
-            self.newport.wait_motion_stop(2)
-            self.despos2=pos
-            self.despos2disp.display(self.despos2)
-        except:
-            pass
+            pos=float(self.abs2edit.text())
+        except ValueError:
+            return
+        #if pos>self.llim2 and pos<self.rlim2:
+        self.worker.submit(self.move_abs_job,2,pos,callback=self.show_despos2)
+        self.poller.refresh('pos')
 
     def on_rel2_clicked(self):
         try:
             disp=float(self.rel2edit.text())
-            pos=self.newport.get_abs_pos(2)
-            self.newport.wait_time(wait)
-            #if pos+disp>self.llim2 and pos+disp<self.rlim2:
-            self.newport.move_rel_pos(2,disp)
-            self.newport.wait_motion_stop(2)
-            self.despos2=pos+disp
-            self.despos2disp.display(self.despos2)
-        except:
-            pass
+        except ValueError:
+            return
+        #if pos+disp>self.llim2 and pos+disp<self.rlim2:
+        self.worker.submit(self.move_by_job,2,disp,callback=self.show_despos2)
+        self.poller.refresh('pos')
 
     def on_ll2_clicked(self):
         self.llim2=float(self.ll2edit.text())
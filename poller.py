@@ -0,0 +1,130 @@
+# Change-driven polling for the instrument panels
+# each readout (a group of values read together, ie. the measured V and I)
+# has its own interval. a readout that comes back unchanged waits longer
+# before the next read, up to its max_interval, and drops back to its
+# shortest interval as soon as it changes. refresh() reads a readout again
+# straight away, ie. after the GUI wrote a new setpoint.
+#
+# the reads run on the panel's InstrumentWorker, behind any user actions,
+# and the show callbacks run on the GUI thread.
+#
+# usage:
+#   poller=Poller(worker)
+#   poller.add('meas',read_meas,show_meas,interval=0.25,max_interval=0.5)
+#   poller.add('setpoints',read_set,show_set,interval=2,max_interval=10)
+#   poller.start()
+#   ...
+#   worker.submit(psu.setVoltage,5.0)
+#   poller.refresh('setpoints')
+
+from PyQt5.QtCore import QObject, QTimer
+
+from time import monotonic
+import traceback
+
+class Readout(object):
+    # one group of values read together and its schedule
+    def __init__(self,name,read,show,interval,max_interval,backoff):
+        self.name=name
+        self.read=read
+        self.show=show
+        self.min_interval=interval
+        self.max_interval=max(interval,max_interval)
+        self.backoff=backoff
+        self.interval=interval
+        self.due=0 # first read on the first tick
+        self.pending=False # a read is queued or running
+        self.again=False # refreshed while a read was pending
+        self.last=None
+        self.reads=0
+
+class Poller(QObject):
+    def __init__(self,worker,tick=50):
+        # worker: InstrumentWorker the reads run on
+        # tick: ms between checks for readouts that are due
+        super(Poller,self).__init__()
+        self.worker=worker
+        self.readouts={}
+        self.started=monotonic()
+        self.timer=QTimer(self)
+        self.timer.setInterval(tick)
+        self.timer.timeout.connect(self._tick)
+
+    def add(self,name,read,show,interval,max_interval=None,backoff=2.0):
+        # read(): runs on the worker thread, returns the values
+        # show(values): runs on the GUI thread with every read's result,
+        #   or None if the read does everything itself
+        # interval: seconds between reads while the values change
+        # max_interval: longest wait once they stop changing, None to keep
+        #   polling every interval
+        # backoff: factor the wait grows by after each unchanged read
+        if max_interval is None:
+            max_interval=interval
+        self.readouts[name]=Readout(name,read,show,interval,max_interval,
+            backoff)
+
+    def start(self):
+        self.started=monotonic()
+        self.timer.start()
+
+    def stop(self):
+        self.timer.stop()
+
+    def isActive(self):
+        return self.timer.isActive()
+
+    def refresh(self,*names):
+        # read these readouts again as soon as the worker gets to them,
+        # every readout if no names are given
+        for name in (names or list(self.readouts)):
+            r=self.readouts[name]
+            r.interval=r.min_interval
+            if r.pending:
+                r.again=True # the read in flight may predate the change
+            else:
+                r.due=0
+        if self.timer.isActive():
+            self._tick()
+
+    def rates(self):
+        # reads per second of each readout since start()
+        elapsed=max(monotonic()-self.started,1e-9)
+        return {name:r.reads/elapsed for name,r in self.readouts.items()}
+
+    def _tick(self):
+        now=monotonic()
+        for r in self.readouts.values():
+            if r.pending or now<r.due:
+                continue
+            r.pending=True
+            self.worker.poll(lambda r=r: self._read(r),
+                lambda ret,r=r: self._done(r,ret),key=('poller',r.name))
+
+    def _read(self,r):
+        # runs on the worker thread, errors come back as a result so the
+        # readout is always rescheduled
+        try:
+            return True,r.read()
+        except Exception as err:
+            return False,err
+
+    def _done(self,r,ret):
+        ok,value=ret
+        r.pending=False
+        r.reads+=1
+        if not ok:
+            r.due=monotonic()+r.interval
+            self.worker.error.emit(("{} {}: {}").format(self.worker.name,
+                r.name,traceback.format_exception_only(type(value),
+                value)[-1].strip()))
+            return
+
+        if r.reads>1 and value==r.last:
+            r.interval=min(r.interval*r.backoff,r.max_interval)
+        else:
+            r.interval=r.min_interval
+        r.last=value
+        r.due=0 if r.again else monotonic()+r.interval
+        r.again=False
+        if r.show is not None:
+            r.show(value)
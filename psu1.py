@@ -2,59 +2,108 @@
 # 07/28/2021
 # adapted from psu_gui.py
 
-from PyQt5.QtCore import Qt, QSize, QTimer
+from PyQt5.QtCore import Qt, QSize
 from PyQt5.QtGui import QPalette
 from PyQt5.QtWidgets import (QApplication, QComboBox, QDialog, QFrame,
     QGridLayout, QGroupBox, QHBoxLayout, QLabel, QLCDNumber, QLineEdit,
     QPushButton, QVBoxLayout, QWidget, QMessageBox)
 
-from dcps import AimTTiEL302P
+from dcps import AimTTiEL302P, RampAborted
+from instrument_worker import InstrumentWorker
+from poller import Poller
+from readback_log import ReadbackLog
+from state_mirror import StateMirror
+from strip_chart import StripChart
 from pyvisa.errors import VisaIOError
 from serial.serialutil import SerialException
 
+# how a setting is changed while the output is on: ramped at (rate per
+# second, largest step), checking the readbacks after every step. the
+# current limit is set straight away, in constant voltage the output does
+# not follow it so there is nothing to ramp
+ramp_rates={'Vset':(2.0,0.1)}
+
 class PSU1(QDialog):
-    def __init__(self,parent=None):
+    def __init__(self,parent=None,connect=True,log=None):
+        # connect=False only shows a placeholder, open_instrument() and
+        # show_instrument() are then left to the caller (see connector.py)
+        # log: ReadbackLog every measurement is recorded in and the chart
+        # is drawn from, one of its own kept in memory if None
         super(PSU1,self).__init__(parent)
+        self.log=log if log is not None else ReadbackLog()
+
+        self.mainLayout = QGridLayout()
+        self.isConnected=False
+        self.PSU1Box=QLabel("PSU 1 Connecting\u2026")
+
+        self.setLayout(self.mainLayout)
+        self.mainLayout.addWidget(self.PSU1Box,0,0)
+
+        if connect:
+            try:
+                self.open_instrument()
+                err=None
+            except VisaIOError as e:
+                err=e
+            except SerialException as e:
+                err=e
+            self.show_instrument(err)
+
+    def open_instrument(self):
+        # connect and read everything the panel shows, touches no widgets
+        # so it can run on any thread
+        self.aim1 = AimTTiEL302P('ASRL/dev/ttyACM1::INSTR')
+        self.aim1.open()
+        self.status=self.read_PSU1()
 
-        mainLayout = QGridLayout()
-
-        try:
+    def show_instrument(self, err):
+        # swap the placeholder for the PSU box, or for the error if err
+        old=self.PSU1Box
+        if err is None:
             self.createPSU1Box()
             self.isConnected=True
-        except VisaIOError as err:
-            self.PSU1Box=QLabel("PSU 1 Not Connected: "+str(err))
-            self.isConnected=False
-        except SerialException as err:
+        else:
             self.PSU1Box=QLabel("PSU 1 Not Connected: "+str(err))
-            self.isConnected=False
-
-        self.setLayout(mainLayout)
-        mainLayout.addWidget(self.PSU1Box,0,0)
+        self.mainLayout.replaceWidget(old,self.PSU1Box)
+        old.deleteLater()
 
     def createPSU1Box(self):
-        self.aim1 = AimTTiEL302P('ASRL/dev/ttyACM1::INSTR')
-        self.aim1.open()
-
         # create the displays for the measurements of I and V
         self.VmeasNumber = QLCDNumber()
         self.VmeasNumber.setSegmentStyle(QLCDNumber.Flat)
-        self.Vmeas = self.aim1.measureVoltage()
+        self.Vmeas = self.status['Vmeas']
 
         self.ImeasNumber = QLCDNumber()
         self.ImeasNumber.setSegmentStyle(QLCDNumber.Flat)
-        self.Imeas = self.aim1.measureCurrent()
-
-        self.was_on_PSU1=self.aim1.isOutputOn()
-
-        self.qTimer = QTimer()
-        self.qTimer.setInterval(500)
-        self.qTimer.start()
-
-        self.qTimer.timeout.connect(self.query_voltage_PSU1)
-        self.qTimer.timeout.connect(self.query_current_PSU1)
-        self.qTimer.timeout.connect(self.measure_voltage_PSU1)
-        self.qTimer.timeout.connect(self.measure_current_PSU1)
-        self.qTimer.timeout.connect(self.check_output_PSU1)
+        self.Imeas = self.status['Imeas']
+
+        self.was_on_PSU1=self.status['on']
+
+        # all PSU traffic from here on runs on its own thread, the poller only
+        # asks for readings and the displays update when they come back
+        self.worker=InstrumentWorker(self.aim1,"PSU 1")
+        self.worker.error.connect(print)
+        self.worker.start()
+
+        # the output state and setpoints live in the mirror: the GUI's own
+        # writes go straight into it and the displays follow its changes
+        self.mirror=StateMirror(self.status)
+        self.mirror.error.connect(print)
+        self.mirror.subscribe('on',self.check_output_PSU1)
+        self.mirror.subscribe('Vset',self.query_voltage_PSU1)
+        self.mirror.subscribe('Iset',self.query_current_PSU1)
+
+        # measurements and the output state are read fast, in one message,
+        # and the setpoints slowly, the output state and setpoints only to
+        # check the mirror against the instrument. each waits longer while
+        # it does not change
+        self.poller=Poller(self.worker)
+        self.poller.add('meas',self.read_meas_PSU1,self.show_meas_PSU1,
+            interval=0.25,max_interval=1)
+        self.poller.add('setpoints',
+            self.mirror.reader(self.read_setpoints_PSU1),
+            None,interval=2,max_interval=10)
+        self.poller.start()
 
         ##Creates a PSU Box, calls functions to create the Vbox and Ibox that go inside.
         self.PSU1Box = QGroupBox("Single PSU")
@@ -72,6 +121,9 @@ class PSU1(QDialog):
         self.create_Obox_PSU1()
         self.PSU1Layout.addWidget(self.Obox_PSU1,0,2)
 
+        self.create_chart_PSU1()
+        self.PSU1Layout.addWidget(self.chart_PSU1,1,0,1,3)
+
     def create_Vbox_PSU1(self):
         self.Vbox_PSU1 = QGroupBox("Voltage")
         self.Vlayout_PSU1 = QVBoxLayout()
@@ -80,7 +132,7 @@ class PSU1(QDialog):
         self.PSU1vPrompt = QLabel("Voltage [V]")
         self.PSU1vSet = QLineEdit()
         self.VsetNumber=QLabel()
-        self.Vset=self.aim1.queryVoltage()
+        self.Vset=self.status['Vset']
         self.VsetNumber.setText("V Set Value: "+f"{self.Vset:.2f}"+" V")
         self.VsetNumber.setFrameShape(QFrame.StyledPanel)
         self.setVButton_PSU1 = QPushButton("Set Voltage")
@@ -101,7 +153,7 @@ class PSU1(QDialog):
         self.PSU1iPrompt = QLabel("Current [A]")
         self.PSU1iSet = QLineEdit()
         self.IsetNumber=QLabel()
-        self.Iset=self.aim1.queryCurrent()
+        self.Iset=self.status['Iset']
         self.IsetNumber.setText("I Set Value: "+f"{self.Iset:.2f}"+" A")
         self.IsetNumber.setFrameShape(QFrame.StyledPanel)
         self.setIButton_PSU1 = QPushButton("Set Current")
@@ -125,7 +177,7 @@ class PSU1(QDialog):
         self.Odisplay_PSU1.setAlignment(Qt.AlignCenter)
         self.Odisplay_PSU1.setFrameShape(QFrame.StyledPanel)
 
-        if self.aim1.isOutputOn():
+        if self.was_on_PSU1:
             self.Odisplay_PSU1.setText("Output is On")
             self.Odisplay_PSU1.setStyleSheet("background:limegreen")
         else:
@@ -135,64 +187,130 @@ class PSU1(QDialog):
         self.Olayout_PSU1.addWidget(self.Odisplay_PSU1)
         self.Olayout_PSU1.addWidget(self.output_button_PSU1)
 
+    def create_chart_PSU1(self):
+        # measured V and I since the panel opened
+        self.chart_PSU1=StripChart(self.log)
+        self.chart_PSU1.add("PSU 1",'Vmeas',name="V",title="Voltage [V]")
+        self.chart_PSU1.add("PSU 1",'Imeas',name="I",axis='right',
+            title="Current [A]")
+        self.chart_PSU1.setMinimumHeight(220)
+        self.chart_PSU1.pull()
+
     def on_vbutton_PSU1_clicked(self):
         set_voltage = self.PSU1vSet.text()
         self.setV_PSU1(set_voltage)
 
     def setV_PSU1(self, set_voltage):
-        if not self.aim1.isOutputOn():
-            self.aim1.setVoltage(set_voltage)
-        else:
-            alert = QMessageBox()
-            alert.setText("You must turn off output before changing",
-                "the voltage")
-            alert.exec_()
+        self.worker.submit(self.set_or_ramp_PSU1,self.aim1.setVoltage,
+            set_voltage,'Vset',callback=self.alert_PSU1)
 
     def on_ibutton_PSU1_clicked(self):
         set_current = self.PSU1iSet.text()
         self.setI_PSU1(set_current)
 
     def setI_PSU1(self, set_current):
-        if not self.aim1.isOutputOn():
-            self.aim1.setCurrent(set_current)
-        else:
-            alert = QMessageBox()
-            alert.setText("You must turn off output before changing",
-                "the current")
-            alert.exec_()
+        self.worker.submit(self.set_or_ramp_PSU1,self.aim1.setCurrent,
+            set_current,'Iset',callback=self.alert_PSU1)
+
+    def set_or_ramp_PSU1(self, setter, value, key):
+        # runs on the worker thread
+        # with the output on a voltage is ramped to instead of set, the
+        # readbacks logged on the way. returns why a ramp stopped, or None
+        value=float(value)
+        if key not in ramp_rates or not self.aim1.isOutputOn():
+            setter(value)
+            self.mirror.set(key,value)
+            return
+        rate,step=ramp_rates[key]
+        try:
+            self.aim1.ramp(key[0],value,rate,step,
+                progress=self.log_ramp_PSU1)
+            self.mirror.set(key,value)
+        except RampAborted as err:
+            self.mirror.set(key,err.setpoint)
+            return str(err)
+
+    def log_ramp_PSU1(self, setpoints, readbacks):
+        # runs on the worker thread, after every step of a ramp
+        volts,amps,on=readbacks[1]
+        self.log.record_status("PSU 1",{'Vmeas':volts,'Imeas':amps})
+
+    def alert_PSU1(self, text):
+        if text is None:
+            return
+        alert = QMessageBox()
+        alert.setText(text)
+        alert.exec_()
 
     def toggle_output_PSU1(self):
+        self.worker.submit(self.toggle_output_job_PSU1)
+
+    def toggle_output_job_PSU1(self):
+        # runs on the worker thread
         if self.aim1.isOutputOn():
             self.aim1.outputOff()
+            self.mirror.set('on',False)
         else:
             self.aim1.outputOn()
-
-    def measure_voltage_PSU1(self):
-        self.Vmeas = self.aim1.measureVoltage()
+            self.mirror.set('on',True)
+
+    def read_PSU1(self):
+        # runs on the worker thread, everything the displays show in one
+        # message
+        status=self.measure_PSU1(setpoints=True)
+        self.log.record_status("PSU 1",{'Vmeas':status['Vmeas'],
+            'Imeas':status['Imeas']})
+        return status
+
+    def read_meas_PSU1(self):
+        # runs on the worker thread, the measurements and the output state
+        # in one message. the output state goes into the mirror, the
+        # measurements to show_meas_PSU1
+        status=self.measure_PSU1()
+        self.mirror.update({'on':status.pop('on')})
+        self.log.record_status("PSU 1",status)
+        return status
+
+    def measure_PSU1(self, setpoints=False):
+        # runs on the worker thread. measureAll keys by (name, channel)
+        # like the other Aim TTi drivers, the panel only has the one
+        # channel so it keeps the names alone
+        status=self.aim1.measureAll(setpoints=setpoints)
+        return {name:value for (name,ch),value in status.items()}
+
+    def read_setpoints_PSU1(self):
+        # runs on the worker thread, both setpoints in one message
+        status=self.measure_PSU1(setpoints=True)
+        return {'Vset':status['Vset'],'Iset':status['Iset']}
+
+    def show_meas_PSU1(self, status):
+        self.measure_voltage_PSU1(status)
+        self.measure_current_PSU1(status)
+        self.chart_PSU1.pull()
+
+    def measure_voltage_PSU1(self, status):
+        self.Vmeas = status['Vmeas']
         self.VmeasNumber.display(f"{self.Vmeas:.2f}")
 
-    def measure_current_PSU1(self):
-        self.Imeas = self.aim1.measureCurrent()
+    def measure_current_PSU1(self, status):
+        self.Imeas = status['Imeas']
         self.ImeasNumber.display(f"{self.Imeas:.2f}")
 
-    def check_output_PSU1(self):
-        if self.was_on_PSU1 != self.aim1.isOutputOn():
-            ## asking if anything has changed since last 0.5s,
-            ## so we don't have to keep reprinting text
-            self.was_on_PSU1=self.aim1.isOutputOn()
-            if self.aim1.isOutputOn():
-                self.Odisplay_PSU1.setText("Output is On")
-                self.Odisplay_PSU1.setStyleSheet("background:limegreen")
-            else:
-                self.Odisplay_PSU1.setText("Output is Off")
-                self.Odisplay_PSU1.setStyleSheet("background:red")
-
-    def query_voltage_PSU1(self):
-        if self.aim1.queryVoltage() != self.Vset:
-            self.Vset=self.aim1.queryVoltage()
-            self.VsetNumber.setText("V Set Value: "+f"{self.Vset:.2f}"+" V")
-
-    def query_current_PSU1(self):
-        if self.aim1.queryCurrent() != self.Iset:
-            self.Iset=self.aim1.queryCurrent()
-            self.IsetNumber.setText("I Set Value: "+f"{self.Iset:.2f}"+" A")
+    # the mirror only calls these when the value has changed, so nothing
+    # is redrawn to the same thing
+    def check_output_PSU1(self, on):
+        self.was_on_PSU1=on
+        if self.was_on_PSU1:
+            self.Odisplay_PSU1.setText("Output is On")
+            self.Odisplay_PSU1.setStyleSheet("background:limegreen")
+        else:
+            self.Odisplay_PSU1.setText("Output is Off")
+            self.Odisplay_PSU1.setStyleSheet("background:red")
+
+    def query_voltage_PSU1(self, Vset):
+        self.Vset=Vset
+        self.VsetNumber.setText("V Set Value: "+f"{self.Vset:.2f}"+" V")
+
+    def query_current_PSU1(self, Iset):
+        self.Iset=Iset
+        self.IsetNumber.setText("I Set Value: "+f"{self.Iset:.2f}"+" A")
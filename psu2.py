@@ -2,73 +2,121 @@
 # 07/28/2021
 # adapted from psu_gui.py
 
-from PyQt5.QtCore import Qt, QSize, QTimer
+from PyQt5.QtCore import Qt, QSize
 from PyQt5.QtGui import QPalette
 from PyQt5.QtWidgets import (QApplication, QComboBox, QDialog, QFrame,
     QGridLayout, QGroupBox, QHBoxLayout, QLabel, QLCDNumber, QLineEdit,
     QPushButton, QVBoxLayout, QWidget, QMessageBox)
 
-from dcps import AimTTiCPX400DP
+from dcps import AimTTiCPX400DP, RampAborted
+from instrument_worker import InstrumentWorker
+from poller import Poller
+from readback_log import ReadbackLog
+from state_mirror import StateMirror
+from strip_chart import StripChart
 from pyvisa.errors import VisaIOError
 from serial.serialutil import SerialException
 
+# how a setting is changed while the output is on: ramped at (rate per
+# second, largest step), checking the readbacks after every step. the
+# current limit is set straight away, in constant voltage the output does
+# not follow it so there is nothing to ramp
+ramp_rates={'Vset':(2.0,0.1)}
+
 class PSU2(QDialog):
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, connect=True, log=None):
+        # connect=False only shows a placeholder, open_instrument() and
+        # show_instrument() are then left to the caller (see connector.py)
+        # log: ReadbackLog every measurement is recorded in and the chart
+        # is drawn from, one of its own kept in memory if None
         super(PSU2, self).__init__(parent)
+        self.log=log if log is not None else ReadbackLog()
+
+        self.mainLayout = QGridLayout()
+        self.isConnected=False
+        self.PSU2Box=QLabel("PSU 2 Connecting\u2026")
+
+        self.setLayout(self.mainLayout)
+        self.mainLayout.addWidget(self.PSU2Box,0,0)
+
+        if connect:
+            try:
+                self.open_instrument()
+                err=None
+            except VisaIOError as e:
+                err=e
+            except SerialException as e:
+                err=e
+            self.show_instrument(err)
+
+    def open_instrument(self):
+        # connect and read everything the panel shows, touches no widgets
+        # so it can run on any thread
+        self.aim2=AimTTiCPX400DP('ASRL/dev/ttyACM0::INSTR')
+        self.aim2.open()
+        self.status=self.read_status()
 
-        mainLayout = QGridLayout()
-
-        try:
+    def show_instrument(self, err):
+        # swap the placeholder for the PSU box, or for the error if err
+        old=self.PSU2Box
+        if err is None:
             self.createPSU2Box()
             self.isConnected=True
-        except VisaIOError as err:
-            self.PSU2Box=QLabel("PSU 2 Not Connected: "+str(err))
-            self.isConnected=False
-        except SerialException as err:
+        else:
             self.PSU2Box=QLabel("PSU 2 Not Connected: "+str(err))
-            self.isConnected=False
-
-        self.setLayout(mainLayout)
-        mainLayout.addWidget(self.PSU2Box,0,0)
+        self.mainLayout.replaceWidget(old,self.PSU2Box)
+        old.deleteLater()
 
     def createPSU2Box(self):
-        self.aim2=AimTTiCPX400DP('ASRL/dev/ttyACM0::INSTR')
-        self.aim2.open()
-
-        self.was_VTracking=self.aim2.isVTracking()
+        self.was_VTracking=self.status['tracking']
 
         self.VmeasNum1 = QLCDNumber()
         self.VmeasNum1.setSegmentStyle(QLCDNumber.Flat)
-        self.Vmeas1 = self.aim2.measureVoltage(1)
+        self.Vmeas1 = self.status['Vmeas',1]
         self.ImeasNum1 = QLCDNumber()
         self.ImeasNum1.setSegmentStyle(QLCDNumber.Flat)
-        self.Imeas1 = self.aim2.measureCurrent(1)
-        self.O1_was_on=self.aim2.isOutputOn(1)
+        self.Imeas1 = self.status['Imeas',1]
+        self.O1_was_on=self.status['on',1]
 
         self.VmeasNum2 = QLCDNumber()
         self.VmeasNum2.setSegmentStyle(QLCDNumber.Flat)
-        self.Vmeas2 = self.aim2.measureVoltage(2)
+        self.Vmeas2 = self.status['Vmeas',2]
         self.ImeasNum2 = QLCDNumber()
         self.ImeasNum2.setSegmentStyle(QLCDNumber.Flat)
-        self.Imeas2 = self.aim2.measureCurrent(2)
-        self.O2_was_on=self.aim2.isOutputOn(2)
-
-        # start a timer to measure the PSU I and V every 0.5 s
-        self.qTimer = QTimer()
-        self.qTimer.setInterval(500)
-        self.qTimer.start()
-
-        self.qTimer.timeout.connect(self.check_VTracking)
-        self.qTimer.timeout.connect(self.query_voltage1)
-        self.qTimer.timeout.connect(self.query_current1)
-        self.qTimer.timeout.connect(self.query_voltage2)
-        self.qTimer.timeout.connect(self.query_current2)
-        self.qTimer.timeout.connect(self.measure_voltage1)
-        self.qTimer.timeout.connect(self.measure_current1)
-        self.qTimer.timeout.connect(self.check_output1)
-        self.qTimer.timeout.connect(self.measure_voltage2)
-        self.qTimer.timeout.connect(self.measure_current2)
-        self.qTimer.timeout.connect(self.check_output2)
+        self.Imeas2 = self.status['Imeas',2]
+        self.O2_was_on=self.status['on',2]
+
+        # all PSU traffic from here on runs on its own thread, the poller only
+        # asks for readings and the displays update when they come back
+        self.worker=InstrumentWorker(self.aim2,"PSU 2")
+        self.worker.error.connect(print)
+        self.worker.start()
+
+        # the output states, setpoints and tracking mode live in the mirror:
+        # the GUI's own writes go straight into it and the displays follow
+        # its changes
+        self.mirror=StateMirror(self.status)
+        self.mirror.error.connect(print)
+        self.mirror.subscribe('tracking',self.check_VTracking)
+        self.mirror.subscribe(('on',1),self.check_output1)
+        self.mirror.subscribe(('on',2),self.check_output2)
+        self.mirror.subscribe(('Vset',1),self.query_voltage1)
+        self.mirror.subscribe(('Iset',1),self.query_current1)
+        self.mirror.subscribe(('Vset',2),self.query_voltage2)
+        self.mirror.subscribe(('Iset',2),self.query_current2)
+
+        # measurements and output states are read fast, in one message, and
+        # the setpoints and tracking mode slowly, all but the measurements
+        # only to check the mirror against the instrument. each waits
+        # longer while it does not change
+        self.poller=Poller(self.worker)
+        self.poller.add('meas',self.read_meas,self.show_meas,
+            interval=0.25,max_interval=1)
+        self.poller.add('setpoints',self.mirror.reader(self.read_setpoints),
+            None,interval=2,max_interval=10)
+        self.poller.add('tracking',self.mirror.reader(self.read_tracking),
+            None,interval=2,max_interval=10)
+        self.poller.start()
 
         self.PSU2Box = QGroupBox("Double PSU")
         self.PSU2Box.setObjectName("psu2")
@@ -84,6 +132,20 @@ class PSU2(QDialog):
         self.PSU2Layout.addWidget(self.box1,0,1)
         self.PSU2Layout.addWidget(self.box2,0,2)
 
+        self.create_chart()
+        self.PSU2Layout.addWidget(self.chart,1,0,1,3)
+
+    def create_chart(self):
+        # measured V and I of both outputs since the panel opened
+        self.chart=StripChart(self.log)
+        for ch in [1,2]:
+            self.chart.add("PSU 2",'Vmeas',ch,name=("V{}").format(ch),
+                title="Voltage [V]")
+            self.chart.add("PSU 2",'Imeas',ch,name=("I{}").format(ch),
+                axis='right',title="Current [A]")
+        self.chart.setMinimumHeight(220)
+        self.chart.pull()
+
     def create_box1(self):
         self.box1=QGroupBox("Control Main PS")
         self.create_Vbox1()
@@ -134,7 +196,7 @@ class PSU2(QDialog):
         self.VTdisplay.setAlignment(Qt.AlignCenter)
         self.VTdisplay.setFrameShape(QFrame.StyledPanel)
 
-        if self.aim2.isVTracking():
+        if self.was_VTracking:
             self.VTdisplay.setText("Voltage Tracking is On")
             self.VTdisplay.setStyleSheet("background:limegreen")
         else:
@@ -145,33 +207,45 @@ class PSU2(QDialog):
         self.VTlayout.addWidget(self.VTrackButton)
 
     def toggle_outputs_all(self):
+        self.worker.submit(self.toggle_outputs_all_job)
+
+    def toggle_outputs_all_job(self):
+        # runs on the worker thread
         if self.aim2.isOutputOn(1):
             self.aim2.outputOffAll()
+            self.mirror.update({('on',1):False,('on',2):False})
         else:
             self.aim2.outputOn(1)
             self.aim2.outputOnAll()
+            self.mirror.update({('on',1):True,('on',2):True})
 
     def toggle_VTracking(self):
+        self.worker.submit(self.toggle_VTracking_job,callback=self.alert)
+        # tracking makes the output 2 setpoints follow output 1
+        self.poller.refresh('setpoints')
+
+    def toggle_VTracking_job(self):
+        # runs on the worker thread
         if not self.aim2.isOutputOn(2):
             if self.aim2.isVTracking():
                 self.aim2.setIndependent()
+                self.mirror.set('tracking',False)
             else:
                 self.aim2.setVTracking()
+                self.mirror.set('tracking',True)
         else:
-            alert=QMessageBox()
-            alert.setText("You must turn off output 2 before toggling",
-                "voltage tracking.")
-            alert.exec_()
-
-    def check_VTracking(self):
-        if self.was_VTracking != self.aim2.isVTracking():
-            self.was_VTracking=self.aim2.isVTracking()
-            if not self.aim2.isVTracking():
-                self.VTdisplay.setText("Voltage Tracking is Off")
-                self.VTdisplay.setStyleSheet("background:red")
-            else:
-                self.VTdisplay.setText("Voltage Tracking is On")
-                self.VTdisplay.setStyleSheet("background:limegreen")
+            return "You must turn off output 2 before toggling voltage tracking."
+
+    # the mirror only calls the check_ and query_ functions when the value
+    # has changed, so nothing is redrawn to the same thing
+    def check_VTracking(self, tracking):
+        self.was_VTracking=tracking
+        if not self.was_VTracking:
+            self.VTdisplay.setText("Voltage Tracking is Off")
+            self.VTdisplay.setStyleSheet("background:red")
+        else:
+            self.VTdisplay.setText("Voltage Tracking is On")
+            self.VTdisplay.setStyleSheet("background:limegreen")
 
 
     def create_Vbox1(self):
@@ -183,7 +257,7 @@ class PSU2(QDialog):
         self.setVButton1 = QPushButton("Set Voltage")
         self.setVButton1.clicked.connect(self.on_vbutton1_clicked)
         self.V1setNum=QLabel()
-        self.V1set=self.aim2.queryVoltage(1)
+        self.V1set=self.status['Vset',1]
         self.V1setNum.setText("V Set Value:\n"+f"{self.V1set:.2f}"+" V")
         self.V1setNum.setFrameShape(QFrame.StyledPanel)
 
@@ -201,7 +275,7 @@ class PSU2(QDialog):
         self.setVButton2 = QPushButton("Set Voltage")
         self.setVButton2.clicked.connect(self.on_vbutton2_clicked)
         self.V2setNum=QLabel()
-        self.V2set=self.aim2.queryVoltage(2)
+        self.V2set=self.status['Vset',2]
         self.V2setNum.setText("V Set Value:\n"+f"{self.V2set:.2f}"+" V")
         self.V2setNum.setFrameShape(QFrame.StyledPanel)
 
@@ -217,7 +291,7 @@ class PSU2(QDialog):
 
         self.PSU2i1Set = QLineEdit()
         self.I1setNum=QLabel()
-        self.I1set=self.aim2.queryCurrent(1)
+        self.I1set=self.status['Iset',1]
         self.I1setNum.setText("I Set Value:\n"+f"{self.I1set:.2f}"+" A")
         self.I1setNum.setFrameShape(QFrame.StyledPanel)
         self.setIButton1 = QPushButton("Set Current")
@@ -236,7 +310,7 @@ class PSU2(QDialog):
 
         self.PSU2i2Set = QLineEdit()
         self.I2setNum=QLabel()
-        self.I2set=self.aim2.queryCurrent(2)
+        self.I2set=self.status['Iset',2]
         self.I2setNum.setText("I Set Value:\n"+f"{self.I2set:.2f}"+" A")
         self.I2setNum.setFrameShape(QFrame.StyledPanel)
         self.setIButton2 = QPushButton("Set Current")
@@ -259,7 +333,7 @@ class PSU2(QDialog):
         self.Odisplay1.setAlignment(Qt.AlignCenter)
         self.Odisplay1.setFrameShape(QFrame.StyledPanel)
 
-        if self.aim2.isOutputOn(1):
+        if self.O1_was_on:
             self.Odisplay1.setText("Output is On")
             self.Odisplay1.setStyleSheet("background:limegreen")
         else:
@@ -280,7 +354,7 @@ class PSU2(QDialog):
         self.Odisplay2.setAlignment(Qt.AlignCenter)
         self.Odisplay2.setFrameShape(QFrame.StyledPanel)
 
-        if self.aim2.isOutputOn(2):
+        if self.O2_was_on:
             self.Odisplay2.setText("Output is On")
             self.Odisplay2.setStyleSheet("background:limegreen")
         else:
@@ -293,28 +367,58 @@ class PSU2(QDialog):
 
 
     def setV(self, set_voltage, channel):
-        if not self.aim2.isOutputOn(channel):
-            self.aim2.setVoltage(set_voltage,channel)
-        else:
-            alert = QMessageBox()
-            alert.setText("You must turn off output before changing",
-                "the voltage")
-            alert.exec_()
+        self.worker.submit(self.set_or_ramp,self.aim2.setVoltage,set_voltage,
+            channel,'Vset',callback=self.alert)
+        if self.was_VTracking:
+            # output 2 follows output 1, read back what it was set to
+            self.poller.refresh('setpoints')
 
     def setI(self,set_current,channel):
-        if not self.aim2.isOutputOn(channel):
-            self.aim2.setCurrent(set_current,channel)
-        else:
-            alert = QMessageBox()
-            alert.setText("You must turn off output before changing the",
-                "current")
-            alert.exec_()
+        self.worker.submit(self.set_or_ramp,self.aim2.setCurrent,set_current,
+            channel,'Iset',callback=self.alert)
+
+    def set_or_ramp(self, setter, value, channel, key):
+        # runs on the worker thread
+        # with the output on a voltage is ramped to instead of set, the
+        # readbacks logged on the way. returns why a ramp stopped, or None
+        value=float(value)
+        if key not in ramp_rates or not self.aim2.isOutputOn(channel):
+            setter(value,channel)
+            self.mirror.set((key,channel),value)
+            return
+        rate,step=ramp_rates[key]
+        try:
+            self.aim2.ramp(key[0],value,rate,step,channels=[channel],
+                progress=self.log_ramp)
+            self.mirror.set((key,channel),value)
+        except RampAborted as err:
+            self.mirror.set((key,channel),err.setpoint)
+            return str(err)
+
+    def log_ramp(self, setpoints, readbacks):
+        # runs on the worker thread, after every step of a ramp
+        for channel,(volts,amps,on) in readbacks.items():
+            self.log.record_status("PSU 2",{('Vmeas',channel):volts,
+                ('Imeas',channel):amps})
+
+    def alert(self, text):
+        if text is None:
+            return
+        alert = QMessageBox()
+        alert.setText(text)
+        alert.exec_()
 
     def toggle_output(self,channel):
+        self.worker.submit(self.toggle_output_job,channel)
+
+    def toggle_output_job(self,channel):
+        # runs on the worker thread
         if self.aim2.isOutputOn(channel):
             self.aim2.outputOff(channel)
+            self.mirror.set(('on',channel),False)
         else:
             self.aim2.outputOn(channel)
+            self.mirror.set(('on',channel),True)
 
     def on_vbutton1_clicked(self):
         set_voltage = self.PSU2v1Set.text()
@@ -332,58 +436,87 @@ class PSU2(QDialog):
         set_current = self.PSU2i2Set.text()
         self.setI(set_current,2)
 
-    def measure_voltage1(self):
-        self.Vmeas1 = self.aim2.measureVoltage(1)
+    def read_status(self):
+        # runs on the worker thread, everything the displays show
+        status=self.read_tracking()
+        status.update(self.aim2.measureAll(setpoints=True))
+        self.log.record_status("PSU 2",{key:value for key,value in
+            status.items() if key[0] in ('Vmeas','Imeas')})
+        return status
+
+    def read_tracking(self):
+        # runs on the worker thread
+        return {'tracking':self.aim2.isVTracking()}
+
+    def read_setpoints(self):
+        # runs on the worker thread, the setpoints of both channels in one
+        # message
+        status=self.aim2.measureAll(setpoints=True)
+        return {key:value for key,value in status.items()
+            if key[0] in ('Vset','Iset')}
+
+    def read_meas(self):
+        # runs on the worker thread, the measurements and output states of
+        # both channels in one message. the output states go into the
+        # mirror, the measurements to show_meas
+        status=self.aim2.measureAll()
+        self.mirror.update({('on',ch):status.pop(('on',ch)) for ch in [1,2]})
+        self.log.record_status("PSU 2",status)
+        return status
+
+    def show_meas(self, status):
+        self.measure_voltage1(status)
+        self.measure_current1(status)
+        self.measure_voltage2(status)
+        self.measure_current2(status)
+        self.chart.pull()
+
+    def measure_voltage1(self, status):
+        self.Vmeas1 = status['Vmeas',1]
         self.VmeasNum1.display(f"{self.Vmeas1:.2f}")
 
-    def measure_current1(self):
-        self.Imeas1 = self.aim2.measureCurrent(1)
+    def measure_current1(self, status):
+        self.Imeas1 = status['Imeas',1]
         self.ImeasNum1.display(f"{self.Imeas1:.2f}")
 
-    def check_output1(self):
-        if self.O1_was_on != self.aim2.isOutputOn(1): ## asking if anything has changed since last 0.5s, so we don't have to keep reprinting text
-            self.O1_was_on=self.aim2.isOutputOn(1)
-            if self.aim2.isOutputOn(1):
-                self.Odisplay1.setText("Output is On")
-                self.Odisplay1.setStyleSheet("background:limegreen")
-            else:
-                self.Odisplay1.setText("Output is Off")
-                self.Odisplay1.setStyleSheet("background:red")
+    def check_output1(self, on):
+        self.O1_was_on=on
+        if self.O1_was_on:
+            self.Odisplay1.setText("Output is On")
+            self.Odisplay1.setStyleSheet("background:limegreen")
+        else:
+            self.Odisplay1.setText("Output is Off")
+            self.Odisplay1.setStyleSheet("background:red")
 
-    def measure_voltage2(self):
-        self.Vmeas2 = self.aim2.measureVoltage(2)
+    def measure_voltage2(self, status):
+        self.Vmeas2 = status['Vmeas',2]
         self.VmeasNum2.display(f"{self.Vmeas2:.2f}")
 
-    def measure_current2(self):
-        self.Imeas2 = self.aim2.measureCurrent(2)
+    def measure_current2(self, status):
+        self.Imeas2 = status['Imeas',2]
         self.ImeasNum2.display(f"{self.Imeas2:.2f}")
 
-    def check_output2(self):
-        if self.O2_was_on != self.aim2.isOutputOn(2): 
-            self.O2_was_on=self.aim2.isOutputOn(2)
-            if self.aim2.isOutputOn(2):
-                self.Odisplay2.setText("Output is On")
-                self.Odisplay2.setStyleSheet("background:limegreen")
-            else:
-                self.Odisplay2.setText("Output is Off")
-                self.Odisplay2.setStyleSheet("background:red")
-
-    def query_voltage1(self):
-        if self.aim2.queryVoltage(1) != self.V1set:
-            self.V1set=self.aim2.queryVoltage(1)
-            self.V1setNum.setText("V Set Value: "+f"{self.V1set:.2f}"+" V")
-
-    def query_current1(self):
-        if self.aim2.queryCurrent(1) != self.I1set:
-            self.I1set=self.aim2.queryCurrent(1)
-            self.I1setNum.setText("I Set Value: "+f"{self.I1set:.2f}"+" A")
-
-    def query_voltage2(self):
-        if self.aim2.queryVoltage(2) != self.V2set:
-            self.V2set=self.aim2.queryVoltage(2)
-            self.V2setNum.setText("V Set Value: "+f"{self.V2set:.2f}"+" V")
-
-    def query_current2(self):
-        if self.aim2.queryCurrent(2) != self.I2set:
-            self.I2set=self.aim2.queryCurrent(2)
-            self.I2setNum.setText("I Set Value: "+f"{self.I2set:.2f}"+" A")
+    def check_output2(self, on):
+        self.O2_was_on=on
+        if self.O2_was_on:
+            self.Odisplay2.setText("Output is On")
+            self.Odisplay2.setStyleSheet("background:limegreen")
+        else:
+            self.Odisplay2.setText("Output is Off")
+            self.Odisplay2.setStyleSheet("background:red")
+
+    def query_voltage1(self, Vset):
+        self.V1set=Vset
+        self.V1setNum.setText("V Set Value: "+f"{self.V1set:.2f}"+" V")
+
+    def query_current1(self, Iset):
+        self.I1set=Iset
+        self.I1setNum.setText("I Set Value: "+f"{self.I1set:.2f}"+" A")
+
+    def query_voltage2(self, Vset):
+        self.V2set=Vset
+        self.V2setNum.setText("V Set Value: "+f"{self.V2set:.2f}"+" V")
+
+    def query_current2(self, Iset):
+        self.I2set=Iset
+        self.I2setNum.setText("I Set Value: "+f"{self.I2set:.2f}"+" A")
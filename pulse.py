@@ -2,13 +2,16 @@
 # 07/28/2021
 # adapted from pulser_gui.py
 
-from PyQt5.QtCore import Qt, QSize, QTimer
+from PyQt5.QtCore import Qt, QSize
 from PyQt5.QtGui import QPalette
 from PyQt5.QtWidgets import (QApplication, QComboBox, QDialog, QFrame,
     QGridLayout, QGroupBox, QHBoxLayout, QLabel, QLCDNumber, QLineEdit,
     QPushButton, QVBoxLayout, QWidget, QMessageBox)
 
 from dcps import RigolDG5000
+from instrument_worker import InstrumentWorker
+from poller import Poller
+from state_mirror import StateMirror
 
 from pyvisa.errors import VisaIOError
 from serial.serialutil import SerialException
@@ -16,57 +19,62 @@ from serial.serialutil import SerialException
 from math import inf
 
 class Pulse(QDialog):
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, connect=True):
+        # connect=False only shows a placeholder, open_instrument() and
+        # show_instrument() are then left to the caller (see connector.py)
         super(Pulse, self).__init__(parent)
 
         # start with a grid layout
-        mainLayout = QGridLayout()
+        self.mainLayout = QGridLayout()
+        self.isConnected=False
+        self.pulser_box=QLabel("Pulse Generator Connecting\u2026")
 
-        try:
+        self.mainLayout.addWidget(self.pulser_box,0,0)
+
+        # set the layout of the widget gallery to mainLayout
+        self.setLayout(self.mainLayout)
+
+        if connect:
+            try:
+                self.open_instrument()
+                err=None
+            except VisaIOError as e:
+                err=e
+            except SerialException as e:
+                err=e
+            except ValueError as e:
+                err=e
+            self.show_instrument(err)
+
+    def open_instrument(self):
+        # connect and read everything the panel shows, touches no widgets
+        # so it can run on any thread
+        self.Rigol=RigolDG5000('USB0::6833::1600::DG5T220100004\x00::0::INSTR')
+        # both channels, whether in use or not, for the initial displays
+        self.snaps=(self.Rigol.snapshot(1),self.Rigol.snapshot(2))
+
+    def show_instrument(self, err):
+        # swap the placeholder for the pulser box, or for the error if err
+        old=self.pulser_box
+        if err is None:
             self.create_pulser_box()
             self.isConnected=True
-        except VisaIOError as err:
-            self.pulser_box=QLabel("Pulse Generator Not Connected: "+str(err))
-            self.isConnected=False
-        except SerialException as err:
-            self.pulser_box=QLabel("Pulse Generator Not Connected: "+str(err))
-            self.isConnected=False
-        except ValueError as err:
+        else:
             self.pulser_box=QLabel("Pulse Generator Not Connected: "+str(err))
-            self.isConnected=False
-
-        mainLayout.addWidget(self.pulser_box,0,0)
-
-        # set the layout of the widget gallery to mainLayout
-        self.setLayout(mainLayout)
+        self.mainLayout.replaceWidget(old,self.pulser_box)
+        old.deleteLater()
 
     def create_pulser_box(self):
 
-        # connect to pulser
-        self.Rigol=RigolDG5000('USB0::6833::1600::DG5T220100004\x00::0::INSTR')
+        # all pulser traffic from here on runs on its own thread
+        self.worker=InstrumentWorker(self.Rigol,"Pulser")
+        self.worker.error.connect(print)
+        self.worker.start()
 
         self.pulser_box=QGroupBox("Rigol Pulser")
         self.pulser_layout=QGridLayout()
         self.pulser_box.setLayout(self.pulser_layout)
 
-        # start a timer ??
-        self.qTimer = QTimer()
-        self.qTimer.setInterval(500)
-        self.qTimer.start()
-
-        self.qTimer.timeout.connect(self.check_output)
-        self.qTimer.timeout.connect(self.check_pulse)
-        self.qTimer.timeout.connect(self.check_polarity)
-        self.qTimer.timeout.connect(self.check_impedance)
-        self.qTimer.timeout.connect(self.check_sync)
-        self.qTimer.timeout.connect(self.check_syncPol)
-        self.qTimer.timeout.connect(self.check_duty)
-        self.qTimer.timeout.connect(self.check_pd)
-        self.qTimer.timeout.connect(self.check_width)
-        self.qTimer.timeout.connect(self.check_hold)
-        self.qTimer.timeout.connect(self.check_lead)
-        self.qTimer.timeout.connect(self.check_trail)
-
         # whether to check channel 1 and channel 2 or not
         self.check1=True
         self.check2=False
@@ -77,6 +85,38 @@ class Pulse(QDialog):
         self.create_box2()
         self.pulser_layout.addWidget(self.box2,0,1)
 
+        # every setting of both channels lives in the mirror, keyed by
+        # (snapshot field,channel). the GUI's own writes go straight into it
+        # and each display follows its own keys
+        self.mirror=StateMirror()
+        self.mirror.error.connect(print)
+        for channel in [1,2]:
+            for field,check in [('output',self.check_output),
+                    ('normal',self.check_polarity),
+                    ('impedance',self.check_impedance),
+                    ('sync',self.check_sync),('sync_pos',self.check_syncPol),
+                    ('freq',self.check_freq),('amp',self.check_amp),
+                    ('offset',self.check_offset),('delay',self.check_delay),
+                    ('duty',self.check_duty),('pulse_delay',self.check_pd),
+                    ('hold_width',self.check_hold),('lead',self.check_lead),
+                    ('trail',self.check_trail),('width',self.check_width)]:
+                self.mirror.subscribe((field,channel),
+                    lambda value,check=check,channel=channel:
+                        check(channel,value))
+        # fill in every display from the snapshots taken when connecting
+        self.mirror.update(self.snapshot_values(1,self.snaps[0]))
+        self.mirror.update(self.snapshot_values(2,self.snaps[1]))
+
+        # the outputs are read often, everything else (one snapshot query
+        # per channel in use) rarely, only to check the mirror against the
+        # pulser. both wait longer while nothing changes
+        self.poller=Poller(self.worker)
+        self.poller.add('output',self.mirror.reader(self.read_outputs),None,
+            interval=0.5,max_interval=2)
+        self.poller.add('settings',self.mirror.reader(self.read_snapshots),
+            None,interval=2,max_interval=10)
+        self.poller.start()
+
     def create_box1(self):
 
         self.box1=QGroupBox("Channel 1")
@@ -179,7 +219,7 @@ class Pulse(QDialog):
         self.Odisplay1.setAlignment(Qt.AlignCenter)
         self.Odisplay1.setFrameShape(QFrame.StyledPanel)
 
-        self.was_on1=self.Rigol.isOutputOn(1) # checking output
+        self.was_on1=self.snaps[0].output # checking output
         # was_on is used later to determine previous state of output
         # here it acts as the initial state of output
 
@@ -208,7 +248,7 @@ class Pulse(QDialog):
         self.Odisplay2.setAlignment(Qt.AlignCenter)
         self.Odisplay2.setFrameShape(QFrame.StyledPanel)
 
-        self.was_on2=self.Rigol.isOutputOn(2) # checking output
+        self.was_on2=self.snaps[1].output # checking output
 
         if self.was_on2: # green if on
             self.Odisplay2.setText("Output 2 is On")
@@ -235,7 +275,7 @@ class Pulse(QDialog):
         self.polDisplay1.setAlignment(Qt.AlignCenter)
         self.polDisplay1.setFrameShape(QFrame.StyledPanel)
 
-        self.was_norm1=self.Rigol.isNorm(1)
+        self.was_norm1=self.snaps[0].normal
 
         if self.was_norm1: # green if normal
             self.polDisplay1.setText("Normal")
@@ -261,7 +301,7 @@ class Pulse(QDialog):
         self.polDisplay2.setAlignment(Qt.AlignCenter)
         self.polDisplay2.setFrameShape(QFrame.StyledPanel)
 
-        self.was_norm2=self.Rigol.isNorm(2)
+        self.was_norm2=self.snaps[1].normal
 
         if self.was_norm2: # green if normal
             self.polDisplay2.setText("Normal")
@@ -317,7 +357,7 @@ class Pulse(QDialog):
         self.sync1display.setAlignment(Qt.AlignCenter)
         self.sync1display.setFrameShape(QFrame.StyledPanel)
 
-        self.was_sync1=self.Rigol.isSyncOn(1) # like was_on
+        self.was_sync1=self.snaps[0].sync # like was_on
 
         if self.was_sync1: # green if on
             self.sync1display.setText("Sync is On")
@@ -344,7 +384,7 @@ class Pulse(QDialog):
         self.syncPolDisplay1.setAlignment(Qt.AlignCenter)
         self.syncPolDisplay1.setFrameShape(QFrame.StyledPanel)
 
-        self.was_syncPol1=self.Rigol.isSyncPolPos(1) # like was_on and was_sync
+        self.was_syncPol1=self.snaps[0].sync_pos # like was_on and was_sync
 
         if self.was_syncPol1: # green if positive
             self.syncPolDisplay1.setText("Positive")
@@ -370,7 +410,7 @@ class Pulse(QDialog):
         self.sync2display.setAlignment(Qt.AlignCenter)
         self.sync2display.setFrameShape(QFrame.StyledPanel)
 
-        self.was_sync2=self.Rigol.isSyncOn(2)
+        self.was_sync2=self.snaps[1].sync
 
         if self.was_sync2: # green if on
             self.sync2display.setText("Sync is On")
@@ -398,7 +438,7 @@ class Pulse(QDialog):
         self.syncPolDisplay2.setAlignment(Qt.AlignCenter)
         self.syncPolDisplay2.setFrameShape(QFrame.StyledPanel)
 
-        self.was_syncPol2=self.Rigol.isSyncPolPos(2)
+        self.was_syncPol2=self.snaps[1].sync_pos
 
         if self.was_syncPol2: # green if on
             self.syncPolDisplay2.setText("Positive")
@@ -641,7 +681,7 @@ class Pulse(QDialog):
         self.hold1disp.setAlignment(Qt.AlignCenter)
         self.hold1disp.setFrameShape(QFrame.StyledPanel)
 
-        self.was_width1=self.Rigol.isWidth(1) # like was_on, was_sync, etc
+        self.was_width1=self.snaps[0].hold_width # like was_on, was_sync, etc
 
         if self.was_width1: # yellow if holding width
             self.hold1disp.setText("Holding Width")
@@ -746,7 +786,7 @@ class Pulse(QDialog):
         self.hold2disp.setAlignment(Qt.AlignCenter)
         self.hold2disp.setFrameShape(QFrame.StyledPanel)
 
-        self.was_width2=self.Rigol.isWidth(2) # like was_on
+        self.was_width2=self.snaps[1].hold_width # like was_on
 
         if self.was_width2: # yellow if holding width
             self.hold2disp.setText("Holding Width")
@@ -812,34 +852,53 @@ class Pulse(QDialog):
         if (channel==2) and not self.check2:
             self.toggle_check2()
 
-        if self.Rigol.isOutputOn(channel): # if on
-            self.Rigol.outputOff(channel) # turn off
-        else: # if off
-            self.Rigol.outputOn(channel) # turn on
+        self.worker.submit(self.toggle_job,'output',self.Rigol.isOutputOn,
+            self.Rigol.outputOff,self.Rigol.outputOn,channel)
 
-    def check_output(self): # checks both outputs at the same time
-        if self.check1:
-            if self.was_on1 != self.Rigol.isOutputOn(1):
-                # if current state is not equal to previous state
-                # this check is here so that if nothing has changed,
-                # we don't have to 'reset' the text and color
-                # of the display every half second to the same thing
-                self.was_on1=self.Rigol.isOutputOn(1) # set new 'previous state'
-                if self.was_on1: # green if on
-                    self.Odisplay1.setText("Output 1 is On")
-                    self.Odisplay1.setStyleSheet("background:limegreen")
-                else: # red if off
-                    self.Odisplay1.setText("Output 1 is Off")
-                    self.Odisplay1.setStyleSheet("background:red")
-        if self.check2:
-            if self.was_on2 != self.Rigol.isOutputOn(2): # same as above
-                self.was_on2=self.Rigol.isOutputOn(2)
-                if self.was_on2:
-                    self.Odisplay2.setText("Output 2 is On")
-                    self.Odisplay2.setStyleSheet("background:limegreen")
-                else:
-                    self.Odisplay2.setText("Output 2 is Off")
-                    self.Odisplay2.setStyleSheet("background:red")
+    def toggle_job(self, field, is_on, turn_off, turn_on, channel):
+        # runs on the worker thread
+        # field: the snapshot field that turn_on makes True
+        if is_on(channel):
+            turn_off(channel)
+            self.mirror.set((field,channel),False)
+        else:
+            turn_on(channel)
+            self.mirror.set((field,channel),True)
+
+    def set_job(self, setter, field, value, channel):
+        # runs on the worker thread
+        setter(value,channel)
+        self.mirror.set((field,channel),float(value))
+
+    def apply_pulse_job(self, freq, amp, offset, delay, channel):
+        # runs on the worker thread
+        self.Rigol.applyPulse(freq, amp, offset, delay, channel)
+        self.mirror.update({('freq',channel):float(freq),
+            ('amp',channel):float(amp),('offset',channel):float(offset),
+            ('delay',channel):float(delay)})
+
+    def snapshot_values(self, channel, snap):
+        # {(field,channel):value} for every field of a snapshot
+        return {(field,channel):value
+            for field,value in snap._asdict().items()}
+
+    def read_outputs(self):
+        # runs on the worker thread, only the channels in use
+        values={}
+        for channel,check in [(1,self.check1),(2,self.check2)]:
+            if check:
+                values['output',channel]=self.Rigol.isOutputOn(channel)
+        return values
+
+    def read_snapshots(self):
+        # ask the pulser for everything once per channel in use
+        # runs on the worker thread
+        values={}
+        for channel,check in [(1,self.check1),(2,self.check2)]:
+            if check:
+                values.update(self.snapshot_values(channel,
+                    self.Rigol.snapshot(channel)))
+        return values
 
     def toggle_polarity(self, channel=1):
         if (channel==1) and not self.check1:
@@ -847,32 +906,8 @@ class Pulse(QDialog):
         if (channel==2) and not self.check2:
             self.toggle_check2()
 
-        if self.Rigol.isNorm(channel):
-            self.Rigol.polarityInv(channel)
-        else:
-            self.Rigol.polarityNorm(channel)
-
-    def check_polarity(self):
-        # checks both at same time, same concept as check_output
-        if self.check1:
-            if self.was_norm1 != self.Rigol.isNorm(1):
-                self.was_norm1=self.Rigol.isNorm(1)
-                if self.was_norm1: # green if normal
-                    self.polDisplay1.setText("Normal")
-                    self.polDisplay1.setStyleSheet("background:limegreen")
-                else: # red if inverted
-                    self.polDisplay1.setText("Inverted")
-                    self.polDisplay1.setStyleSheet("background:red")
-
-        if self.check2:
-            if self.was_norm2 != self.Rigol.isNorm(2):
-                self.was_norm2=self.Rigol.isNorm(2)
-                if self.was_norm2: # green if normal
-                    self.polDisplay2.setText("Normal")
-                    self.polDisplay2.setStyleSheet("background:limegreen")
-                else: # red if inverted
-                    self.polDisplay2.setText("Inverted")
-                    self.polDisplay2.setStyleSheet("background:red")
+        self.worker.submit(self.toggle_job,'normal',self.Rigol.isNorm,
+            self.Rigol.polarityInv,self.Rigol.polarityNorm,channel)
 
     def toggle_sync(self, channel=1):
         if (channel==1) and not self.check1:
@@ -880,10 +915,8 @@ class Pulse(QDialog):
         if (channel==2) and not self.check2:
             self.toggle_check2()
 
-        if self.Rigol.isSyncOn(channel):
-            self.Rigol.syncOff(channel)
-        else:
-            self.Rigol.syncOn(channel)
+        self.worker.submit(self.toggle_job,'sync',self.Rigol.isSyncOn,
+            self.Rigol.syncOff,self.Rigol.syncOn,channel)
 
     def toggle_syncPol(self, channel=1):
         if (channel==1) and not self.check1:
@@ -891,53 +924,8 @@ class Pulse(QDialog):
         if (channel==2) and not self.check2:
             self.toggle_check2()
 
-        if self.Rigol.isSyncPolPos(channel):
-            self.Rigol.syncPolNeg(channel)
-        else:
-            self.Rigol.syncPolPos(channel)
-
-    def check_sync(self):
-        # checks both channels at same time, same as check_output
-        if self.check1:
-            if self.was_sync1 != self.Rigol.isSyncOn(1):
-                self.was_sync1=self.Rigol.isSyncOn(1)
-                if self.was_sync1: # green if on
-                    self.sync1display.setText("Sync is On")
-                    self.sync1display.setStyleSheet("background:limegreen")
-                else: # red if off
-                    self.sync1display.setText("Sync is Off")
-                    self.sync1display.setStyleSheet("background:red")
-
-        if self.check2:
-            if self.was_sync2 != self.Rigol.isSyncOn(2):
-                self.was_sync2=self.Rigol.isSyncOn(2)
-                if self.was_sync2: # green if on
-                    self.sync2display.setText("Sync is On")
-                    self.sync2display.setStyleSheet("background:limegreen")
-                else: # red if off
-                    self.sync2display.setText("Sync is Off")
-                    self.sync2display.setStyleSheet("background:red")
-
-    def check_syncPol(self): # same as above
-        if self.check1:
-            if self.was_syncPol1 != self.Rigol.isSyncPolPos(1):
-                self.was_syncPol1=self.Rigol.isSyncPolPos(1)
-                if self.was_syncPol1: # green if positive
-                    self.syncPolDisplay1.setText("Positive")
-                    self.syncPolDisplay1.setStyleSheet("background:limegreen")
-                else: # red if negative
-                    self.syncPolDisplay1.setText("Negative")
-                    self.syncPolDisplay1.setStyleSheet("background:red")
-
-        if self.check2:
-            if self.was_syncPol2 != self.Rigol.isSyncPolPos(2):
-                self.was_syncPol2=self.Rigol.isSyncPolPos(2)
-                if self.was_syncPol2: # green if positive
-                    self.syncPolDisplay2.setText("Positive")
-                    self.syncPolDisplay2.setStyleSheet("background:limegreen")
-                else: # red if negative
-                    self.syncPolDisplay2.setText("Negative")
-                    self.syncPolDisplay2.setStyleSheet("background:red")
+        self.worker.submit(self.toggle_job,'sync_pos',self.Rigol.isSyncPolPos,
+            self.Rigol.syncPolNeg,self.Rigol.syncPolPos,channel)
 
     def toggle_impedance(self, channel=1):
         if (channel==1) and not self.check1:
@@ -945,10 +933,16 @@ class Pulse(QDialog):
         if (channel==2) and not self.check2:
             self.toggle_check2()
 
+        self.worker.submit(self.toggle_impedance_job,channel)
+
+    def toggle_impedance_job(self, channel):
+        # runs on the worker thread
         if self.Rigol.isImpInf(channel): # if infinite
             self.Rigol.setImpedance(50,channel) # set to 50 ohms
+            self.mirror.set(('impedance',channel),50.0)
         else: # if 50 ohms (or something else?)
             self.Rigol.setImpedance(inf,channel) # set infinite
+            self.mirror.set(('impedance',channel),inf)
 
 
     def on_pulse1_clicked(self):
@@ -960,7 +954,9 @@ class Pulse(QDialog):
         offset=self.os1set.text()
         delay=self.delay1set.text()
         channel=1
-        self.Rigol.applyPulse(freq, amp, offset, delay, channel)
+        self.worker.submit(self.apply_pulse_job,freq,amp,offset,delay,
+            channel)
+        self.poller.refresh('settings') # moves the duty cycle or width too
 
     def on_pulse2_clicked(self):
         if not self.check2:
@@ -971,31 +967,39 @@ class Pulse(QDialog):
         offset=self.os2set.text()
         delay=self.delay2set.text()
         channel=2
-        self.Rigol.applyPulse(freq, amp, offset, delay, channel)
+        self.worker.submit(self.apply_pulse_job,freq,amp,offset,delay,
+            channel)
+        self.poller.refresh('settings') # moves the duty cycle or width too
 
     def on_duty1_clicked(self):
         if not self.check1:
             self.toggle_check1()
         duty=self.duty1set.text() # take duty cycle from QLineEdit box
-        self.Rigol.dutyCycle(duty,1)
+        self.worker.submit(self.set_job,self.Rigol.dutyCycle,'duty',
+            duty,1)
+        self.poller.refresh('settings') # moves the duty cycle or width too
 
     def on_duty2_clicked(self):
         if not self.check2:
             self.toggle_check2()
         duty=self.duty2set.text() # take duty cycle from QLineEdit box
-        self.Rigol.dutyCycle(duty,2)
+        self.worker.submit(self.set_job,self.Rigol.dutyCycle,'duty',
+            duty,2)
+        self.poller.refresh('settings') # moves the duty cycle or width too
 
     def on_pd1_clicked(self):
         if not self.check1:
             self.toggle_check1()
         pd=self.pd1set.text()
-        self.Rigol.pulseDelay(pd,1)
+        self.worker.submit(self.set_job,self.Rigol.pulseDelay,'pulse_delay',
+            pd,1)
 
     def on_pd2_clicked(self):
         if not self.check2:
             self.toggle_check2()
         pd=self.pd2set.text()
-        self.Rigol.pulseDelay(pd,2)
+        self.worker.submit(self.set_job,self.Rigol.pulseDelay,'pulse_delay',
+            pd,2)
 
     def toggle_hold(self, channel=1):
         if (channel==1) and not self.check1:
@@ -1003,139 +1007,164 @@ class Pulse(QDialog):
         if (channel==2) and not self.check2:
             self.toggle_check2()
 
-        if self.Rigol.isWidth(channel): # if holding width
-            self.Rigol.holdDuty(channel) # hold duty
-        else: # if holding duty
-            self.Rigol.holdWidth(channel) # hold width
+        self.worker.submit(self.toggle_job,'hold_width',self.Rigol.isWidth,
+            self.Rigol.holdDuty,self.Rigol.holdWidth,channel)
 
     def on_lead1_clicked(self):
         if not self.check1:
             self.toggle_check1()
         lead=self.lead1set.text()
-        self.Rigol.transitionLeading(lead,1)
+        self.worker.submit(self.set_job,self.Rigol.transitionLeading,'lead',
+            lead,1)
 
     def on_lead2_clicked(self):
         if not self.check2:
             self.toggle_check2()
         lead=self.lead2set.text()
-        self.Rigol.transitionLeading(lead,2)
+        self.worker.submit(self.set_job,self.Rigol.transitionLeading,'lead',
+            lead,2)
 
     def on_trail1_clicked(self):
         if not self.check1:
             self.toggle_check1()
         trail=self.trail1set.text()
-        self.Rigol.transitionTrailing(trail,1)
+        self.worker.submit(self.set_job,self.Rigol.transitionTrailing,'trail',
+            trail,1)
 
     def on_trail2_clicked(self):
         if not self.check2:
             self.toggle_check2()
         trail=self.trail2set.text()
-        self.Rigol.transitionTrailing(trail,2)
+        self.worker.submit(self.set_job,self.Rigol.transitionTrailing,'trail',
+            trail,2)
 
     def on_width1_clicked(self):
         if not self.check1:
             self.toggle_check1()
         width=self.width1set.text()
-        self.Rigol.pulseWidth(width,1)
+        self.worker.submit(self.set_job,self.Rigol.pulseWidth,'width',
+            width,1)
+        self.poller.refresh('settings') # moves the duty cycle or width too
 
     def on_width2_clicked(self):
         if not self.check2:
             self.toggle_check2()
         width=self.width2set.text()
-        self.Rigol.pulseWidth(width,2)
-
-    def check_impedance(self):
-        if self.check1:
-            imp1=self.Rigol.queryImpedance(1)
-            if imp1==inf:
-                self.imp1disp.display("h19h") # "high" in LCD display
-            else:
-                self.imp1disp.display(f"{imp1:.2f}")
-        if self.check2:
-            imp2=self.Rigol.queryImpedance(2)
-            if imp2==inf:
-                self.imp2disp.display("h19h") # "high" in LCD display
+        self.worker.submit(self.set_job,self.Rigol.pulseWidth,'width',
+            width,2)
+        self.poller.refresh('settings') # moves the duty cycle or width too
+
+    # the mirror only calls the check_ functions when the value has changed,
+    # so nothing is redrawn to the same thing
+    def check_output(self, channel, on):
+        if channel==1:
+            self.was_on1=on
+            if self.was_on1: # green if on
+                self.Odisplay1.setText("Output 1 is On")
+                self.Odisplay1.setStyleSheet("background:limegreen")
+            else: # red if off
+                self.Odisplay1.setText("Output 1 is Off")
+                self.Odisplay1.setStyleSheet("background:red")
+        else:
+            self.was_on2=on
+            if self.was_on2:
+                self.Odisplay2.setText("Output 2 is On")
+                self.Odisplay2.setStyleSheet("background:limegreen")
             else:
-                self.imp2disp.display(f"{imp2:.2f}")
+                self.Odisplay2.setText("Output 2 is Off")
+                self.Odisplay2.setStyleSheet("background:red")
 
-    def check_pulse(self):
-        if self.check1:
-            # queryApply returns list
-            # [waveform name, frequency, amplitude, offset, delay]
-            lst1=self.Rigol.queryApply(1)
-            # lst[0] is ignored since we don't need waveform name here
-            # we know it's a pulse
-            self.freq1disp.display(lst1[1])
-            self.amp1disp.display(f"{lst1[2]:.2f}")
-            self.os1disp.display(f"{lst1[3]:.2f}")
-            self.delay1disp.display(f"{lst1[4]:.2f}")
-
-        if self.check2: # if we want to check channel 2 as well
-            lst2=self.Rigol.queryApply(2)
-            self.freq2disp.display(lst2[1])
-            self.amp2disp.display(f"{lst2[2]:.2f}")
-            self.os2disp.display(f"{lst2[3]:.2f}")
-            self.delay2disp.display(f"{lst2[4]:.2f}")
-
-    def check_hold(self):
-        if self.check1:
-            if self.was_width1 != self.Rigol.isWidth(1): # like was_on
-                self.was_width1=self.Rigol.isWidth(1)
-                if self.was_width1: # yellow if holding width
-                    self.hold1disp.setText("Holding Width")
-                    self.hold1disp.setStyleSheet("background:yellow")
-                else: # blue if holding duty
-                    self.hold1disp.setText("Holding Duty")
-                    self.hold1disp.setStyleSheet("background:cyan")
-        if self.check2:
-            if self.was_width2 != self.Rigol.isWidth(2):
-                self.was_width2=self.Rigol.isWidth(2)
-                if self.was_width2: # yellow if holding width
-                    self.hold2disp.setText("Holding Width")
-                    self.hold2disp.setStyleSheet("background:yellow")
-                else: # blue if holding duty
-                    self.hold2disp.setText("Holding Duty")
-                    self.hold2disp.setStyleSheet("background:cyan")
-
-    def check_duty(self):
-        if self.check1:
-            duty1=self.Rigol.queryDutyCycle(1) # ask for duty cycle on ch1
-            self.duty1disp.display(duty1) # set ch1 display
-        if self.check2:
-            duty2=self.Rigol.queryDutyCycle(2) # ask for duty cycle on ch2
-            self.duty2disp.display(duty2) # set ch2 display
+    def check_polarity(self, channel, normal):
+        if channel==1:
+            self.was_norm1=normal
+            disp=self.polDisplay1
+        else:
+            self.was_norm2=normal
+            disp=self.polDisplay2
+        if normal: # green if normal
+            disp.setText("Normal")
+            disp.setStyleSheet("background:limegreen")
+        else: # red if inverted
+            disp.setText("Inverted")
+            disp.setStyleSheet("background:red")
 
-    def check_pd(self): # same as above
-        if self.check1:
-            pd1=self.Rigol.queryDelay(1)
-            self.pd1disp.display(pd1)
-        if self.check2:
-            pd2=self.Rigol.queryDelay(2)
-            self.pd2disp.display(pd2)
+    def check_sync(self, channel, sync):
+        if channel==1:
+            self.was_sync1=sync
+            disp=self.sync1display
+        else:
+            self.was_sync2=sync
+            disp=self.sync2display
+        if sync: # green if on
+            disp.setText("Sync is On")
+            disp.setStyleSheet("background:limegreen")
+        else: # red if off
+            disp.setText("Sync is Off")
+            disp.setStyleSheet("background:red")
 
-    def check_lead(self): # same as above
-        if self.check1:
-            lead1=self.Rigol.queryTransLead(1)
-            self.lead1disp.display(lead1)
-        if self.check2:
-            lead2=self.Rigol.queryTransLead(2)
-            self.lead2disp.display(lead2)
+    def check_syncPol(self, channel, positive):
+        if channel==1:
+            self.was_syncPol1=positive
+            disp=self.syncPolDisplay1
+        else:
+            self.was_syncPol2=positive
+            disp=self.syncPolDisplay2
+        if positive: # green if positive
+            disp.setText("Positive")
+            disp.setStyleSheet("background:limegreen")
+        else: # red if negative
+            disp.setText("Negative")
+            disp.setStyleSheet("background:red")
 
-    def check_trail(self): # same as above
-        if self.check1:
-            trail1=self.Rigol.queryTransTrail(1)
-            self.trail1disp.display(trail1)
-        if self.check2:
-            trail2=self.Rigol.queryTransTrail(2)
-            self.trail2disp.display(trail2)
+    def check_hold(self, channel, width):
+        if channel==1:
+            self.was_width1=width
+            disp=self.hold1disp
+        else:
+            self.was_width2=width
+            disp=self.hold2disp
+        if width: # yellow if holding width
+            disp.setText("Holding Width")
+            disp.setStyleSheet("background:yellow")
+        else: # blue if holding duty
+            disp.setText("Holding Duty")
+            disp.setStyleSheet("background:cyan")
 
-    def check_width(self): # same as above
-        if self.check1:
-            width1=self.Rigol.queryWidth(1)
-            self.width1disp.display(width1)
-        if self.check2:
-            width2=self.Rigol.queryWidth(2)
-            self.width2disp.display(width2)
+    def check_impedance(self, channel, imp):
+        disp=self.imp1disp if channel==1 else self.imp2disp
+        if imp==inf:
+            disp.display("h19h") # "high" in LCD display
+        else:
+            disp.display(f"{imp:.2f}")
+
+    # waveform name is ignored since we know it's a pulse
+    def check_freq(self, channel, freq):
+        (self.freq1disp if channel==1 else self.freq2disp).display(freq)
+
+    def check_amp(self, channel, amp):
+        (self.amp1disp if channel==1 else self.amp2disp).display(f"{amp:.2f}")
+
+    def check_offset(self, channel, offset):
+        (self.os1disp if channel==1 else self.os2disp).display(f"{offset:.2f}")
+
+    def check_delay(self, channel, delay):
+        (self.delay1disp if channel==1 else self.delay2disp).display(
+            f"{delay:.2f}")
+
+    def check_duty(self, channel, duty):
+        (self.duty1disp if channel==1 else self.duty2disp).display(duty)
+
+    def check_pd(self, channel, pd):
+        (self.pd1disp if channel==1 else self.pd2disp).display(pd)
+
+    def check_lead(self, channel, lead):
+        (self.lead1disp if channel==1 else self.lead2disp).display(lead)
+
+    def check_trail(self, channel, trail):
+        (self.trail1disp if channel==1 else self.trail2disp).display(trail)
+
+    def check_width(self, channel, width):
+        (self.width1disp if channel==1 else self.width2disp).display(width)
 
     def toggle_check1(self):
         if self.check1:
@@ -1146,6 +1175,7 @@ class Pulse(QDialog):
             self.check1=True
             self.check1disp.setText("Channel 1 In Use")
             self.check1disp.setStyleSheet("background:limegreen")
+            self.poller.refresh() # read the channel straight away
 
     def toggle_check2(self):
         if self.check2:
@@ -1156,3 +1186,4 @@ class Pulse(QDialog):
             self.check2=True
             self.check2disp.setText("Channel 2 In Use")
             self.check2disp.setStyleSheet("background:limegreen")
+            self.poller.refresh() # read the channel straight away
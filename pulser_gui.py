@@ -65,18 +65,8 @@ class WidgetGallery(QDialog):
         self.qTimer.setInterval(500)
         self.qTimer.start()
 
-        self.qTimer.timeout.connect(self.check_output)
-        self.qTimer.timeout.connect(self.check_pulse)
-        self.qTimer.timeout.connect(self.check_polarity)
-        self.qTimer.timeout.connect(self.check_impedance)
-        self.qTimer.timeout.connect(self.check_sync)
-        self.qTimer.timeout.connect(self.check_syncPol)
-        self.qTimer.timeout.connect(self.check_duty)
-        self.qTimer.timeout.connect(self.check_pd)
-        self.qTimer.timeout.connect(self.check_width)
-        self.qTimer.timeout.connect(self.check_hold)
-        self.qTimer.timeout.connect(self.check_lead)
-        self.qTimer.timeout.connect(self.check_trail)
+        # one snapshot query per channel in use feeds every display
+        self.qTimer.timeout.connect(self.poll)
 
         # whether to check channel 1 and channel 2 or not
         self.check1=True
@@ -851,14 +841,33 @@ class WidgetGallery(QDialog):
         else:
             print("Pranked! dry run :)")
 
-    def check_output(self): # checks both outputs at the same time
+    def poll(self):
+        # ask the pulser for everything once per channel in use, then update
+        # every display from those answers
+        snap1=self.Rigol.snapshot(1) if self.check1 else None
+        snap2=self.Rigol.snapshot(2) if self.check2 else None
+
+        self.check_output(snap1,snap2)
+        self.check_pulse(snap1,snap2)
+        self.check_polarity(snap1,snap2)
+        self.check_impedance(snap1,snap2)
+        self.check_sync(snap1,snap2)
+        self.check_syncPol(snap1,snap2)
+        self.check_duty(snap1,snap2)
+        self.check_pd(snap1,snap2)
+        self.check_width(snap1,snap2)
+        self.check_hold(snap1,snap2)
+        self.check_lead(snap1,snap2)
+        self.check_trail(snap1,snap2)
+
+    def check_output(self,snap1,snap2): # checks both outputs at the same time
         if self.check1:
-            if self.was_on1 != self.Rigol.isOutputOn(1):
+            if self.was_on1 != snap1.output:
                 # if current state is not equal to previous state
                 # this check is here so that if nothing has changed,
                 # we don't have to 'reset' the text and color
                 # of the display every half second to the same thing
-                self.was_on1=self.Rigol.isOutputOn(1) # set new 'previous state'
+                self.was_on1=snap1.output # set new 'previous state'
                 if self.was_on1: # green if on
                     self.Odisplay1.setText("Output 1 is On")
                     self.Odisplay1.setStyleSheet("background:limegreen")
@@ -866,8 +875,8 @@ class WidgetGallery(QDialog):
                     self.Odisplay1.setText("Output 1 is Off")
                     self.Odisplay1.setStyleSheet("background:red")
         if self.check2:
-            if self.was_on2 != self.Rigol.isOutputOn(2): # same as above
-                self.was_on2=self.Rigol.isOutputOn(2)
+            if self.was_on2 != snap2.output: # same as above
+                self.was_on2=snap2.output
                 if self.was_on2:
                     self.Odisplay2.setText("Output 2 is On")
                     self.Odisplay2.setStyleSheet("background:limegreen")
@@ -889,11 +898,11 @@ class WidgetGallery(QDialog):
         else:
             print("Pranked! dry run :)")
 
-    def check_polarity(self):
+    def check_polarity(self,snap1,snap2):
         # checks both at same time, same concept as check_output
         if self.check1:
-            if self.was_norm1 != self.Rigol.isNorm(1):
-                self.was_norm1=self.Rigol.isNorm(1)
+            if self.was_norm1 != snap1.normal:
+                self.was_norm1=snap1.normal
                 if self.was_norm1: # green if normal
                     self.polDisplay1.setText("Normal")
                     self.polDisplay1.setStyleSheet("background:limegreen")
@@ -902,8 +911,8 @@ class WidgetGallery(QDialog):
                     self.polDisplay1.setStyleSheet("background:red")
 
         if self.check2:
-            if self.was_norm2 != self.Rigol.isNorm(2):
-                self.was_norm2=self.Rigol.isNorm(2)
+            if self.was_norm2 != snap2.normal:
+                self.was_norm2=snap2.normal
                 if self.was_norm2: # green if normal
                     self.polDisplay2.setText("Normal")
                     self.polDisplay2.setStyleSheet("background:limegreen")
@@ -939,11 +948,11 @@ class WidgetGallery(QDialog):
         else:
             print("Pranked! dry run :)")
 
-    def check_sync(self):
+    def check_sync(self,snap1,snap2):
         # checks both channels at same time, same as check_output
         if self.check1:
-            if self.was_sync1 != self.Rigol.isSyncOn(1):
-                self.was_sync1=self.Rigol.isSyncOn(1)
+            if self.was_sync1 != snap1.sync:
+                self.was_sync1=snap1.sync
                 if self.was_sync1: # green if on
                     self.sync1display.setText("Sync is On")
                     self.sync1display.setStyleSheet("background:limegreen")
@@ -952,8 +961,8 @@ class WidgetGallery(QDialog):
                     self.sync1display.setStyleSheet("background:red")
 
         if self.check2:
-            if self.was_sync2 != self.Rigol.isSyncOn(2):
-                self.was_sync2=self.Rigol.isSyncOn(2)
+            if self.was_sync2 != snap2.sync:
+                self.was_sync2=snap2.sync
                 if self.was_sync2: # green if on
                     self.sync2display.setText("Sync is On")
                     self.sync2display.setStyleSheet("background:limegreen")
@@ -961,10 +970,10 @@ class WidgetGallery(QDialog):
                     self.sync2display.setText("Sync is Off")
                     self.sync2display.setStyleSheet("background:red")
 
-    def check_syncPol(self): # same as above
+    def check_syncPol(self,snap1,snap2): # same as above
         if self.check1:
-            if self.was_syncPol1 != self.Rigol.isSyncPolPos(1):
-                self.was_syncPol1=self.Rigol.isSyncPolPos(1)
+            if self.was_syncPol1 != snap1.sync_pos:
+                self.was_syncPol1=snap1.sync_pos
                 if self.was_syncPol1: # green if positive
                     self.syncPolDisplay1.setText("Positive")
                     self.syncPolDisplay1.setStyleSheet("background:limegreen")
@@ -973,8 +982,8 @@ class WidgetGallery(QDialog):
                     self.syncPolDisplay1.setStyleSheet("background:red")
 
         if self.check2:
-            if self.was_syncPol2 != self.Rigol.isSyncPolPos(2):
-                self.was_syncPol2=self.Rigol.isSyncPolPos(2)
+            if self.was_syncPol2 != snap2.sync_pos:
+                self.was_syncPol2=snap2.sync_pos
                 if self.was_syncPol2: # green if positive
                     self.syncPolDisplay2.setText("Positive")
                     self.syncPolDisplay2.setStyleSheet("background:limegreen")
@@ -1130,43 +1139,38 @@ class WidgetGallery(QDialog):
         else:
             print(dry_run)
 
-    def check_impedance(self):
+    def check_impedance(self,snap1,snap2):
         if self.check1:
-            imp1=self.Rigol.queryImpedance(1)
+            imp1=snap1.impedance
             if imp1==inf:
                 self.imp1disp.display("h19h") # "high" in LCD display
             else:
                 self.imp1disp.display(f"{imp1:.2f}")
         if self.check2:
-            imp2=self.Rigol.queryImpedance(2)
+            imp2=snap2.impedance
             if imp2==inf:
                 self.imp2disp.display("h19h") # "high" in LCD display
             else:
                 self.imp2disp.display(f"{imp2:.2f}")
 
-    def check_pulse(self):
+    def check_pulse(self,snap1,snap2):
         if self.check1:
-            # queryApply returns list
-            # [waveform name, frequency, amplitude, offset, delay]
-            lst1=self.Rigol.queryApply(1)
-            # lst[0] is ignored since we don't need waveform name here
-            # we know it's a pulse
-            self.freq1disp.display(lst1[1])
-            self.amp1disp.display(f"{lst1[2]:.2f}")
-            self.os1disp.display(f"{lst1[3]:.2f}")
-            self.delay1disp.display(f"{lst1[4]:.2f}")
+            # waveform name is ignored since we know it's a pulse
+            self.freq1disp.display(snap1.freq)
+            self.amp1disp.display(f"{snap1.amp:.2f}")
+            self.os1disp.display(f"{snap1.offset:.2f}")
+            self.delay1disp.display(f"{snap1.delay:.2f}")
 
         if self.check2: # if we want to check channel 2 as well
-            lst2=self.Rigol.queryApply(2)
-            self.freq2disp.display(lst2[1])
-            self.amp2disp.display(f"{lst2[2]:.2f}")
-            self.os2disp.display(f"{lst2[3]:.2f}")
-            self.delay2disp.display(f"{lst2[4]:.2f}")
+            self.freq2disp.display(snap2.freq)
+            self.amp2disp.display(f"{snap2.amp:.2f}")
+            self.os2disp.display(f"{snap2.offset:.2f}")
+            self.delay2disp.display(f"{snap2.delay:.2f}")
 
-    def check_hold(self):
+    def check_hold(self,snap1,snap2):
         if self.check1:
-            if self.was_width1 != self.Rigol.isWidth(1): # like was_on
-                self.was_width1=self.Rigol.isWidth(1)
+            if self.was_width1 != snap1.hold_width: # like was_on
+                self.was_width1=snap1.hold_width
                 if self.was_width1: # yellow if holding width
                     self.hold1disp.setText("Holding Width")
                     self.hold1disp.setStyleSheet("background:yellow")
@@ -1174,8 +1178,8 @@ class WidgetGallery(QDialog):
                     self.hold1disp.setText("Holding Duty")
                     self.hold1disp.setStyleSheet("background:cyan")
         if self.check2:
-            if self.was_width2 != self.Rigol.isWidth(2):
-                self.was_width2=self.Rigol.isWidth(2)
+            if self.was_width2 != snap2.hold_width:
+                self.was_width2=snap2.hold_width
                 if self.was_width2: # yellow if holding width
                     self.hold2disp.setText("Holding Width")
                     self.hold2disp.setStyleSheet("background:yellow")
@@ -1183,44 +1187,44 @@ class WidgetGallery(QDialog):
                     self.hold2disp.setText("Holding Duty")
                     self.hold2disp.setStyleSheet("background:cyan")
 
-    def check_duty(self):
+    def check_duty(self,snap1,snap2):
         if self.check1:
-            duty1=self.Rigol.queryDutyCycle(1) # ask for duty cycle on ch1
+            duty1=snap1.duty # ask for duty cycle on ch1
             self.duty1disp.display(duty1) # set ch1 display
         if self.check2:
-            duty2=self.Rigol.queryDutyCycle(2) # ask for duty cycle on ch2
+            duty2=snap2.duty # ask for duty cycle on ch2
             self.duty2disp.display(duty2) # set ch2 display
 
-    def check_pd(self): # same as above
+    def check_pd(self,snap1,snap2): # same as above
         if self.check1:
-            pd1=self.Rigol.queryDelay(1)
+            pd1=snap1.pulse_delay
             self.pd1disp.display(pd1)
         if self.check2:
-            pd2=self.Rigol.queryDelay(2)
+            pd2=snap2.pulse_delay
             self.pd2disp.display(pd2)
 
-    def check_lead(self): # same as above
+    def check_lead(self,snap1,snap2): # same as above
         if self.check1:
-            lead1=self.Rigol.queryTransLead(1)
+            lead1=snap1.lead
             self.lead1disp.display(lead1)
         if self.check2:
-            lead2=self.Rigol.queryTransLead(2)
+            lead2=snap2.lead
             self.lead2disp.display(lead2)
 
-    def check_trail(self): # same as above
+    def check_trail(self,snap1,snap2): # same as above
         if self.check1:
-            trail1=self.Rigol.queryTransTrail(1)
+            trail1=snap1.trail
             self.trail1disp.display(trail1)
         if self.check2:
-            trail2=self.Rigol.queryTransTrail(2)
+            trail2=snap2.trail
             self.trail2disp.display(trail2)
 
-    def check_width(self): # same as above
+    def check_width(self,snap1,snap2): # same as above
         if self.check1:
-            width1=self.Rigol.queryWidth(1)
+            width1=snap1.width
             self.width1disp.display(width1)
         if self.check2:
-            width2=self.Rigol.queryWidth(2)
+            width2=snap2.width
             self.width2disp.display(width2)
 
     def toggle_check1(self):
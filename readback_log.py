@@ -0,0 +1,221 @@
+# time-series log of instrument readbacks, ie. the PSUs' measured V and I
+# samples go into a fixed size ring buffer, so the latest ones are always at
+# hand (ie. to plot) and memory never grows however long the run, and a
+# writer thread appends them to disk in batches. if the disk falls more than
+# a ring behind, the oldest samples are dropped and counted in self.dropped
+#
+# on disk the directory <name> holds one .npy file per column, appended to
+# with NpyAppender so each is loadable up to the last flush:
+#   time.npy       f8  seconds since the epoch
+#   instrument.npy u2  index into the 'instrument' list in names.json
+#   channel.npy    u1  0 for single channel instruments
+#   quantity.npy   u2  index into the 'quantity' list in names.json
+#   value.npy      f8
+# load_readbacks() loads them back
+#
+# usage:
+#   log=ReadbackLog('run42')
+#   log.record('PSU 2','Vmeas',5.001,channel=1)
+#   t,v=log.latest('PSU 2','Vmeas',channel=1,seconds=60)
+#   t,v,index=log.since('PSU 2','Vmeas',channel=1,index=index) # new ones
+#   log.close()
+
+from threading import Event, Lock, Thread
+from time import time
+import json
+import os
+
+import numpy as np
+
+from waveform_writer import NpyAppender
+
+sample_dtype=np.dtype([('time','f8'),('instrument','u2'),('channel','u1'),
+    ('quantity','u2'),('value','f8')])
+
+class ReadbackLog(object):
+    # name: directory to write to, None to keep only the ring in memory
+    # capacity: samples the ring holds
+    # flush_every: samples waiting that wake the writer before flush_interval
+    # flush_interval: longest seconds between writes to disk
+    def __init__(self,name=None,capacity=1<<16,flush_every=4096,
+            flush_interval=1.0):
+        self.name=name
+        self.capacity=capacity
+        self.flush_every=min(flush_every,capacity//2)
+        self.flush_interval=flush_interval
+        self.ring=np.zeros(capacity,sample_dtype)
+        self.head=0 # samples recorded so far
+        self.written=0 # samples handed to the disk so far
+        self.dropped=0 # samples overwritten before they got to the disk
+        self.names={'instrument':[],'quantity':[]}
+        self.codes={'instrument':{},'quantity':{}}
+        self.names_changed=True # names.json is written on the first flush
+        self.lock=Lock() # the ring and codes
+        self.write_lock=Lock() # the files
+        self.wake=Event()
+        self.stopping=False
+        self.writer=None
+
+        if name is not None:
+            os.makedirs(name,exist_ok=True)
+            self.columns={field:NpyAppender(os.path.join(name,field+'.npy'),
+                sample_dtype[field]) for field in sample_dtype.names}
+            self.writer=Thread(target=self._run,name="readback log",
+                daemon=True)
+            self.writer.start()
+
+    def _code(self,kind,name):
+        # small integer standing for an instrument or quantity name
+        code=self.codes[kind].get(name)
+        if code is None:
+            code=len(self.names[kind])
+            self.names[kind].append(name)
+            self.codes[kind][name]=code
+            self.names_changed=True
+        return code
+
+    def record(self,instrument,quantity,value,channel=0,timestamp=None):
+        # add one sample, from any thread
+        if timestamp is None:
+            timestamp=time()
+        with self.lock:
+            self.ring[self.head%self.capacity]=(timestamp,
+                self._code('instrument',instrument),channel,
+                self._code('quantity',quantity),value)
+            self.head+=1
+            waiting=self.head-self.written
+        if waiting>=self.flush_every and self.writer is not None:
+            self.wake.set()
+
+    def record_status(self,instrument,status,timestamp=None):
+        # add every reading in a panel's status dict at once, with keys
+        # quantity or (quantity, channel), ie. {'Vmeas':5.0,'Imeas':0.5}
+        if timestamp is None:
+            timestamp=time()
+        for key,value in status.items():
+            if isinstance(key,tuple):
+                quantity,channel=key
+            else:
+                quantity,channel=key,0
+            self.record(instrument,quantity,value,channel,timestamp)
+
+    def latest(self,instrument,quantity,channel=0,seconds=None):
+        # (times, values) of one series still in the ring, oldest first,
+        # only the last seconds of it if given
+        with self.lock:
+            inst=self.codes['instrument'].get(instrument)
+            qty=self.codes['quantity'].get(quantity)
+            if inst is None or qty is None:
+                return np.empty(0),np.empty(0)
+            n=min(self.head,self.capacity)
+            start=self.head%self.capacity if self.head>self.capacity else 0
+            parts=[]
+            for part in (self.ring[start:n],self.ring[:start]):
+                sel=((part['instrument']==inst)&(part['quantity']==qty)&
+                    (part['channel']==channel))
+                parts.append(part[sel])
+        samples=np.concatenate(parts)
+        if seconds is not None and len(samples):
+            samples=samples[samples['time']>=samples['time'][-1]-seconds]
+        return samples['time'],samples['value']
+
+    def since(self,instrument,quantity,channel=0,index=0):
+        # (times, values, index) of one series' samples recorded after an
+        # earlier call that returned index (0 the first time), for readers
+        # that follow the log. samples already gone from the ring are
+        # skipped
+        with self.lock:
+            head=self.head
+            inst=self.codes['instrument'].get(instrument)
+            qty=self.codes['quantity'].get(quantity)
+            start=max(index,head-self.capacity)
+            if inst is None or qty is None or start>=head:
+                return np.empty(0),np.empty(0),head
+            first=start%self.capacity
+            last=head%self.capacity
+            if first<last:
+                parts=(self.ring[first:last],)
+            else:
+                parts=(self.ring[first:],self.ring[:last])
+            samples=np.concatenate([part[(part['instrument']==inst)&
+                (part['quantity']==qty)&(part['channel']==channel)]
+                for part in parts])
+        return samples['time'],samples['value'],head
+
+    def _take(self):
+        # copy out the samples not yet on disk, oldest first
+        with self.lock:
+            behind=self.head-self.written
+            if behind>self.capacity:
+                self.dropped+=behind-self.capacity
+                self.written=self.head-self.capacity
+            first=self.written%self.capacity
+            last=self.head%self.capacity
+            if self.head-self.written==0:
+                chunk=self.ring[:0].copy()
+            elif first<last:
+                chunk=self.ring[first:last].copy()
+            else:
+                chunk=np.concatenate((self.ring[first:],self.ring[:last]))
+            self.written=self.head
+            names=(json.dumps(self.names) if self.names_changed else None)
+            self.names_changed=False
+        return chunk,names
+
+    def flush(self):
+        # write everything recorded so far to disk
+        if self.name is None:
+            return
+        with self.write_lock:
+            chunk,names=self._take()
+            if names is not None:
+                with open(os.path.join(self.name,'names.json'),'w') as f:
+                    f.write(names)
+            if len(chunk):
+                for field,column in self.columns.items():
+                    column.extend(chunk[field])
+                    column.flush()
+
+    def _run(self):
+        # writer thread
+        while not self.stopping:
+            self.wake.wait(self.flush_interval)
+            self.wake.clear()
+            try:
+                self.flush()
+            except OSError as err:
+                print(("readback log {}: {}").format(self.name,err))
+
+    def close(self):
+        if self.writer is not None:
+            self.stopping=True
+            self.wake.set()
+            self.writer.join()
+            self.writer=None
+            self.flush()
+            for column in self.columns.values():
+                column.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self,*exc):
+        self.close()
+
+def load_readbacks(name):
+    # return (columns, names) for a directory written by ReadbackLog
+    # columns: dict of memory mapped arrays, one per field of sample_dtype
+    # names: {'instrument':[...],'quantity':[...]} the codes index into
+    #   cols,names=load_readbacks('run42')
+    #   sel=((cols['instrument']==names['instrument'].index('PSU 2'))&
+    #       (cols['quantity']==names['quantity'].index('Vmeas'))&
+    #       (cols['channel']==1))
+    #   t,v=cols['time'][sel],cols['value'][sel]
+    columns={field:np.load(os.path.join(name,field+'.npy'),mmap_mode='r')
+        for field in sample_dtype.names}
+    # a crash can leave one column a flush ahead
+    n=min(len(c) for c in columns.values())
+    columns={field:c[:n] for field,c in columns.items()}
+    with open(os.path.join(name,'names.json')) as f:
+        names=json.load(f)
+    return columns,names
@@ -2,21 +2,22 @@
 # 07/28/2021
 # adapted from scope_gui.py
 
-from PyQt5.QtChart import QChartView, QChart, QLineSeries, QSplineSeries, QValueAxis
-from PyQt5.QtCore import Qt, QSize, QTimer
+from PyQt5.QtChart import QChartView, QChart, QValueAxis
+from PyQt5.QtCore import Qt, QSize
 from PyQt5.QtGui import QPalette
 from PyQt5.QtWidgets import (QApplication, QComboBox, QDialog, QFrame,
     QGridLayout, QGroupBox, QHBoxLayout, QLabel, QLCDNumber, QLineEdit,
     QPushButton, QVBoxLayout, QWidget, QMessageBox)
 
 from dcps import SiglentSDS1202XE
+from acquisition import AcquisitionWorker
 
 from pyvisa.errors import VisaIOError
 from serial.serialutil import SerialException
 
-from time import sleep
 from datetime import datetime
-import pandas as pd
+from waveform_writer import WaveformWriter
+from waveform_display import newSeries, setPoints, decimate
 
 fname='test'
 
@@ -48,6 +49,19 @@ class Scope(QDialog):
         self.Siglent=SiglentSDS1202XE(str_)
         self.Siglent.chdr_off()
 
+        # straight lines between points, set True for spline smoothing
+        # (noticeably slower at thousands of points)
+        self.smooth=False
+        # how captures are thinned out to the chart width for display:
+        # 'minmax', 'lttb' or None to draw every point. saving always uses
+        # the full capture
+        self.decimation='minmax'
+
+        # settings as last reported by the acquisition thread, None until
+        # the first frame and status arrive
+        self.tdiv=self.sara=self.trdl=self.wasAcq=None
+        self.vdiv1=self.vdiv2=self.ofst1=self.ofst2=None
+
         self.scope_box=QGroupBox("Siglent Oscilloscope")
         self.scope_layout=QHBoxLayout()
         self.scope_box.setLayout(self.scope_layout)
@@ -72,15 +86,18 @@ class Scope(QDialog):
         except:
             pass"""
 
-        self.qTimer=QTimer()
-        self.qTimer.setInterval(1000)
-        self.qTimer.start()
-        self.qTimer.timeout.connect(self.check_acq)
-        self.qTimer.timeout.connect(self.check_vdiv)
-        self.qTimer.timeout.connect(self.check_ofst)
-        self.qTimer.timeout.connect(self.check_tdiv)
-        self.qTimer.timeout.connect(self.check_sara)
-        self.qTimer.timeout.connect(self.check_waveform)
+        # waveforms are captured on a separate thread, which owns the scope
+        # from here on. every call to self.Siglent goes through worker.call,
+        # and the displays are filled in from the frames and status it
+        # sends back
+        channels=[n for n,on in ((1,self.channel1),(2,self.channel2)) if on]
+        self.worker=AcquisitionWorker(self.Siglent,channels)
+        self.worker.frameReady.connect(self.on_frame)
+        self.worker.statusReady.connect(self.check_acq)
+        self.worker.statusReady.connect(self.check_trdl)
+        self.worker.error.connect(self.show_error)
+        self.worker.start()
+        self.worker.call(self.Siglent.waveformSetup,FP='0',NP='0',SP='1')
 
     def create_stats_box(self):
         self.stats_box=QGroupBox()
@@ -89,19 +106,10 @@ class Scope(QDialog):
 
         tdiv_label=QLabel("Time Division [s]")
         self.tdiv_disp=QLCDNumber()
-        self.tdiv=self.Siglent.query_tdiv()
-        sleep(0.001)
-        self.tdiv_disp.display(self.tdiv)
         sara_label=QLabel("Sampling Rate [s]")
         self.sara_disp=QLCDNumber()
-        self.sara=self.Siglent.query_sara()
-        sleep(0.001)
-        self.sara_disp.display(self.sara)
         trdl_label=QLabel("Trigger Delay [s]")
         self.trdl_disp=QLCDNumber()
-        self.trdl=self.Siglent.query_trdl()
-        sleep(0.001)
-        self.trdl_disp.display(self.trdl)
 
         self.tdivmenu=QComboBox()
         self.tdivmenu.addItem('1')
@@ -142,14 +150,11 @@ class Scope(QDialog):
         self.acq_button=QPushButton("Toggle Acquisition")
         self.acq_button.clicked.connect(self.toggle_acq)
 
-        self.wasAcq=self.Siglent.isAcq()
-        sleep(0.001)
-        if self.wasAcq:
-            self.acq_disp.setText("Running")
-            self.acq_disp.setStyleSheet("background:limegreen")
-        else:
-            self.acq_disp.setText("Stopped")
-            self.acq_disp.setStyleSheet("background:red")
+        self.acq_disp.setText("Waiting")
+
+        # the last capture or setting that failed on the acquisition thread
+        self.error_disp=QLabel()
+        self.error_disp.setWordWrap(True)
 
         self.stats_layout.addWidget(acq_label,0,0,1,2)
         self.stats_layout.addWidget(self.acq_disp,1,0,1,2)
@@ -169,16 +174,15 @@ class Scope(QDialog):
 
         self.create_wfsuBox()
         self.stats_layout.addWidget(self.wfsuBox,13,0,1,2)
+        self.stats_layout.addWidget(self.error_disp,14,0,1,2)
 
     def on_tdivbutton_clicked(self):
-        self.Siglent.set_tdiv(str(self.tdivmenu.currentText()),
-            str(self.tdivunit.currentText()))
-        sleep(0.001)
+        self.worker.call(self.Siglent.set_tdiv,
+            str(self.tdivmenu.currentText()),str(self.tdivunit.currentText()))
 
     def on_trdlbutton_clicked(self):
-        self.Siglent.set_trdl(float(self.trdledit.text()),
+        self.worker.call(self.Siglent.set_trdl,float(self.trdledit.text()),
             str(self.trdlunit.currentText()))
-        sleep(0.001)
 
     def create_wfsuBox(self):
         self.wfsuBox=QGroupBox("Waveform Setup")
@@ -187,23 +191,22 @@ class Scope(QDialog):
 
         self.FPedit=QLineEdit()
         self.FPbutton=QPushButton("Set First Point")
-        self.FPbutton.clicked.connect(lambda: self.Siglent.waveformSetup(
-            FP=self.FPedit.text()))
+        self.FPbutton.clicked.connect(lambda: self.worker.call(
+            self.Siglent.waveformSetup,FP=self.FPedit.text()))
 
         self.NPedit=QLineEdit()
         self.NPbutton=QPushButton("Set Number of Points")
-        self.NPbutton.clicked.connect(lambda: self.Siglent.waveformSetup(
-            NP=self.NPedit.text()))
+        self.NPbutton.clicked.connect(lambda: self.worker.call(
+            self.Siglent.waveformSetup,NP=self.NPedit.text()))
 
         self.SPedit=QLineEdit()
         self.SPbutton=QPushButton("Set Sparsing")
-        self.SPbutton.clicked.connect(lambda: self.Siglent.waveformSetup(
-            SP=self.SPedit.text()))
+        self.SPbutton.clicked.connect(lambda: self.worker.call(
+            self.Siglent.waveformSetup,SP=self.SPedit.text()))
 
         self.FPedit.setText('0')
         self.NPedit.setText('all')
         self.SPedit.setText('1')
-        self.Siglent.waveformSetup(FP='0',NP='0',SP='1')
 
         self.wfsuLayout.addWidget(self.FPedit)
         self.wfsuLayout.addWidget(self.FPbutton)
@@ -254,9 +257,6 @@ class Scope(QDialog):
         self.vdiv1box.setLayout(self.vdiv1layout)
 
         self.vdiv1disp=QLCDNumber()
-        self.vdiv1=self.Siglent.query_vdiv(1)
-        sleep(0.001)
-        self.vdiv1disp.display(self.vdiv1)
 
         self.vdiv1menu=QComboBox()
         self.vdiv1menu.addItem('500 \u03BCV')
@@ -287,9 +287,6 @@ class Scope(QDialog):
         self.vdiv2box.setLayout(self.vdiv2layout)
 
         self.vdiv2disp=QLCDNumber()
-        self.vdiv2=self.Siglent.query_vdiv(2)
-        sleep(0.001)
-        self.vdiv2disp.display(self.vdiv2)
 
         self.vdiv2menu=QComboBox()
         self.vdiv2menu.addItem('500 \u03BCV') # unicode mu
@@ -315,18 +312,12 @@ class Scope(QDialog):
         self.vdiv2layout.addWidget(self.vdiv2button,2,0,1,2)
 
     def on_vdiv1button_clicked(self):
-        try:
-            self.Siglent.set_vdiv(1,str(self.vdiv1menu.currentText()))
-            sleep(0.001)
-        except:
-            pass
+        self.worker.call(self.Siglent.set_vdiv,1,
+            str(self.vdiv1menu.currentText()))
 
     def on_vdiv2button_clicked(self):
-        try:
-            self.Siglent.set_vdiv(2,str(self.vdiv2menu.currentText()))
-            sleep(0.001)
-        except:
-            pass
+        self.worker.call(self.Siglent.set_vdiv,2,
+            str(self.vdiv2menu.currentText()))
 
     def create_ofst1box(self):
         self.ofst1box=QGroupBox("Voltage Offset [V]")
@@ -334,9 +325,6 @@ class Scope(QDialog):
         self.ofst1box.setLayout(self.ofst1layout)
 
         self.ofst1disp=QLCDNumber()
-        self.ofst1=self.Siglent.query_ofst(1)
-        sleep(0.001)
-        self.ofst1disp.display(self.ofst1)
         self.ofst1edit=QLineEdit()
 
         self.ofst1unit=QComboBox()
@@ -360,9 +348,6 @@ class Scope(QDialog):
         self.ofst2box.setLayout(self.ofst2layout)
 
         self.ofst2disp=QLCDNumber()
-        self.ofst2=self.Siglent.query_ofst(2)
-        sleep(0.001)
-        self.ofst2disp.display(self.ofst2)
         self.ofst2edit=QLineEdit()
 
         self.ofst2unit=QComboBox()
@@ -381,76 +366,42 @@ class Scope(QDialog):
         self.ofst2layout.addWidget(self.ofst2button,2,0,1,2)
 
     def on_ofst1button_clicked(self):
-        try:
-            self.Siglent.set_ofst(1,self.ofst1edit.text(),
-                str(self.ofst1unit.currentText()))
-            sleep(0.001)
-        except:
-            pass
+        self.worker.call(self.Siglent.set_ofst,1,self.ofst1edit.text(),
+            str(self.ofst1unit.currentText()))
 
     def on_ofst2button_clicked(self):
-        try:
-            self.Siglent.set_ofst(2,self.ofst2edit.text(),
-                str(self.ofst2unit.currentText()))
-            sleep(0.001)
-        except:
-            pass
+        self.worker.call(self.Siglent.set_ofst,2,self.ofst2edit.text(),
+            str(self.ofst2unit.currentText()))
 
     def on_save1button_clicked(self):
         reps=1000
-        v,t=self.Siglent.getWaveform(1)
-        df=pd.DataFrame(data=[v],columns=t)
-        wait(0.001)
-
-        for i in range(reps):
-            try:
-                v,t=self.Siglent.getWaveform(1)
-                df2=pd.DataFrame(data=[v],columns=t)
-                df=df.append(df2,ignore_index=True)
-                wait(0.001)
-            except:
-                pass
-
-        df=df.transpose()
-        wdir='/home/ctalab/data/CTA/testing/waveform/07_28_2021/'
-        df.to_csv(wdir+fname+'1.csv')
-        print('done')
+        # runs on the acquisition thread, captures are streamed to disk
+        self.worker.call(self.save_waveforms,1,reps+1)
 
 
     def on_save2button_clicked(self):
         reps=1000
-        v,t=self.Siglent.getWaveform(2)
-        df=pd.DataFrame(data=[v],columns=t)
-        wait(0.001)
-
-        for i in range(reps):
-            try:
-                v,t=self.Siglent.getWaveform(2)
-                df2=pd.DataFrame(data=[v],columns=t)
-                df=df.append(df2,ignore_index=True)
-                wait(0.001)
-            except:
-                pass
-
-        df=df.transpose()
+        # runs on the acquisition thread, captures are streamed to disk
+        self.worker.call(self.save_waveforms,2,reps+1)
+
+    def save_waveforms(self,channel,reps):
         wdir='/home/ctalab/data/CTA/testing/waveform/07_28_2021/'
-        df.to_csv(wdir+fname+'2.csv')
+        with WaveformWriter(wdir+fname+str(channel)) as writer:
+            self.Siglent.capture_stream(channel,reps,writer)
         print('done')
 
     def create_chart1(self):
         self.chart1=QChart()
 
-        v,t=self.Siglent.getWaveform(1)
-        sleep(0.001)
-        self.series1=QSplineSeries()
-        for i in range(len(v)):
-            self.series1.append(t[i],v[i])
+        # one series for the life of the chart, check_waveform replaces its
+        # points when a frame arrives
+        self.series1=newSeries(self.smooth)
 
         self.chart1.addSeries(self.series1)
         self.chart1.legend().hide()
 
+        # the axes' ranges are set by the first frame
         self.Xaxis1=QValueAxis()
-        self.Xaxis1.setRange(-6*self.tdiv,6*self.tdiv)
         self.Xaxis1.setTickCount(7)
         self.Xaxis1.setLabelFormat('%2.2g')
         self.Xaxis1.setMinorTickCount(1)
@@ -458,7 +409,6 @@ class Scope(QDialog):
         self.series1.attachAxis(self.Xaxis1)
 
         self.Yaxis1=QValueAxis()
-        self.Yaxis1.setRange(-4*self.vdiv1+self.ofst1,4*self.vdiv1+self.ofst1)
         self.Yaxis1.setTickCount(5)
         self.Yaxis1.setLabelFormat('%2.2g')
         self.Yaxis1.setMinorTickCount(1)
@@ -471,17 +421,15 @@ class Scope(QDialog):
     def create_chart2(self):
         self.chart2=QChart()
 
-        v,t=self.Siglent.getWaveform(2)
-        sleep(0.001)
-        self.series2=QSplineSeries()
-        for i in range(len(v)):
-            self.series2.append(t[i],v[i])
+        # one series for the life of the chart, check_waveform replaces its
+        # points when a frame arrives
+        self.series2=newSeries(self.smooth)
 
         self.chart2.addSeries(self.series2)
         self.chart2.legend().hide()
 
+        # the axes' ranges are set by the first frame
         self.Xaxis2=QValueAxis()
-        self.Xaxis2.setRange(-6*self.tdiv,6*self.tdiv)
         self.Xaxis2.setTickCount(7)
         self.Xaxis2.setMinorTickCount(1)
         self.Xaxis2.setLabelFormat('%2.2g')
@@ -489,7 +437,6 @@ class Scope(QDialog):
         self.series2.attachAxis(self.Xaxis2)
 
         self.Yaxis2=QValueAxis()
-        self.Yaxis2.setRange(-4*self.vdiv2+self.ofst2,4*self.vdiv2+self.ofst2)
         self.Yaxis2.setTickCount(5)
         self.Yaxis2.setMinorTickCount(1)
         self.Yaxis2.setLabelFormat('%2.2g')
@@ -499,150 +446,110 @@ class Scope(QDialog):
         self.chart2view=QChartView(self.chart2)
         self.chart2.resize(600,400)
 
-    def check_waveform(self):
-        if self.channel1:
-            try:
-                v,t=self.Siglent.getWaveform(1)
-                sleep(0.001)
-                self.series1new=QSplineSeries()
-                for i in range(len(v)):
-                    self.series1new.append(t[i],v[i])
-
-                if self.series1new != self.series1:
-                    self.chart1.removeSeries(self.series1)
-                    self.series1=self.series1new
-                    self.chart1.addSeries(self.series1)
-                    self.series1.attachAxis(self.Xaxis1)
-                    self.series1.attachAxis(self.Yaxis1)
-            except:
-                pass
-
-        if self.channel2:
-            try:
-                v,t=self.Siglent.getWaveform(2)
-                sleep(0.001)
-                self.series2new=QSplineSeries()
-                for i in range(len(v)):
-                    self.series2new.append(t[i],v[i])
-
-                if self.series2new != self.series2:
-                    self.chart2.removeSeries(self.series2)
-                    self.series2=self.series2new
-                    self.chart2.addSeries(self.series2)
-                    self.series2.attachAxis(self.Xaxis2)
-                    self.series2.attachAxis(self.Yaxis2)
-            except:
-                pass
+    def on_frame(self,channel):
+        # a new frame is waiting on the acquisition thread
+        frame=self.worker.takeFrame(channel)
+        if frame is None:
+            return
+        # the frame carries the settings it was taken with, so these no
+        # longer have to ask the scope
+        self.check_vdiv(frame)
+        self.check_ofst(frame)
+        self.check_tdiv(frame)
+        self.check_sara(frame)
+        self.check_waveform(frame)
+
+    def check_waveform(self,frame):
+        if frame.channel==1:
+            chart,series=self.chart1,self.series1
+        else:
+            chart,series=self.chart2,self.series2
+        # a few points per pixel column, however deep the capture is
+        width=max(int(chart.plotArea().width()),100)
+        t,v=decimate(frame.times,frame.volts,width,self.decimation)
+        setPoints(series,t,v)
 
     def toggle_acq(self):
-        try:
-            if self.Siglent.isAcq():
-                sleep(0.001)
-                self.Siglent.stopAcq()
+        # uses the last state reported by the acquisition thread, starts
+        # it if none has been yet
+        if self.wasAcq:
+            self.worker.call(self.Siglent.stopAcq)
+        else:
+            self.worker.call(self.Siglent.startAcq)
+
+    def check_acq(self,status):
+        if self.wasAcq != status['acq']:
+            self.wasAcq=status['acq']
+            if self.wasAcq:
+                self.acq_disp.setText("Running")
+                self.acq_disp.setStyleSheet("background:limegreen")
             else:
-                sleep(0.001)
-                self.Siglent.startAcq()
-            sleep(0.001)
-        except:
-            pass
-
-    def check_acq(self):
-        try:
-            if self.wasAcq != self.Siglent.isAcq():
-                sleep(0.001)
-                self.wasAcq=self.Siglent.isAcq()
-                if self.wasAcq:
-                    self.acq_disp.setText("Running")
-                    self.acq_disp.setStyleSheet("background:limegreen")
-                else:
-                    self.acq_disp.setText("Stopped")
-                    self.acq_disp.setStyleSheet("background:red")
-            sleep(0.001)
-        except:
-            pass
-
-    def check_vdiv(self):
-        if self.channel1:
-            try:
-                if self.vdiv1 != self.Siglent.query_vdiv(1):
-                    sleep(0.001)
-                    self.vdiv1 = self.Siglent.query_vdiv(1)
-                    self.vdiv1disp.display(self.vdiv1)
-                    self.Yaxis1.setRange(-4*self.vdiv1+self.ofst1,
-                        4*self.vdiv1+self.ofst1)
-                sleep(0.001)
-            except:
-                pass
-
-        if self.channel2:
-            try:
-                if self.vdiv2 != self.Siglent.query_vdiv(2):
-                    sleep(0.001)
-                    self.vdiv2 = self.Siglent.query_vdiv(2)
-                    self.vdiv2disp.display(self.vdiv2)
-                    self.Yaxis2.setRange(-4*self.vdiv2+self.ofst2,
-                        4*self.vdiv2+self.ofst2)
-                sleep(0.001)
-            except:
-                pass
-
-    def check_ofst(self):
-        if self.channel1:
-            try:
-                if self.ofst1 != self.Siglent.query_ofst(1):
-                    sleep(0.001)
-                    self.ofst1 = self.Siglent.query_ofst(1)
-                    self.ofst1disp.display(self.ofst1)
-                    self.Yaxis1.setRange(-4*self.vdiv1+self.ofst1,
-                        4*self.vdiv1+self.ofst1)
-                sleep(0.001)
-            except:
-                pass
-
-        if self.channel2:
-            try:
-                if self.ofst2 != self.Siglent.query_ofst(2):
-                    sleep(0.001)
-                    self.ofst2 = self.Siglent.query_ofst(2)
-                    self.ofst2disp.display(self.ofst2)
-                    self.Yaxis2.setRange(-4*self.vdiv2+self.ofst2,
-                        4*self.vdiv2+self.ofst2)
-                sleep(0.001)
-            except:
-                pass
-
-    def check_tdiv(self):
-        try:
-            if self.tdiv != self.Siglent.query_tdiv():
-                sleep(0.001)
-                self.tdiv = self.Siglent.query_tdiv()
-                self.tdiv_disp.display(self.tdiv)
-                if self.channel1:
-                    self.Xaxis1.setRange(-6*self.tdiv,6*self.tdiv)
-                    self.series1.attachAxis(self.Xaxis1)
-                if self.channel2:
-                    self.Xaxis2.setRange(-6*self.tdiv,6*self.tdiv)
-                    self.series2.attachAxis(self.Xaxis2)
-            sleep(0.001)
-        except:
-            pass
-
-    def check_sara(self):
-        try:
-            if self.sara != self.Siglent.query_sara():
-                sleep(0.001)
-                self.sara = self.Siglent.query_sara()
-                self.sara_disp.display(self.sara)
-            sleep(0.001)
-        except:
-            pass
-
-    def check_trdl(self):
-        try:
-            if self.trdl != self.Siglent.query_trdl():
-                sleep(0.001)
-                self.trdl=self.Siglent.query_trdl()
-                self.trdl_disp.display(self.trdl)
-            sleep(0.001)
-        except:
-            pass
+                self.acq_disp.setText("Stopped")
+                self.acq_disp.setStyleSheet("background:red")
+
+    def check_vdiv(self,frame):
+        if frame.channel==1:
+            if self.vdiv1 != frame.vdiv:
+                self.vdiv1 = frame.vdiv
+                self.vdiv1disp.display(self.vdiv1)
+                self.set_yrange(1)
+
+        if frame.channel==2:
+            if self.vdiv2 != frame.vdiv:
+                self.vdiv2 = frame.vdiv
+                self.vdiv2disp.display(self.vdiv2)
+                self.set_yrange(2)
+
+    def check_ofst(self,frame):
+        if frame.channel==1:
+            if self.ofst1 != frame.ofst:
+                self.ofst1 = frame.ofst
+                self.ofst1disp.display(self.ofst1)
+                self.set_yrange(1)
+
+        if frame.channel==2:
+            if self.ofst2 != frame.ofst:
+                self.ofst2 = frame.ofst
+                self.ofst2disp.display(self.ofst2)
+                self.set_yrange(2)
+
+    def set_yrange(self,channel):
+        # +-4 divisions around the offset, once both are known
+        if channel==1:
+            vdiv,ofst,axis=self.vdiv1,self.ofst1,self.Yaxis1
+        else:
+            vdiv,ofst,axis=self.vdiv2,self.ofst2,self.Yaxis2
+        if vdiv is not None and ofst is not None:
+            axis.setRange(-4*vdiv+ofst,4*vdiv+ofst)
+
+    def check_tdiv(self,frame):
+        if self.tdiv != frame.tdiv:
+            self.tdiv = frame.tdiv
+            self.tdiv_disp.display(self.tdiv)
+            if self.channel1:
+                self.Xaxis1.setRange(-6*self.tdiv,6*self.tdiv)
+            if self.channel2:
+                self.Xaxis2.setRange(-6*self.tdiv,6*self.tdiv)
+
+    def check_sara(self,frame):
+        if self.sara != frame.sara:
+            self.sara = frame.sara
+            self.sara_disp.display(self.sara)
+
+    def check_trdl(self,status):
+        if self.trdl != status['trdl']:
+            self.trdl=status['trdl']
+            self.trdl_disp.display(self.trdl)
+
+    def show_error(self,text):
+        # a capture or worker.call failed on the acquisition thread. shown
+        # in the panel rather than in a message box, a capture that fails
+        # keeps failing every cycle
+        print(text)
+        self.error_disp.setText(text)
+        self.error_disp.setStyleSheet("color:red")
+
+    def close_scope(self):
+        # stop the acquisition thread before closing the connection
+        self.worker.stop()
+        self.Siglent.close_inst()
@@ -24,13 +24,16 @@ if you want to save a waveform but it's not working from the GUI, run
 """
 
 
-from PyQt5.QtChart import QChartView,QChart,QLineSeries,QSplineSeries,QValueAxis
-from PyQt5.QtCore import Qt, QSize, QTimer
+from PyQt5.QtChart import QChartView,QChart,QValueAxis
+from PyQt5.QtCore import Qt, QSize
 from PyQt5.QtGui import QPalette
 from PyQt5.QtWidgets import (QApplication, QComboBox, QDialog, QFrame,
     QGridLayout, QGroupBox, QHBoxLayout, QLabel, QLCDNumber, QLineEdit,
     QPushButton, QVBoxLayout, QWidget, QMessageBox)
-import visa
+from dcps import SiglentSDS1202XE
+from acquisition import AcquisitionWorker
+from waveform_writer import WaveformWriter
+from waveform_display import newSeries, setPoints, decimate
 import math
 
 import sys
@@ -40,10 +43,8 @@ import struct
 import functools
 
 from datetime import datetime
-from time import sleep
 import numpy as np
 
-import pandas as pd
 
 chr = functools.partial(struct.pack,'B')
 windows_system = False
@@ -55,18 +56,19 @@ class WidgetGallery(QDialog):
         super(WidgetGallery, self).__init__(parent)
 
         self.wait=0.5
+        # straight lines between points, set True for spline smoothing
+        # (noticeably slower at thousands of points)
+        self.smooth=False
+        # how captures are thinned out to the chart width for display:
+        # 'minmax', 'lttb' or None to draw every point. saving always uses
+        # the full capture
+        self.decimation='minmax'
+        # settings as last reported by the acquisition thread, None until
+        # the first frame and status arrive
+        self.tdiv=self.sara=self.trdl=self.wasAcq=None
+        self.vdiv1=self.vdiv2=self.ofst1=self.ofst2=None
         self.open_siglent('USB0::62701::60986::SDS1ECDD2R8216::0::INSTR')
 
-        self.qTimer=QTimer()
-        self.qTimer.setInterval(1000)
-        self.qTimer.start()
-        self.qTimer.timeout.connect(self.check_acq)
-        self.qTimer.timeout.connect(self.check_vdiv)
-        self.qTimer.timeout.connect(self.check_ofst)
-        self.qTimer.timeout.connect(self.check_tdiv)
-        self.qTimer.timeout.connect(self.check_sara)
-        self.qTimer.timeout.connect(self.check_waveform)
-
         mainLayout=QGridLayout()
 
         self.create_scope_box()
@@ -74,6 +76,17 @@ class WidgetGallery(QDialog):
 
         self.setLayout(mainLayout)
 
+        # waveforms are captured on a separate thread which owns the scope,
+        # the displays are updated from the frames it sends back
+        channels=[n for n,on in ((1,self.channel1),(2,self.channel2)) if on]
+        self.worker.setChannels(channels)
+        self.worker.frameReady.connect(self.on_frame)
+        self.worker.statusReady.connect(self.check_acq)
+        self.worker.statusReady.connect(self.check_trdl)
+        self.worker.error.connect(self.show_error)
+        self.worker.start()
+        self.waveformSetup(FP='0',NP='0',SP='1')
+
     def create_scope_box(self):
         self.scope_box=QGroupBox("Siglent Oscilloscope")
         self.scope_layout=QHBoxLayout()
@@ -105,16 +118,10 @@ class WidgetGallery(QDialog):
 
         tdiv_label=QLabel("Time Division [s]")
         self.tdiv_disp=QLCDNumber()
-        self.tdiv=self.query_tdiv()
-        self.tdiv_disp.display(self.tdiv)
         sara_label=QLabel("Sampling Rate [s]")
         self.sara_disp=QLCDNumber()
-        self.sara=self.query_sara()
-        self.sara_disp.display(self.sara)
         trdl_label=QLabel("Trigger Delay [s]")
         self.trdl_disp=QLCDNumber()
-        self.trdl=self.query_trdl()
-        self.trdl_disp.display(self.trdl)
 
         self.tdivmenu=QComboBox()
         self.tdivmenu.addItem('1')
@@ -155,17 +162,11 @@ class WidgetGallery(QDialog):
         self.acq_button=QPushButton("Toggle Acquisition")
         self.acq_button.clicked.connect(self.toggle_acq)
 
-        try:
-            self.wasAcq=self.isAcq()
-        except:
-            self.wasAcq=True
+        self.acq_disp.setText("Waiting")
 
-        if self.wasAcq:
-            self.acq_disp.setText("Running")
-            self.acq_disp.setStyleSheet("background:limegreen")
-        else:
-            self.acq_disp.setText("Stopped")
-            self.acq_disp.setStyleSheet("background:red")
+        # the last capture or setting that failed on the acquisition thread
+        self.error_disp=QLabel()
+        self.error_disp.setWordWrap(True)
 
         self.stats_layout.addWidget(acq_label,0,0,1,2)
         self.stats_layout.addWidget(self.acq_disp,1,0,1,2)
@@ -185,6 +186,7 @@ class WidgetGallery(QDialog):
 
         self.create_wfsuBox()
         self.stats_layout.addWidget(self.wfsuBox,13,0,1,2)
+        self.stats_layout.addWidget(self.error_disp,14,0,1,2)
 
     def on_tdivbutton_clicked(self):
         try:
@@ -223,7 +225,6 @@ class WidgetGallery(QDialog):
         self.FPedit.setText('0')
         self.NPedit.setText('all')
         self.SPedit.setText('1')
-        self.waveformSetup(FP='0',NP='0',SP='1')
 
         self.wfsuLayout.addWidget(self.FPedit)
         self.wfsuLayout.addWidget(self.FPbutton)
@@ -274,11 +275,6 @@ class WidgetGallery(QDialog):
         self.vdiv1box.setLayout(self.vdiv1layout)
 
         self.vdiv1disp=QLCDNumber()
-        try:
-            self.vdiv1=self.query_vdiv(1)
-        except:
-            self.vdiv1=1
-        self.vdiv1disp.display(self.vdiv1)
 
         self.vdiv1menu=QComboBox()
         self.vdiv1menu.addItem('500 \u03BCV')
@@ -309,11 +305,6 @@ class WidgetGallery(QDialog):
         self.vdiv2box.setLayout(self.vdiv2layout)
 
         self.vdiv2disp=QLCDNumber()
-        try:
-            self.vdiv2=self.query_vdiv(2)
-        except:
-            self.vdiv2=1
-        self.vdiv2disp.display(self.vdiv2)
 
         self.vdiv2menu=QComboBox()
         self.vdiv2menu.addItem('500 \u03BCV') # unicode mu
@@ -356,11 +347,6 @@ class WidgetGallery(QDialog):
         self.ofst1box.setLayout(self.ofst1layout)
 
         self.ofst1disp=QLCDNumber()
-        try:
-            self.ofst1=self.query_ofst(1)
-        except:
-            self.ofst1=0
-        self.ofst1disp.display(self.ofst1)
         self.ofst1edit=QLineEdit()
 
         self.ofst1unit=QComboBox()
@@ -384,11 +370,6 @@ class WidgetGallery(QDialog):
         self.ofst2box.setLayout(self.ofst2layout)
 
         self.ofst2disp=QLCDNumber()
-        try:
-            self.ofst2=self.query_ofst(2)
-        except:
-            self.ofst2=0
-        self.ofst2disp.display(self.ofst2)
         self.ofst2edit=QLineEdit()
 
         self.ofst2unit=QComboBox()
@@ -421,60 +402,35 @@ class WidgetGallery(QDialog):
             pass
 
     def wf_to_list(self,channel):
-        wf=self.getWaveform(channel).pointsVector()
-        v=[]
-        t=[]
-        for i in range(len(wf)):
-            point=wf[i]
-            t.append(float(point.x()))
-            v.append(float(point.y()))
-        return t,v
+        frame=self.worker.latestFrame(channel)
+        return frame.times.tolist(),frame.volts.tolist()
 
-    def on_save1button_clicked(self):
-        reps=1000
-        t,v=self.wf_to_list(1)
-        df=pd.DataFrame(data=[v],columns=t)
-        wait(0.001)
-
-        for i in range(reps):
-            t,v=self.wf_to_list(1)
-            df2=pd.DataFrame(data=[v],columns=t)
-            df=df.append(df2,ignore_index=True)
-            wait(0.001)
-
-        df=df.transpose()
+    def save_waveforms(self,channel,reps):
         wdir='/home/ctalab/data/CTA/testing/waveform/07_28_2021/'
-        df.to_csv(wdir+fname+'1.csv')
+        with WaveformWriter(wdir+fname+str(channel)) as writer:
+            self.scope.capture_stream(channel,reps,writer)
         print('done')
 
-    def on_save2button_clicked(self):
+    def on_save1button_clicked(self):
         reps=1000
-        t,v=self.wf_to_list(2)
-        df=pd.DataFrame(data=[v],columns=t)
-        wait(0.001)
-
-        for i in range(reps):
-            t,v=self.wf_to_list(2)
-            df2=pd.DataFrame(data=[v],columns=t)
-            df=df.append(df2,ignore_index=True)
-            wait(0.001)
+        # runs on the acquisition thread, captures are streamed to disk
+        self.worker.call(self.save_waveforms,1,reps+1)
 
-        df=df.transpose()
-        wdir='/home/ctalab/data/CTA/testing/waveform/07_28_2021/'
-        df.to_csv(wdir+fname+'2.csv')
-        print('done')
+    def on_save2button_clicked(self):
+        reps=1000
+        # runs on the acquisition thread, captures are streamed to disk
+        self.worker.call(self.save_waveforms,2,reps+1)
 
     def create_chart1(self):
         self.chart1=QChart()
-        try:
-            self.series1=self.getWaveform(1)
-        except:
-            self.series1=QSplineSeries()
+        # one series for the life of the chart, check_waveform replaces its
+        # points when a frame arrives
+        self.series1=newSeries(self.smooth)
         self.chart1.addSeries(self.series1)
         self.chart1.legend().hide()
 
+        # the axes' ranges are set by the first frame
         self.Xaxis1=QValueAxis()
-        self.Xaxis1.setRange(-6*self.tdiv,6*self.tdiv)
         self.Xaxis1.setTickCount(7)
         self.Xaxis1.setLabelFormat('%2.2g')
         self.Xaxis1.setMinorTickCount(1)
@@ -482,7 +438,6 @@ class WidgetGallery(QDialog):
         self.series1.attachAxis(self.Xaxis1)
 
         self.Yaxis1=QValueAxis()
-        self.Yaxis1.setRange(-4*self.vdiv1+self.ofst1,4*self.vdiv1+self.ofst1)
         self.Yaxis1.setTickCount(5)
         self.Yaxis1.setLabelFormat('%2.2g')
         self.Yaxis1.setMinorTickCount(1)
@@ -494,15 +449,14 @@ class WidgetGallery(QDialog):
 
     def create_chart2(self):
         self.chart2=QChart()
-        try:
-            self.series2=self.getWaveform(2)
-        except:
-            self.series2=QSplineSeries()
+        # one series for the life of the chart, check_waveform replaces its
+        # points when a frame arrives
+        self.series2=newSeries(self.smooth)
         self.chart2.addSeries(self.series2)
         self.chart2.legend().hide()
 
+        # the axes' ranges are set by the first frame
         self.Xaxis2=QValueAxis()
-        self.Xaxis2.setRange(-6*self.tdiv,6*self.tdiv)
         self.Xaxis2.setTickCount(7)
         self.Xaxis2.setMinorTickCount(1)
         self.Xaxis2.setLabelFormat('%2.2g')
@@ -510,7 +464,6 @@ class WidgetGallery(QDialog):
         self.series2.attachAxis(self.Xaxis2)
 
         self.Yaxis2=QValueAxis()
-        self.Yaxis2.setRange(-4*self.vdiv2+self.ofst2,4*self.vdiv2+self.ofst2)
         self.Yaxis2.setTickCount(5)
         self.Yaxis2.setMinorTickCount(1)
         self.Yaxis2.setLabelFormat('%2.2g')
@@ -520,39 +473,42 @@ class WidgetGallery(QDialog):
         self.chart2view=QChartView(self.chart2)
         self.chart2.resize(600,400)
 
-    def check_waveform(self):
+    def on_frame(self,channel):
+        # a new frame is waiting on the acquisition thread
+        frame=self.worker.takeFrame(channel)
+        if frame is None:
+            return
+        # the frame carries the settings it was taken with
+        self.check_vdiv(frame)
+        self.check_ofst(frame)
+        self.check_tdiv(frame)
+        self.check_sara(frame)
+        self.check_waveform(frame)
+
+    def check_waveform(self,frame):
         try:
-            if self.channel1:
-                if self.getWaveform(1) != self.series1:
-                    self.chart1.removeSeries(self.series1)
-                    self.series1=self.getWaveform(1)
-                    self.chart1.addSeries(self.series1)
-                    self.series1.attachAxis(self.Xaxis1)
-                    self.series1.attachAxis(self.Yaxis1)
-
-            if self.channel2:
-                if self.getWaveform(2) != self.series2:
-                    self.chart2.removeSeries(self.series2)
-                    self.series2=self.getWaveform(2)
-                    self.chart2.addSeries(self.series2)
-                    self.series2.attachAxis(self.Xaxis2)
-                    self.series2.attachAxis(self.Yaxis2)
+            if frame.channel==1:
+                self.getWaveform(frame,self.series1,self.chart1)
+
+            if frame.channel==2:
+                self.getWaveform(frame,self.series2,self.chart2)
         except:
             pass
 
     def toggle_acq(self):
+        # uses the last state reported by the acquisition thread
         try:
-            if self.isAcq():
+            if self.wasAcq:
                 self.stopAcq()
             else:
                 self.startAcq()
         except:
             pass
 
-    def check_acq(self):
+    def check_acq(self,status):
         try:
-            if self.wasAcq != self.isAcq():
-                self.wasAcq=self.isAcq()
+            if self.wasAcq != status['acq']:
+                self.wasAcq=status['acq']
                 if self.wasAcq:
                     self.acq_disp.setText("Running")
                     self.acq_disp.setStyleSheet("background:limegreen")
@@ -562,266 +518,153 @@ class WidgetGallery(QDialog):
         except:
             pass
 
-    def check_vdiv(self):
+    def check_vdiv(self,frame):
         try:
-            if self.channel1:
-                if self.vdiv1 != self.query_vdiv(1):
-                    self.vdiv1 = self.query_vdiv(1)
+            if frame.channel==1:
+                if self.vdiv1 != frame.vdiv:
+                    self.vdiv1 = frame.vdiv
                     self.vdiv1disp.display(self.vdiv1)
-                    self.Yaxis1.setRange(-4*self.vdiv1+self.ofst1,
-                        4*self.vdiv1+self.ofst1)
+                    self.set_yrange(1)
 
-            if self.channel2:
-                if self.vdiv2 != self.query_vdiv(2):
-                    self.vdiv2 = self.query_vdiv(2)
+            if frame.channel==2:
+                if self.vdiv2 != frame.vdiv:
+                    self.vdiv2 = frame.vdiv
                     self.vdiv2disp.display(self.vdiv2)
-                    self.Yaxis2.setRange(-4*self.vdiv2+self.ofst2,
-                        4*self.vdiv2+self.ofst2)
+                    self.set_yrange(2)
         except:
             pass
 
-    def check_ofst(self):
+    def check_ofst(self,frame):
         try:
-            if self.channel1:
-                if self.ofst1 != self.query_ofst(1):
-                    self.ofst1 = self.query_ofst(1)
+            if frame.channel==1:
+                if self.ofst1 != frame.ofst:
+                    self.ofst1 = frame.ofst
                     self.ofst1disp.display(self.ofst1)
-                    self.Yaxis1.setRange(-4*self.vdiv1+self.ofst1,
-                        4*self.vdiv1+self.ofst1)
+                    self.set_yrange(1)
 
-            if self.channel2:
-                if self.ofst2 != self.query_ofst(2):
-                    self.ofst2 = self.query_ofst(2)
+            if frame.channel==2:
+                if self.ofst2 != frame.ofst:
+                    self.ofst2 = frame.ofst
                     self.ofst2disp.display(self.ofst2)
-                    self.Yaxis2.setRange(-4*self.vdiv2+self.ofst2,
-                        4*self.vdiv2+self.ofst2)
+                    self.set_yrange(2)
         except:
             pass
 
-    def check_tdiv(self):
+    def set_yrange(self,channel):
+        # +-4 divisions around the offset, once both are known
+        if channel==1:
+            vdiv,ofst,axis=self.vdiv1,self.ofst1,self.Yaxis1
+        else:
+            vdiv,ofst,axis=self.vdiv2,self.ofst2,self.Yaxis2
+        if vdiv is not None and ofst is not None:
+            axis.setRange(-4*vdiv+ofst,4*vdiv+ofst)
+
+    def check_tdiv(self,frame):
         try:
-            if self.tdiv != self.query_tdiv():
-                self.tdiv = self.query_tdiv()
+            if self.tdiv != frame.tdiv:
+                self.tdiv = frame.tdiv
                 self.tdiv_disp.display(self.tdiv)
                 if self.channel1:
                     self.Xaxis1.setRange(-6*self.tdiv,6*self.tdiv)
-                    self.series1.attachAxis(self.Xaxis1)
                 if self.channel2:
                     self.Xaxis2.setRange(-6*self.tdiv,6*self.tdiv)
-                    self.series2.attachAxis(self.Xaxis2)
         except:
             pass
 
-    def check_sara(self):
+    def check_sara(self,frame):
         try:
-            if self.sara != self.query_sara():
-                self.sara = self.query_sara()
+            if self.sara != frame.sara:
+                self.sara = frame.sara
                 self.sara_disp.display(self.sara)
         except:
             pass
 
-    def check_trdl(self):
+    def check_trdl(self,status):
         try:
-            if self.trdl != self.query_trdl():
-                self.trdl=self.query_trdl()
+            if self.trdl != status['trdl']:
+                self.trdl=status['trdl']
                 self.trdl_disp.display(self.trdl)
         except:
             pass
 
+    def show_error(self,text):
+        # a capture or a call failed on the acquisition thread. shown in
+        # the panel rather than in a message box, a capture that fails
+        # keeps failing every cycle
+        print(text)
+        self.error_disp.setText(text)
+        self.error_disp.setStyleSheet("color:red")
+
     ## reading/writing functions
+    # the scope belongs to the acquisition thread once it is running, so
+    # anything that changes a setting is sent there with worker.call, and
+    # the queries return what it last reported in a frame or status
     def open_siglent(self, path, wait=None):
-        rm=visa.ResourceManager()
-        self.Siglent=rm.open_resource(path)
-
-        self.Siglent.write("CHDR OFF") # format responses
-        self.Siglent.timeout=30000 # 30 seconds, default is 2, not long enough
-        self.Siglent.chunk_size=20*1024**2 # 20 MB, default is 20 KB, too small
-
-        try:
-            if self.Siglent.query("MSIZ?") != "14M\n":
-                self.Siglent.write("MSIZ 14M")
-        except:
-            pass
-
         if wait is None:
             wait=self.wait
 
-        sleep(wait)
+        self.scope=SiglentSDS1202XE(path,wait=wait) # CHDR OFF and MSIZ 14M
+        self.worker=AcquisitionWorker(self.scope)
 
     def query_ofst(self,channel):
-        ret=self.Siglent.query(("C{}:OFST?").format(channel))
-        return float(ret)
+        return self.ofst1 if channel==1 else self.ofst2
 
     def query_vdiv(self,channel):
-        ret=self.Siglent.query(("C{}:VDIV?").format(channel))
-        return float(ret)
+        return self.vdiv1 if channel==1 else self.vdiv2
 
     def query_tdiv(self):
-        ret=self.Siglent.query("TDIV?")
-        return float(ret)
+        return self.tdiv
 
     def query_sara(self):
-        ret=self.Siglent.query("SARA?")
-        return float(ret)
+        return self.sara
 
     def query_trdl(self):
-        ret=self.Siglent.query("TRDL?")
-        return float(ret)
+        return self.trdl
 
     def set_vdiv(self,channel,vdiv,wait=None):
-        # possible VDIV:
-        # 500 UV (micro)
-        # 1,2,5,10,20,50,100,200,500 MV
-        # 1,2,5,10 V
-        if vdiv=="500 \u03BCV":
-            vdiv="500UV" # change unicode mu to letter u
-        vdiv.replace(' ','') # get rid of space in '10 mV'
-        vdiv=vdiv.upper() # set unit uppercase
-        self.Siglent.write(("C{}:VDIV {}").format(channel,vdiv))
-        if wait is None:
-            wait=self.wait
-        sleep(wait)
+        self.worker.call(self.scope.set_vdiv,channel,vdiv,wait)
 
     def set_ofst(self,channel,ofst,unit,wait=None):
-        # can be anything in UV/MV/V ?
-        if unit=="\u03BCV":
-            unit="UV" # change unicode mu to letter u
-        unit=unit.upper() # set unit uppercase
-        self.Siglent.write(("C{}:OFST {}{}").format(channel,ofst,unit))
-        if wait is None:
-            wait=self.wait
-        sleep(wait)
+        self.worker.call(self.scope.set_ofst,channel,ofst,unit,wait)
 
     def set_tdiv(self,tdiv,unit,wait=None):
-        # possible TDIV:
-        # 1,2,5,10,20,50,100,200,500 NS
-        # 1,2,5,10,20,50,100,200,500 US (micro)
-        # 1,2,5,10,20,50,100,200,500 MS
-        # 1,2,5,10,20,50,100 S
-        if unit=="\u03BCs":
-            unit="US" # change unicode mu to letter u
-        elif (unit=='s') and ((tdiv=='200') or (tdiv=='500')):
-            tdiv='100' # can't set tdiv to 200 or 500 S, so set to max (100 S)
-        unit=unit.upper() # set unit uppercase
-        self.Siglent.write(("TDIV {}{}").format(tdiv,unit))
-        if wait is None:
-            wait=self.wait
-        sleep(wait)
+        self.worker.call(self.scope.set_tdiv,tdiv,unit,wait)
 
     def set_trdl(self,trdl,unit,wait=None):
-        if unit=='ns':
-            mult=10**-9
-        elif unit=='\u03BCs':
-            mult=10**-6
-            unit="US"
-        elif unit=='ms':
-            mult=10**-3
-        else:
-            mult=1
-
-        if (trdl*mult)<=(self.tdiv*10):
-            unit=unit.upper()
-            self.Siglent.write(("TRDL {}{}").format(trdl,unit))
-            if wait is None:
-                wait=self.wait
-            sleep(wait)
-
-    def getWaveform(self,channel):
-        self.Siglent.write(("C{}:WF? DAT2").format(channel))
-        ret=list(self.Siglent.read_raw())[15:]
-        ret.pop() # remove last two items (message end bits)
-        ret.pop()
-        ret.pop(0)
-        vdiv=self.query_vdiv(channel)
-        ofst=self.query_ofst(channel)
-
-        vlist=[]
-
-        for v in ret:
-            if v>127:
-                v=v-255
-            v=(v/25*vdiv-ofst)
-            vlist.append(v)
-
-        points=QSplineSeries()
-
-        tdiv=self.tdiv
-        sara=self.sara
-
-        for i in range(len(vlist)):
-            t=-tdiv*7+i/sara
-            points.append(t,vlist[i])
-
-        return points
+        self.worker.call(self.scope.set_trdl,trdl,unit,wait)
 
+    def getWaveform(self,frame,series,chart):
+        # load an acquisition frame into a chart series in one replace(),
+        # decimated to a few points per pixel column of the chart
+        width=max(int(chart.plotArea().width()),100)
+        t,v=decimate(frame.times,frame.volts,width,self.decimation)
+        setPoints(series,t,v)
+        return series
 
     def waveformSetup(self, FP=None, NP=None, SP=None, wait=None):
-        #FP: First point
-        # address of first data point to be sent
-        # index starts at 0
-        #NP: Number of points
-        # how many points should be transmitted
-        # 0: send all
-        # 1: send 1
-        # 500: send <= 500
-        #SP: Sparsing
-        # interval between data points
-        # 0: send all
-        # 1: send all
-        # 2: send every other
-        # 5: send every 5th
-
-        if FP is None:
-            FP=self.querySetup()[0]
-        if NP is None:
-            NP=self.querySetup()[1]
-        elif NP.lower()=='all':
-            NP='0'
-        if SP is None:
-            SP=self.querySetup()[2]
-
-        self.Siglent.write(("WFSU? FP,{},NP,{},SP,{}").format(FP,NP,SP))
-        # default: FP=0,NP=1000,SP=4
-        if wait is None:
-            wait=self.wait
-        sleep(wait)
+        self.worker.call(self.scope.waveformSetup,FP,NP,SP,wait)
 
     def querySetup(self):
-        ret=self.Siglent.query("WFSU?")
-        ret=ret.strip("'")
-        lst=ret.split(',')
-        return [float(lst[1]),float(lst[3]),float(lst[5])]
-        # format: [FP,NP,SP]
+        # printed from the acquisition thread, there is no snapshot of it
+        self.worker.call(lambda: print(self.scope.querySetup()))
 
     def startAcq(self,wait=None):
-        self.Siglent.write("TRMD AUTO")
-        if wait is None:
-            wait=self.wait
-        sleep(wait)
+        self.worker.call(self.scope.startAcq,wait)
 
     def stopAcq(self,wait=None):
-        self.Siglent.write("STOP")
-        if wait is None:
-            wait=self.wait
-        sleep(wait)
+        self.worker.call(self.scope.stopAcq,wait)
 
     def isAcq(self):
-        ret=self.Siglent.query("TRMD?")
-        if ret=="STOP\n":
-            return False
-        else:
-            return True
+        return self.wasAcq
 
     def closeEvent(self,event):
-        self.Siglent.close()
+        self.worker.stop()
+        self.scope.close_inst()
         event.accept()
 
     def wf_to_array(self,channel):
-        wf=self.getWaveform(channel).pointsVector()
-        for i in range(len(wf)):
-            point=wf[i]
-            wf[i]=[float(point.x()),float(point.y())]
-        wf=np.array(wf)
+        frame=self.worker.latestFrame(channel)
+        wf=np.array([frame.times,frame.volts]).transpose()
         print(wf)
         return wf
 
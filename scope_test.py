@@ -1,13 +1,14 @@
-import visa 
 import pylab as pl
 import datetime
 import numpy as np
-import pandas as pd
 
+from dcps.SCPI import readBlock
+from dcps import SiglentSDS1202XE
+from waveform_writer import WaveformWriter
 
-rm=visa.ResourceManager()
-inst=rm.open_resource('USB0::62701::60986::SDS1ECDD2R8216::0::INSTR')
-inst.write("CHDR OFF")
+
+scope=SiglentSDS1202XE('USB0::62701::60986::SDS1ECDD2R8216::0::INSTR')
+inst=scope.inst
 
 vdiv=inst.query("C1:VDIV?")
 ofst=inst.query("C1:OFST?")
@@ -21,15 +22,9 @@ inst.chunk_size=20*1024**2
 
 def wf():
     inst.write("C1:WF? DAT2")
-    ret=list(inst.read_raw())[16:]
-    ret.pop()
-    ret.pop()
-
-    volts=[]
-    for n in ret:
-        if n>127:
-            n=n-255
-        volts.append(n)
+    ret=np.frombuffer(readBlock(inst,trailer=2),dtype=np.int8)
+
+    volts=ret.tolist()
     times=[]
     for i in range(len(volts)):
         volts[i]=volts[i]/25*float(vdiv)-float(ofst)
@@ -54,20 +49,10 @@ def data_to_array():
 
 #f=open('/media/ctalab/DATA/CTA/testing/waveform/07_27_2021/test500.txt','a')
 
-t,v=wf()
-df=pd.DataFrame(data=[v],columns=t)
-
-
-
-for n in range(500):
-    t,v=wf()
-    df2=pd.DataFrame(data=[v],columns=t)
-    df=df.append(df2,ignore_index=True)
-
-df=df.transpose()
-
+# 501 captures streamed to disk, load back with load_waveforms
 wdir = "/home/ctalab/data/CTA/testing/waveform/07_27_2021/"
-df.to_csv(wdir+"35_5.csv")
+with WaveformWriter(wdir+"35_5") as writer:
+    scope.capture_stream(1,501,writer)
 
 #f.close()
 
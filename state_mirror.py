@@ -0,0 +1,104 @@
+# Write-through cache of an instrument's state for the GUIs
+# the mirror holds the last known value of every setting, keyed by name
+# (or (name,channel)). the GUI writes go through set() as soon as the
+# instrument has taken them, so the displays update without asking the
+# instrument again, and the poller's verification reads go through update(),
+# which corrects anything the instrument did differently (ie. rounding, or a
+# change from its front panel).
+#
+# the check functions subscribe to the keys they display and are only called
+# when a value changes, always on the GUI thread, whichever thread changed it.
+#
+# usage:
+#   mirror=StateMirror(initial_status)
+#   mirror.subscribe('Vset',show_vset)      # show_vset(value)
+#   mirror.subscribe(('on',1),show_output)  # keys can be tuples
+#   ...
+#   psu.setVoltage(5.0); mirror.set('Vset',5.0)   # on the worker thread
+#   poller.add('setpoints',mirror.reader(read_setpoints),None,...)
+
+from PyQt5.QtCore import QObject, pyqtSignal, pyqtSlot
+
+from threading import Lock
+import traceback
+
+class StateMirror(QObject):
+    # (key,value) whenever a value changes, delivered on the GUI thread
+    changed=pyqtSignal(object,object)
+    # emitted with a message when a subscriber raises
+    error=pyqtSignal(str)
+
+    def __init__(self,values=None):
+        # values: initial state, ie. read when the panel connected. these
+        # are not announced, the widgets are built from them
+        super(StateMirror,self).__init__()
+        self._values=dict(values or {})
+        self._subscribers={}
+        self._lock=Lock()
+        # the mirror lives on the GUI thread, so changes made on a worker
+        # thread reach the subscribers through the queued signal
+        self.changed.connect(self._notify)
+
+    def get(self,key,default=None):
+        with self._lock:
+            return self._values.get(key,default)
+
+    def __getitem__(self,key):
+        with self._lock:
+            return self._values[key]
+
+    def __contains__(self,key):
+        with self._lock:
+            return key in self._values
+
+    def set(self,key,value):
+        # record a value the GUI just wrote, from any thread
+        self.update({key:value})
+
+    def update(self,values):
+        # record values read from (or written to) the instrument, from any
+        # thread. subscribers of the keys that changed are called
+        changes=[]
+        with self._lock:
+            for key,value in values.items():
+                if key not in self._values or self._values[key]!=value:
+                    self._values[key]=value
+                    changes.append((key,value))
+        for key,value in changes:
+            self.changed.emit(key,value)
+
+    def reader(self,read):
+        # wrap read(), which returns a dict of values, so its result goes
+        # into the mirror on the thread that read it. reads and writes on
+        # the worker thread then reach the mirror in the order they reached
+        # the instrument, and a read queued before a write can never undo
+        # it
+        def read_and_update():
+            values=read()
+            self.update(values)
+            return values
+        return read_and_update
+
+    def forget(self,*keys):
+        # drop keys so the next update announces them even if unchanged
+        with self._lock:
+            for key in keys:
+                self._values.pop(key,None)
+
+    def subscribe(self,key,callback):
+        # callback(value) on the GUI thread whenever key changes
+        self._subscribers.setdefault(key,[]).append(callback)
+
+    def unsubscribe(self,key,callback):
+        if callback in self._subscribers.get(key,[]):
+            self._subscribers[key].remove(callback)
+
+    @pyqtSlot(object,object)
+    def _notify(self,key,value):
+        for callback in list(self._subscribers.get(key,[])):
+            # an exception escaping a slot would abort the whole program
+            try:
+                callback(value)
+            except Exception as err:
+                self.error.emit(("{}: {}").format(key,
+                    traceback.format_exception_only(type(err),err)[-1].strip()))
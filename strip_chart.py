@@ -0,0 +1,141 @@
+# strip chart of readbacks (ie. a PSU's measured V and I) from a ReadbackLog
+# every pull() takes only the samples recorded since the last one from the
+# log's ring buffer and swaps each series' points in with one replace() call
+# (see waveform_display.py), never appending point by point.
+#
+# the chart shows everything since it was opened, in a fixed budget of
+# points per series: once a series' buffer is full its older half is
+# decimated to half as many points with minmax, so the older a stretch of
+# the trace, the coarser it is kept, while spikes and sags stay visible. an
+# hours long trace costs as much to draw as a minute long one.
+#
+# usage:
+#   chart=StripChart(log)
+#   chart.add('PSU 2','Vmeas',channel=1,name='V1')
+#   chart.add('PSU 2','Imeas',channel=1,name='I1',axis='right')
+#   ...
+#   chart.pull() # ie. whenever new readings came in
+
+from PyQt5.QtChart import QChart, QChartView, QValueAxis
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QPainter
+import numpy as np
+
+from waveform_display import minmax, newSeries, setPoints
+
+class Trace(object):
+    # one series' history, in at most budget points
+    def __init__(self,budget=2000):
+        self.budget=max(budget,16)
+        self.t=np.empty(self.budget)
+        self.v=np.empty(self.budget)
+        self.n=0
+
+    def extend(self,t,v):
+        if len(t)>self.budget//2:
+            # more at once than fits next to the history, ie. a log that
+            # was running long before the chart opened
+            t,v=minmax(t,v,self.budget//8)
+        while self.n+len(t)>self.budget:
+            self.compact()
+        self.t[self.n:self.n+len(t)]=t
+        self.v[self.n:self.n+len(t)]=v
+        self.n+=len(t)
+
+    def compact(self):
+        # older half down to at most half as many points, the newer half
+        # kept as it is
+        half=self.n//2
+        t,v=minmax(self.t[:half],self.v[:half],half//4)
+        if t[0]!=self.t[0]:
+            # keep the first point, so the trace still starts at the start
+            t=np.concatenate(([self.t[0]],t))
+            v=np.concatenate(([self.v[0]],v))
+        m=len(t)
+        self.t[:m]=t
+        self.v[:m]=v
+        self.t[m:m+self.n-half]=self.t[half:self.n]
+        self.v[m:m+self.n-half]=self.v[half:self.n]
+        self.n=m+self.n-half
+
+    def points(self):
+        return self.t[:self.n],self.v[:self.n]
+
+class StripChart(QChartView):
+    # log: ReadbackLog the series are read from
+    # budget: most points kept and drawn per series
+    def __init__(self,log,budget=2000,parent=None):
+        super(StripChart,self).__init__(parent)
+        self.log=log
+        self.budget=budget
+        self.traces=[]
+        self.t0=None # time of the first sample, x is minutes since then
+
+        self.chart=QChart()
+        self.chart.legend().setAlignment(Qt.AlignBottom)
+        self.setChart(self.chart)
+        self.setRenderHint(QPainter.Antialiasing,False)
+
+        self.Xaxis=QValueAxis()
+        self.Xaxis.setTitleText("Time [min]")
+        self.Xaxis.setLabelFormat('%.1f')
+        self.Xaxis.setRange(0,1)
+        self.chart.addAxis(self.Xaxis,Qt.AlignBottom)
+        self.Yaxes={}
+
+    def _axis(self,side):
+        # left or right y axis, created the first time it is used
+        if side not in self.Yaxes:
+            axis=QValueAxis()
+            axis.setLabelFormat('%.3g')
+            self.chart.addAxis(axis,Qt.AlignLeft if side=='left' else
+                Qt.AlignRight)
+            self.Yaxes[side]=axis
+        return self.Yaxes[side]
+
+    def add(self,instrument,quantity,channel=0,name=None,axis='left',
+            title=None):
+        # plot one series of the log
+        # axis: 'left' or 'right' y axis, title: that axis' title
+        series=newSeries()
+        series.setName(name or quantity)
+        self.chart.addSeries(series)
+        yaxis=self._axis(axis)
+        if title is not None:
+            yaxis.setTitleText(title)
+        series.attachAxis(self.Xaxis)
+        series.attachAxis(yaxis)
+        self.traces.append({'key':(instrument,quantity,channel),
+            'series':series,'axis':axis,'trace':Trace(self.budget),
+            'index':0})
+
+    def pull(self):
+        # take what the log recorded since the last pull and redraw
+        changed=False
+        for tr in self.traces:
+            instrument,quantity,channel=tr['key']
+            t,v,tr['index']=self.log.since(instrument,quantity,channel,
+                tr['index'])
+            if len(t):
+                tr['trace'].extend(t,v)
+                changed=True
+        if not changed:
+            return
+        if self.t0 is None:
+            self.t0=min(tr['trace'].t[0] for tr in self.traces
+                if tr['trace'].n)
+
+        tmax=self.t0
+        ranges={}
+        for tr in self.traces:
+            t,v=tr['trace'].points()
+            if not len(t):
+                continue
+            setPoints(tr['series'],(t-self.t0)/60,v)
+            tmax=max(tmax,t[-1])
+            lo,hi=ranges.get(tr['axis'],(np.inf,-np.inf))
+            ranges[tr['axis']]=(min(lo,v.min()),max(hi,v.max()))
+        self.Xaxis.setRange(0,max((tmax-self.t0)/60,1))
+        for side,(lo,hi) in ranges.items():
+            pad=max((hi-lo)*0.05,abs(hi)*0.01,1e-3)
+            self.Yaxes[side].setRange(lo-pad,hi+pad)
@@ -0,0 +1,73 @@
+# benchmark for decoding Siglent waveforms
+# compares the old per-sample python loop against decodeWaveform, then times
+# the display decimation used by the scope GUIs
+# run without the scope connected:
+#   python waveform_bench.py
+
+from time import perf_counter
+import numpy as np
+
+from dcps.SiglentSDS1202XE import decodeWaveform
+from waveform_display import minmax, lttb
+
+vdiv=0.5
+ofst=0.1
+tdiv=1e-6
+sara=1e9
+
+def loop_decode(ret):
+    # what getWaveform used to do with the list of bytes
+    vlist=[]
+    for v in ret:
+        if v>127:
+            v=v-256
+        v=(v/25*vdiv-ofst)
+        vlist.append(v)
+
+    tlist=[]
+    for i in range(len(vlist)):
+        t=-tdiv*7+i/sara
+        tlist.append(t)
+
+    return tlist,vlist
+
+def numpy_decode(raw):
+    data=np.frombuffer(raw,dtype=np.int8)
+    return decodeWaveform(data,vdiv,ofst,tdiv,sara)
+
+def best_of(func,arg,reps):
+    best=None
+    for i in range(reps):
+        start=perf_counter()
+        func(arg)
+        took=perf_counter()-start
+        if best is None or took<best:
+            best=took
+    return best
+
+if __name__=="__main__":
+    rng=np.random.default_rng(0)
+    print(("{:>10} {:>12} {:>12} {:>10}").format('points','loop [s]',
+        'numpy [s]','speedup'))
+    for npts in [1000,1000000,14000000]:
+        raw=rng.integers(0,256,npts,dtype=np.uint8).tobytes()
+        reps=1 if npts>1000000 else 5
+        t_loop=best_of(lambda r: loop_decode(list(r)),raw,reps)
+        t_np=best_of(numpy_decode,raw,reps)
+
+        # make sure both paths agree before trusting the numbers
+        t1,v1=loop_decode(list(raw[:1000]))
+        t2,v2=numpy_decode(raw[:1000])
+        assert np.allclose(v1,v2) and np.allclose(t1,t2)
+
+        print(("{:>10} {:>12.4g} {:>12.4g} {:>10.1f}").format(npts,t_loop,
+            t_np,t_loop/t_np))
+
+    # display decimation to a 600 pixel chart, from the full 14M capture
+    t,v=numpy_decode(raw)
+    print()
+    print(("{:>10} {:>12} {:>12}").format('method','points','time [s]'))
+    for name,func in [('minmax',minmax),('lttb',lttb)]:
+        took=best_of(lambda a: func(a[0],a[1],600),(t,v),3)
+        print(("{:>10} {:>12} {:>12.4g}").format(name,
+            len(func(t,v,600)[0]),took))
@@ -0,0 +1,105 @@
+# helpers for drawing scope waveforms on a QChart
+# each chart keeps one series per channel and every new frame is swapped in
+# with a single replace() call, instead of building a new series point by
+# point and removing/adding/attaching it on every update
+#
+# captures can be far longer than the chart is wide (14M points on a 600
+# pixel chart), so they are decimated to a few points per pixel column
+# before drawing. the frame keeps the full resolution arrays for saving.
+#
+# usage:
+#   series=newSeries(smooth=False)
+#   ...
+#   x,y=decimate(frame.times,frame.volts,600,'minmax')
+#   setPoints(series,x,y)
+
+from PyQt5.QtChart import QLineSeries, QSplineSeries
+from PyQt5.QtGui import QPolygonF
+import numpy as np
+
+def newSeries(smooth=False):
+    # smooth: QSplineSeries instead of QLineSeries, the spline control
+    # points are recalculated on every update, which is slow for
+    # thousands of points
+    if smooth:
+        return QSplineSeries()
+    return QLineSeries()
+
+def toPolygon(x,y):
+    # pack the x and y arrays into a QPolygonF without a python loop
+    # a QPolygonF is a QVector<QPointF>, ie. n (x,y) pairs of doubles, so
+    # numpy can fill its memory directly
+    n=len(x)
+    if len(y)!=n:
+        raise ValueError(("x and y lengths differ: {} {}").format(n,len(y)))
+    poly=QPolygonF(n)
+    if n:
+        ptr=poly.data()
+        ptr.setsize(n*2*np.dtype(np.float64).itemsize)
+        buf=np.frombuffer(ptr,dtype=np.float64).reshape(n,2)
+        buf[:,0]=x
+        buf[:,1]=y
+    return poly
+
+def setPoints(series,x,y):
+    # replace every point of series in one call, the chart redraws once
+    series.replace(toPolygon(x,y))
+
+def minmax(x,y,width):
+    # keep the lowest and highest point of each of width columns, in the
+    # order they occur, so spikes one sample wide and edges stay visible
+    # returns at most 2*width points
+    n=len(y)
+    if n<=2*width:
+        return x,y
+    step=-(-n//width) # samples per column
+    cols=-(-n//step)
+    # pad the last column with its own last value, which changes neither
+    # its min nor its max, so every column is a row of one 2d array
+    ycols=np.pad(y,(0,cols*step-n),mode='edge').reshape(cols,step)
+    start=np.arange(cols)*step
+    imin=start+ycols.argmin(axis=1)
+    imax=start+ycols.argmax(axis=1)
+    idx=np.empty(2*cols,dtype=np.intp)
+    idx[0::2]=np.minimum(imin,imax)
+    idx[1::2]=np.maximum(imin,imax)
+    idx=np.minimum(idx,n-1)
+    return x[idx],y[idx]
+
+def lttb(x,y,npts):
+    # largest triangle three buckets: keep the first and last points and
+    # from each bucket in between the point forming the largest triangle
+    # with the point kept from the previous bucket and the mean of the next
+    # one. follows the shape of the trace more closely than minmax, at a
+    # python loop over the npts buckets (the work in each is numpy)
+    n=len(y)
+    if npts>=n or npts<3:
+        return x,y
+    edges=np.linspace(1,n-1,npts-1).astype(np.intp)
+    idx=np.empty(npts,dtype=np.intp)
+    idx[0]=0
+    idx[-1]=n-1
+    a=0
+    for i in range(npts-2):
+        lo,hi=edges[i],edges[i+1]
+        nlo,nhi=hi,(edges[i+2] if i+2<len(edges) else n)
+        cx=x[nlo:nhi].mean()
+        cy=y[nlo:nhi].mean()
+        ax,ay=x[a],y[a]
+        # twice the triangle area, the constant factor does not matter
+        area=np.abs((ax-cx)*(y[lo:hi]-ay)-(ax-x[lo:hi])*(cy-ay))
+        a=lo+int(area.argmax())
+        idx[i+1]=a
+    return x[idx],y[idx]
+
+def decimate(x,y,width,method='minmax'):
+    # reduce a capture to what a chart width pixels wide can show
+    # method: 'minmax' (2 points per column), 'lttb' (width points) or None
+    #   to keep every point
+    if method is None:
+        return x,y
+    if method=='minmax':
+        return minmax(x,y,width)
+    if method=='lttb':
+        return lttb(x,y,width)
+    raise ValueError(("Unknown decimation: {}").format(method))
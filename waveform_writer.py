@@ -0,0 +1,183 @@
+# streaming writers for scope captures
+# every capture is appended to disk as it arrives so long runs use constant
+# memory, and a crash only loses what was captured since the last flush
+#
+# two formats:
+# 'npy':  <name>.npy holds the raw int8 codes as an (n, npts) array and
+#         <name>_meta.npy holds one record of settings per capture
+# 'hdf5': <name>.h5 holds 'raw' and 'meta' datasets, chunked and optionally
+#         compressed (needs h5py)
+# both load back with load_waveforms()
+
+from time import time
+import numpy as np
+
+try:
+    import h5py
+except ImportError:
+    h5py=None
+
+# settings stored with each capture
+meta_dtype=np.dtype([('vdiv','f8'),('ofst','f8'),('tdiv','f8'),('sara','f8'),
+    ('time','f8')])
+
+class NpyAppender(object):
+    # .npy file that records can be appended to
+    # the header has a fixed size and is rewritten with the new record count
+    # on every flush, so the file is always loadable up to the last flush
+    def __init__(self,path,dtype,shape=()):
+        # shape: shape of one record, the file holds (n,)+shape
+        self.path=path
+        self.dtype=np.dtype(dtype)
+        self.shape=tuple(shape)
+        self.count=0
+        self.flushed=0
+
+        # size the header for the largest count it could ever hold, so
+        # rewriting it never moves the data (which starts 64 byte aligned)
+        self.header_len=-(-(len(self._dict(2**63))+11)//64)*64
+        self.f=open(path,'wb')
+        self.f.write(self._header(0))
+
+    def _dict(self,count):
+        return repr({'descr':np.lib.format.dtype_to_descr(self.dtype),
+            'fortran_order':False,'shape':(count,)+self.shape})
+
+    def _header(self,count):
+        # magic and version 1.0, header length, then the padded header dict
+        size=self.header_len-10
+        head=self._dict(count).ljust(size-1)+'\n'
+        return (np.lib.format.magic(1,0)+np.uint16(size).tobytes()+
+            head.encode('latin1'))
+
+    def append(self,rec):
+        rec=np.asarray(rec,dtype=self.dtype)
+        if rec.shape!=self.shape:
+            raise ValueError(("Record shape {} does not match {}").format(
+                rec.shape,self.shape))
+        self.f.write(rec.tobytes())
+        self.count+=1
+
+    def extend(self,recs):
+        # add several records at once, recs has shape (n,)+shape
+        recs=np.ascontiguousarray(recs,dtype=self.dtype)
+        if recs.shape[1:]!=self.shape:
+            raise ValueError(("Record shape {} does not match {}").format(
+                recs.shape[1:],self.shape))
+        self.f.write(recs.tobytes())
+        self.count+=len(recs)
+
+    def flush(self):
+        if self.flushed==self.count:
+            return
+        self.f.flush()
+        self.f.seek(0)
+        self.f.write(self._header(self.count))
+        self.f.seek(0,2)
+        self.f.flush()
+        self.flushed=self.count
+
+    def close(self):
+        if not self.f.closed:
+            self.flush()
+            self.f.close()
+
+class WaveformWriter(object):
+    # append scope captures (raw int8 codes plus settings) to disk
+    # name: file name without extension
+    # npts: points per capture, None to take it from the first capture
+    # fmt: 'npy' or 'hdf5'
+    # compression: hdf5 filter, ie. 'gzip' or 'lzf' (hdf5 only)
+    # flush_every: number of captures between flushes
+    def __init__(self,name,npts=None,fmt='npy',compression=None,
+            flush_every=16):
+        if fmt not in ('npy','hdf5'):
+            raise ValueError(("Unknown format: {}").format(fmt))
+        if fmt=='hdf5' and h5py is None:
+            raise ImportError("h5py is needed to write hdf5 files")
+
+        self.name=name
+        self.npts=npts
+        self.fmt=fmt
+        self.compression=compression
+        self.flush_every=flush_every
+        self.count=0
+        self.opened=False
+
+    def _open(self):
+        if self.fmt=='npy':
+            self.raw=NpyAppender(self.name+'.npy',np.int8,(self.npts,))
+            self.meta=NpyAppender(self.name+'_meta.npy',meta_dtype)
+        else:
+            self.h5=h5py.File(self.name+'.h5','w')
+            rows=max(1,min(self.flush_every,(1<<20)//self.npts))
+            self.raw=self.h5.create_dataset('raw',shape=(0,self.npts),
+                maxshape=(None,self.npts),dtype=np.int8,
+                chunks=(rows,self.npts),compression=self.compression)
+            self.meta=self.h5.create_dataset('meta',shape=(0,),
+                maxshape=(None,),dtype=meta_dtype,chunks=(1024,))
+        self.opened=True
+
+    def append(self,raw,vdiv,ofst,tdiv,sara,timestamp=None):
+        # add one capture
+        # raw: int8 codes, as returned by SiglentSDS1202XE.getWaveformRaw
+        if self.npts is None:
+            self.npts=len(raw)
+        if not self.opened:
+            self._open()
+        if timestamp is None:
+            timestamp=time()
+        meta=(vdiv,ofst,tdiv,sara,timestamp)
+
+        if self.fmt=='npy':
+            self.raw.append(raw)
+            self.meta.append(meta)
+        else:
+            self.raw.resize(self.count+1,axis=0)
+            self.raw[self.count]=raw
+            self.meta.resize(self.count+1,axis=0)
+            self.meta[self.count]=meta
+        self.count+=1
+
+        if self.count%self.flush_every==0:
+            self.flush()
+
+    def flush(self):
+        if not self.opened:
+            return
+        if self.fmt=='npy':
+            self.raw.flush()
+            self.meta.flush()
+        else:
+            self.h5.flush()
+
+    def close(self):
+        if not self.opened:
+            return
+        if self.fmt=='npy':
+            self.raw.close()
+            self.meta.close()
+        else:
+            self.h5.close()
+        self.opened=False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self,*exc):
+        self.close()
+
+def load_waveforms(name,fmt='npy'):
+    # return (raw, meta) for a file written by WaveformWriter
+    # npy files are memory mapped, so nothing is read until it is used
+    # volts for capture i: raw[i]*meta['vdiv'][i]/25-meta['ofst'][i]
+    if fmt=='npy':
+        raw=np.load(name+'.npy',mmap_mode='r')
+        meta=np.load(name+'_meta.npy',mmap_mode='r')
+        n=min(len(raw),len(meta)) # a crash can leave one a record ahead
+        return raw[:n],meta[:n]
+    if h5py is None:
+        raise ImportError("h5py is needed to read hdf5 files")
+    with h5py.File(name+'.h5','r') as f:
+        n=min(len(f['raw']),len(f['meta']))
+        return f['raw'][:n],f['meta'][:n]